@@ -1,9 +1,10 @@
 """Ingestion API routes"""
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import List
 import uuid
 from app.jobs import create_job, start_job_processing, get_all_jobs
-from app.storage import save_uploaded_file, get_file_hash
+from app.storage import save_uploaded_file_stream
 from app.config import settings
 from pathlib import Path
 
@@ -56,26 +57,25 @@ async def ingest_files(
     jobs = []
     
     for file in new_files:
-        # Read file content
-        file_content = await file.read()
-        
-        if len(file_content) == 0:
-            continue
-        
         # Generate policy ID
         policy_id = str(uuid.uuid4())
         
-        # Save file
-        file_path = save_uploaded_file(
+        # Stream file to disk in fixed-size blocks (hash computed in the same pass)
+        file_path, file_hash, size_bytes = await run_in_threadpool(
+            save_uploaded_file_stream,
             tenantId,
             policy_id,
             file.filename or "unknown",
-            file_content,
-            Path(settings.data_dir)
+            file.file,
+            Path(settings.data_dir),
+            settings.ingest_chunk_size,
         )
         
-        # Create job
-        job_id = create_job(tenantId, policy_id, file.filename or "unknown")
+        if size_bytes == 0:
+            continue
+        
+        # Create job (hash recorded so processing doesn't re-read the file)
+        job_id = create_job(tenantId, policy_id, file.filename or "unknown", file_hash=file_hash)
         
         # Start processing in background (non-blocking)
         import asyncio
@@ -5,10 +5,11 @@ from pydantic import BaseModel
 import json
 from app.storage import list_policies, delete_policy_files
 from app.vector_store import delete_policy_chunks
-from app.jobs import get_all_jobs, load_job
+from app.jobs import get_all_jobs, load_job, delete_job
 from app.manifest import load_manifest
 from pathlib import Path
 from app.config import settings
+from app import tesseract_engine
 from fastapi.responses import FileResponse, Response
 
 
@@ -135,6 +136,49 @@ async def list_policies_endpoint(
         raise HTTPException(status_code=500, detail=f"Failed to list policies: {str(e)}")
 
 
+def _find_policy_file(tenant_id: str, policy_id: str) -> tuple:
+    """
+    Locate a policy's uploaded file
+    
+    Returns:
+        (file_path, filename) tuple
+    
+    Raises:
+        HTTPException 404 if the policy or its file does not exist
+    """
+    # Find the policy in jobs to get filename
+    policy_jobs = get_all_jobs(tenant_id, policy_id=policy_id)
+    filename = None
+    
+    for job in policy_jobs:
+        filename = job.get('filename')
+        if filename:
+            break
+    
+    if not filename:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    
+    # Get file path
+    data_dir = Path(settings.data_dir)
+    policy_dir = data_dir / tenant_id / policy_id
+    
+    # Try to find the file
+    if not policy_dir.exists():
+        raise HTTPException(status_code=404, detail="Policy file not found")
+    
+    # Look for PDF file (usually matches filename)
+    file_path = policy_dir / filename
+    if not file_path.exists():
+        # Try to find any PDF in the directory
+        pdf_files = list(policy_dir.glob("*.pdf"))
+        if pdf_files:
+            file_path = pdf_files[0]
+        else:
+            raise HTTPException(status_code=404, detail="Policy file not found")
+    
+    return file_path, filename
+
+
 @router.get("/v1/policies/{policyId}/file")
 async def get_policy_file(
     policyId: str,
@@ -144,35 +188,7 @@ async def get_policy_file(
     Get policy file for download/preview
     """
     try:
-        # Find the policy in jobs to get filename
-        all_jobs = get_all_jobs(tenantId)
-        filename = None
-        
-        for job in all_jobs:
-            if job.get('policyId') == policyId:
-                filename = job.get('filename')
-                break
-        
-        if not filename:
-            raise HTTPException(status_code=404, detail="Policy not found")
-        
-        # Get file path
-        data_dir = Path(settings.data_dir)
-        policy_dir = data_dir / tenantId / policyId
-        
-        # Try to find the file
-        if not policy_dir.exists():
-            raise HTTPException(status_code=404, detail="Policy file not found")
-        
-        # Look for PDF file (usually matches filename)
-        file_path = policy_dir / filename
-        if not file_path.exists():
-            # Try to find any PDF in the directory
-            pdf_files = list(policy_dir.glob("*.pdf"))
-            if pdf_files:
-                file_path = pdf_files[0]
-            else:
-                raise HTTPException(status_code=404, detail="Policy file not found")
+        file_path, filename = _find_policy_file(tenantId, policyId)
         
         return FileResponse(
             path=str(file_path),
@@ -185,6 +201,67 @@ async def get_policy_file(
         raise HTTPException(status_code=500, detail=f"Failed to get policy file: {str(e)}")
 
 
+# Page preview limits (thumbnails for the document viewer)
+PREVIEW_MIN_DPI = 24
+PREVIEW_MAX_DPI = 200
+PREVIEW_DEFAULT_DPI = 72
+
+
+@router.get("/v1/policies/{policyId}/pages/{page}/preview")
+async def get_policy_page_preview(
+    policyId: str,
+    page: int,
+    tenantId: str = Query(..., description="Tenant identifier"),
+    dpi: int = Query(PREVIEW_DEFAULT_DPI, ge=PREVIEW_MIN_DPI, le=PREVIEW_MAX_DPI, description="Render resolution"),
+    width: Optional[int] = Query(None, ge=32, le=2000, description="Scale the image down to this width (px)"),
+    format: str = Query("png", description="png | jpeg | webp")
+):
+    """
+    Rendered image of one page for the frontend viewer
+    
+    Rendered through the shared page rasterizer, so a page rendered for OCR at
+    the same DPI is served from the page cache and repeated previews are cheap.
+    """
+    import asyncio
+    from app.page_raster import get_rasterizer
+    
+    formats = {"png": ("PNG", "image/png"), "jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+    if format not in formats:
+        raise HTTPException(status_code=400, detail="format must be 'png', 'jpeg' or 'webp'")
+    if page < 1:
+        raise HTTPException(status_code=400, detail="page must be >= 1")
+    
+    file_path, _ = _find_policy_file(tenantId, policyId)
+    if file_path.suffix.lower() != ".pdf":
+        raise HTTPException(status_code=400, detail="Page previews are only available for PDF files")
+    
+    def _render() -> bytes | None:
+        import io
+        rasterizer = get_rasterizer(file_path)
+        if page > rasterizer.page_count():
+            return None
+        image = rasterizer.render(page, dpi=dpi)
+        if width and image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))))
+        pil_format, _ = formats[format]
+        buffer = io.BytesIO()
+        image.save(buffer, format=pil_format, **({"quality": 80} if pil_format != "PNG" else {}))
+        return buffer.getvalue()
+    
+    try:
+        content = await asyncio.get_event_loop().run_in_executor(None, _render)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to render page preview: {str(e)}")
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Page {page} not found")
+    
+    return Response(
+        content=content,
+        media_type=formats[format][1],
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+
 @router.delete("/v1/policies/{policyId}")
 async def delete_policy_endpoint(
     policyId: str,
@@ -193,7 +270,7 @@ async def delete_policy_endpoint(
     """
     Delete a policy and all associated data - COMPLETE DELETION
     This function ensures 100% deletion:
-    1. Job files (source of truth)
+    1. Jobs (source of truth)
     2. Vector store chunks
     3. Manifest files (per-policy and global)
     4. Policy directory and all files
@@ -210,54 +287,32 @@ async def delete_policy_endpoint(
         errors = []
         
         # ============================================================
-        # 1. DELETE JOB FILES (MUST BE FIRST - source of truth)
+        # 1. DELETE JOBS (MUST BE FIRST - source of truth)
         # ============================================================
-        print("📋 Step 1: Deleting job files...")
-        all_jobs = get_all_jobs(tenantId)
-        jobs_dir = data_dir / "jobs"
-        jobs_dir.mkdir(parents=True, exist_ok=True)  # Ensure jobs directory exists
+        print("📋 Step 1: Deleting jobs...")
+        policy_jobs = get_all_jobs(tenantId, policy_id=policyId)
         deleted_jobs = []
         
-        for job in all_jobs:
-            if job.get('policyId') == policyId:
-                job_id = job.get('jobId')
-                if job_id:
-                    job_file = jobs_dir / f"{job_id}.json"
-                    if job_file.exists():
-                        try:
-                            job_file.unlink()
-                            deleted_jobs.append(job_id)
-                            deleted_items.append(f"job:{job_id}")
-                            print(f"   ✓ Deleted job file: {job_file.name}")
-                        except Exception as e:
-                            error_msg = f"Failed to delete job file {job_file.name}: {e}"
-                            print(f"   ❌ {error_msg}")
-                            errors.append(error_msg)
+        for job in policy_jobs:
+            job_id = job.get('jobId')
+            if job_id:
+                try:
+                    if delete_job(job_id):
+                        deleted_jobs.append(job_id)
+                        deleted_items.append(f"job:{job_id}")
+                        print(f"   ✓ Deleted job: {job_id}")
                     else:
-                        print(f"   ⚠ Job file not found: {job_file}")
-        
-        # Double-check: verify jobs are actually deleted
-        remaining_jobs_after_delete = get_all_jobs(tenantId)
-        remaining_policy_jobs = [j for j in remaining_jobs_after_delete if j.get('policyId') == policyId]
-        if remaining_policy_jobs:
-            print(f"   ⚠ Warning: Policy still has {len(remaining_policy_jobs)} job(s) after deletion attempt")
-            # Try to delete again (force delete)
-            for job in remaining_policy_jobs:
-                job_id = job.get('jobId')
-                if job_id:
-                    job_file = jobs_dir / f"{job_id}.json"
-                    if job_file.exists():
-                        try:
-                            job_file.unlink()
-                            print(f"   ✓ Force-deleted job file: {job_file.name}")
-                        except Exception as e:
-                            print(f"   ❌ Failed to force-delete {job_file.name}: {e}")
+                        print(f"   ⚠ Job not found: {job_id}")
+                except Exception as e:
+                    error_msg = f"Failed to delete job {job_id}: {e}"
+                    print(f"   ❌ {error_msg}")
+                    errors.append(error_msg)
         
         if not deleted_jobs:
-            print(f"   ⚠ Warning: No job files found for policy {policyId}")
-            # This is not necessarily an error - policy might have been created but job files might not exist
+            print(f"   ⚠ Warning: No jobs found for policy {policyId}")
+            # This is not necessarily an error - policy might have been created but jobs might not exist
         else:
-            print(f"   ✅ Deleted {len(deleted_jobs)} job file(s)")
+            print(f"   ✅ Deleted {len(deleted_jobs)} job(s)")
         
         # ============================================================
         # 2. DELETE FROM VECTOR STORE (ChromaDB chunks)
@@ -325,26 +380,22 @@ async def delete_policy_endpoint(
         verification_passed = True
         
         # Check jobs - THIS IS THE PRIMARY SOURCE OF TRUTH
-        remaining_jobs = get_all_jobs(tenantId)
-        remaining_policy_jobs = [j for j in remaining_jobs if j.get('policyId') == policyId]
+        remaining_policy_jobs = get_all_jobs(tenantId, policy_id=policyId)
         if remaining_policy_jobs:
             print(f"   ❌ ERROR: Policy {policyId} still exists in jobs!")
             print(f"      Remaining job IDs: {[j.get('jobId') for j in remaining_policy_jobs]}")
             # Try to delete remaining jobs forcefully
-            jobs_dir = data_dir / "jobs"
             for job in remaining_policy_jobs:
                 job_id = job.get('jobId')
                 if job_id:
-                    job_file = jobs_dir / f"{job_id}.json"
-                    if job_file.exists():
-                        try:
-                            job_file.unlink()
-                            print(f"      ✓ Force-deleted remaining job file: {job_file.name}")
-                        except Exception as e:
-                            print(f"      ❌ Failed to force-delete {job_file.name}: {e}")
+                    try:
+                        delete_job(job_id)
+                        print(f"      ✓ Force-deleted remaining job: {job_id}")
+                    except Exception as e:
+                        print(f"      ❌ Failed to force-delete {job_id}: {e}")
             verification_passed = False
         else:
-            print(f"   ✅ Verified: Policy not in jobs (get_all_jobs returned {len(remaining_jobs)} total jobs)")
+            print("   ✅ Verified: Policy not in jobs")
         
         # Check policy directory
         policy_dir = data_dir / tenantId / policyId
@@ -409,7 +460,10 @@ async def reprocess_policy_endpoint(
     Reprocess a policy (re-run OCR or full processing)
     
     Body (JSON):
-        { "mode": "ocr_only" | "full" }  # default "ocr_only"
+        { "mode": "ocr_only" | "full" | "failed_pages" }  # default "ocr_only"
+    
+    "failed_pages" re-runs only the pages marked FAILED in the manifest and
+    re-indexes only those pages.
     
     Returns HTTP 202 Accepted with job information
     """
@@ -424,8 +478,8 @@ async def reprocess_policy_endpoint(
         mode = request_body.mode
         
         # Validate mode
-        if mode not in ["ocr_only", "full"]:
-            raise HTTPException(status_code=400, detail="mode must be 'ocr_only' or 'full'")
+        if mode not in ["ocr_only", "full", "failed_pages"]:
+            raise HTTPException(status_code=400, detail="mode must be 'ocr_only', 'full' or 'failed_pages'")
         
         # Validate tenantId - check if tenant directory exists
         data_dir = Path(settings.data_dir)
@@ -444,14 +498,9 @@ async def reprocess_policy_endpoint(
             raise HTTPException(status_code=404, detail=f"PDF file not found for policy {policyId}")
         
         # Get filename from existing job or use first PDF found
-        all_jobs = get_all_jobs(tenantId)
-        existing_job = None
-        filename = None
-        for job in all_jobs:
-            if job.get('policyId') == policyId:
-                existing_job = job
-                filename = job.get("filename")
-                break
+        policy_jobs = get_all_jobs(tenantId, policy_id=policyId)
+        existing_job = policy_jobs[-1] if policy_jobs else None  # latest
+        filename = existing_job.get("filename") if existing_job else None
         
         # If no job found, use the PDF filename from disk
         if not filename:
@@ -466,8 +515,17 @@ async def reprocess_policy_endpoint(
         if not file_path.exists():
             raise HTTPException(status_code=404, detail=f"Policy file not found: {filename}")
         
-        # Check OCR prerequisites for ocr_only mode
-        if mode == "ocr_only":
+        failed_pages = None
+        if mode == "failed_pages":
+            manifest = load_manifest(tenantId, policyId)
+            failed_pages = [
+                p.get("pageNumber") for p in (manifest or {}).get("pages", []) if p.get("status") == "FAILED"
+            ]
+            if not failed_pages:
+                raise HTTPException(status_code=409, detail=f"Policy {policyId} has no failed pages")
+        
+        # Check OCR prerequisites for OCR modes
+        if mode in ("ocr_only", "failed_pages"):
             from app.openai_client import get_openai_client
             ocr_provider = settings.ocr_provider
             
@@ -479,29 +537,22 @@ async def reprocess_policy_endpoint(
                         status_code=409,
                         detail="Vision OCR requires OPENAI_API_KEY. Please set OPENAI_API_KEY environment variable."
                     )
-            elif ocr_provider == "tesseract":
-                # Tesseract requires pdf2image and pytesseract
+            elif ocr_provider in ("tesseract", "tesserocr"):
+                # Tesseract requires pdf2image and pytesseract (or tesserocr)
                 if convert_from_path is None:
                     raise HTTPException(
                         status_code=409,
                         detail="OCR prerequisites missing. Install poppler (for pdf2image) and tesseract (for pytesseract)."
                     )
-                try:
-                    import pytesseract
-                except ImportError:
+                if not tesseract_engine.engine_available():
                     raise HTTPException(
                         status_code=409,
-                        detail="OCR prerequisites missing. Install pytesseract (pip install pytesseract)."
+                        detail="OCR prerequisites missing. Install pytesseract (pip install pytesseract) or tesserocr."
                     )
             else:  # auto
                 # Check if at least one is available
                 vision_available = get_openai_client() is not None
-                tesseract_available = convert_from_path is not None
-                try:
-                    import pytesseract
-                    tesseract_available = tesseract_available and pytesseract is not None
-                except ImportError:
-                    tesseract_available = False
+                tesseract_available = convert_from_path is not None and tesseract_engine.engine_available()
                 
                 if not vision_available and not tesseract_available:
                     raise HTTPException(
@@ -517,7 +568,8 @@ async def reprocess_policy_endpoint(
             # Only delete text files if they don't exist or we want to force OCR
         
         # Create new job for reprocessing (pass mode to job)
-        job_id = create_job(tenantId, policyId, filename, reprocess_mode=mode)
+        # No upload hash: the file may have been replaced on disk, so processing re-hashes it
+        job_id = create_job(tenantId, policyId, filename, reprocess_mode=mode, file_hash=None)
         
         # Start reprocessing in background (non-blocking)
         asyncio.create_task(start_job_processing(job_id))
@@ -528,7 +580,8 @@ async def reprocess_policy_endpoint(
                 "tenantId": tenantId,
                 "policyId": policyId,
                 "jobId": job_id,
-                "status": JobStatus.QUEUED
+                "status": JobStatus.QUEUED,
+                **({"failedPages": failed_pages} if failed_pages is not None else {}),
             }),
             media_type="application/json",
             status_code=202
@@ -1,27 +1,194 @@
 """Job status API routes"""
-from fastapi import APIRouter, HTTPException, Query
-from app.jobs import load_job
+import asyncio
+import json
+from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app import job_events
+from app.job_timings import summarize_job_timings, aggregate_timings
+from app.jobs import load_job, load_jobs, get_all_jobs, JobStatus
+from app.scheduler import queue_info, queue_stats
 
 
 router = APIRouter()
 
+# Max job IDs per batched status request
+MAX_BATCH_JOBS = 500
+# Seconds between store checks while no in-process event arrives (jobs run by other processes)
+STREAM_POLL_SECONDS = 2.0
+# Seconds between keep-alive comments on an idle stream
+STREAM_KEEPALIVE_SECONDS = 15.0
+
+
+class JobStatusBatchRequest(BaseModel):
+    tenantId: str
+    jobIds: List[str]
+
+
+def _with_queue_info(job: dict) -> dict:
+    """Add queue position / estimated start time while waiting for a worker"""
+    if job.get("status") == JobStatus.QUEUED:
+        info = queue_info(job["jobId"])
+        if info:
+            job["queue"] = {**(job.get("queue") or {}), **info}
+    return job
+
+
+def _summarize(job: dict, include_page_timings: bool = False) -> dict:
+    """Queue info plus a compact timing breakdown (per-page OCR timings only on request)"""
+    job = _with_queue_info(job)
+    if job.get("timings") and not include_page_timings:
+        job["timings"] = summarize_job_timings(job["timings"])
+    return job
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 
 @router.get("/v1/jobs/{job_id}")
-async def get_job_status(job_id: str, tenantId: str = Query(...)):
+async def get_job_status(job_id: str, tenantId: str = Query(...), includePageTimings: bool = Query(False)):
     """
     Get job status
-    
+
     Args:
         job_id: Job identifier
         tenantId: Tenant identifier (required for security)
+        includePageTimings: Return the OCR latency of every page instead of the slowest ones
     """
-    job = load_job(job_id)
-    
+    # Store reads run in the threadpool (see stream_job_events)
+    job = await run_in_threadpool(load_job, job_id)
+
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    
+
     # Verify tenant
     if job.get("tenantId") != tenantId:
         raise HTTPException(status_code=403, detail="Access denied")
-    
-    return job
+
+    return await run_in_threadpool(_summarize, job, includePageTimings)
+
+
+@router.post("/v1/jobs/status")
+async def get_jobs_status(request: JobStatusBatchRequest):
+    """
+    Get the status of several jobs in one request
+
+    For clients that cannot hold an event stream open. Jobs that do not exist
+    or belong to another tenant are listed in "missing".
+
+    Args:
+        request: tenantId and jobIds (at most MAX_BATCH_JOBS)
+    """
+    if len(request.jobIds) > MAX_BATCH_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_JOBS} jobIds per request")
+
+    return await run_in_threadpool(_batch_status, request.tenantId, request.jobIds)
+
+
+def _batch_status(tenant_id: str, job_ids: List[str]) -> dict:
+    """Summaries of a tenant's jobs; unknown or foreign job IDs are listed under missing"""
+    found = load_jobs(job_ids)
+    jobs = []
+    missing = []
+    for job_id in dict.fromkeys(job_ids):
+        job = found.get(job_id)
+        if not job or job.get("tenantId") != tenant_id:
+            missing.append(job_id)
+            continue
+        jobs.append(_summarize(job))
+
+    return {"jobs": jobs, "missing": missing}
+
+
+@router.get("/v1/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, tenantId: str = Query(...)):
+    """
+    Stream job progress as Server-Sent Events
+
+    Sends a "progress" event with the current job snapshot (status, progress
+    counters, error) on connect and whenever the job is updated, and closes the
+    stream after the job reaches a terminal status.
+
+    Args:
+        job_id: Job identifier
+        tenantId: Tenant identifier (required for security)
+    """
+    # Store reads run in the threadpool: SQLite calls can wait on the worker's writes
+    job = await run_in_threadpool(load_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("tenantId") != tenantId:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    async def event_stream():
+        q = job_events.subscribe(job_id)
+        try:
+            # Re-read after subscribing so no update falls between the two
+            current = await run_in_threadpool(load_job, job_id) or job
+            event = job_events.job_event(await run_in_threadpool(_with_queue_info, current))
+            last_updated = event.get("updatedAt")
+            yield _sse("progress", event)
+            idle = 0.0
+
+            while event.get("status") not in job_events.TERMINAL_STATUSES:
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    # No in-process event: the job may be running in another process
+                    current = await run_in_threadpool(load_job, job_id)
+                    if not current:
+                        yield _sse("error", {"jobId": job_id, "error": "Job not found"})
+                        return
+                    if current.get("updatedAt") == last_updated:
+                        idle += STREAM_POLL_SECONDS
+                        if idle >= STREAM_KEEPALIVE_SECONDS:
+                            idle = 0.0
+                            yield ": keep-alive\n\n"
+                        continue
+                    event = job_events.job_event(current)
+
+                if event.get("updatedAt") == last_updated:
+                    continue
+                last_updated = event.get("updatedAt")
+                idle = 0.0
+                yield _sse("progress", event)
+
+            yield _sse("done", {"jobId": job_id, "status": event.get("status")})
+        finally:
+            job_events.unsubscribe(job_id, q)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/v1/metrics/jobs")
+async def get_job_metrics(tenantId: str = Query(...), limit: int = Query(200, ge=1, le=5000)):
+    """
+    Timing breakdown aggregated over a tenant's recently finished jobs
+
+    Shows where indexing time goes (stage totals and shares, OCR/embedding/upsert
+    latency stats) and names the slowest stage.
+
+    Args:
+        tenantId: Tenant identifier (required for security)
+        limit: Number of most recently finished jobs to aggregate
+    """
+    jobs = get_all_jobs(
+        tenant_id=tenantId,
+        statuses=[JobStatus.READY, JobStatus.FAILED, JobStatus.OCR_FAILED],
+        limit=limit,
+    )
+    metrics = aggregate_timings(jobs)
+    # Other tenants' queue sizes are not exposed
+    stats = queue_stats()
+    stats["queuedByTenant"] = {tenantId: stats["queuedByTenant"].get(tenantId, 0)}
+    metrics["scheduler"] = stats
+    return metrics
@@ -0,0 +1,273 @@
+"""
+Content-addressed artifact store
+
+Holds the expensive outputs of processing a PDF (page texts, chunks and their
+embeddings) keyed by the file's SHA256 plus the settings that produced them
+(OCR provider/preset and embedding model). A job whose file hash is already in
+the store can copy those artifacts into the tenant's index instead of running
+text extraction, OCR and embedding again.
+
+Layout:
+    data/artifacts/<hash[:2]>/<hash>/<variant>/
+        meta.json      - pages (number, ocrUsed, lineCount), counts, createdAt
+        pages/page_N.txt
+        chunks.json    - chunk suffix, text, metadata (tenant-neutral), embedding
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.config import settings
+
+# Chunk metadata keys that belong to a tenant/policy and are rebound on restore
+_TENANT_METADATA_KEYS = ("tenantId", "policyId", "filename")
+
+
+def get_artifact_variant(ocr_provider: str, ocr_preset: str, embedding_model: str, text_engine: str = "pypdf2") -> str:
+    """Compute the variant key for the settings that produced a set of artifacts"""
+    raw = f"{ocr_provider}|{ocr_preset}|{embedding_model}"
+    if text_engine != "pypdf2":
+        # Appended only for non-default engines so existing variants stay valid
+        raw += f"|{text_engine}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _artifact_dir(file_hash: str, variant: str) -> Path:
+    return Path(settings.data_dir) / "artifacts" / file_hash[:2] / file_hash / variant
+
+
+def has_artifacts(file_hash: str, variant: str) -> bool:
+    """Check whether a complete artifact set exists"""
+    return (_artifact_dir(file_hash, variant) / "meta.json").exists()
+
+
+def load_artifacts(file_hash: str, variant: str) -> Dict[str, Any] | None:
+    """
+    Load artifact metadata and chunks for a file hash/variant
+
+    Returns:
+        Dict with keys: meta, chunks, pages_dir - or None if not stored/corrupted
+    """
+    artifact_dir = _artifact_dir(file_hash, variant)
+    meta_path = artifact_dir / "meta.json"
+    chunks_path = artifact_dir / "chunks.json"
+
+    if not meta_path.exists() or not chunks_path.exists():
+        return None
+
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        with open(chunks_path, "r") as f:
+            chunks = json.load(f)
+    except Exception as e:
+        print(f"[Artifacts] WARNING: Failed to load artifacts {file_hash[:12]}/{variant}: {e}")
+        return None
+
+    return {"meta": meta, "chunks": chunks, "pages_dir": artifact_dir / "pages"}
+
+
+class ArtifactWriter:
+    """
+    Builds an artifact set incrementally
+
+    Chunks are appended to chunks.json in a temporary directory as they are
+    indexed (streaming pipeline), so no job has to hold every chunk and
+    embedding in memory until the end. finalize() adds the page texts and
+    meta.json and renames the directory into place; discard() drops an
+    unfinished set. Readers never see a partially written artifact set.
+
+    Write errors are logged and only make finalize() return False: the
+    artifact store is a cache and must not fail the job.
+    """
+
+    def __init__(self, file_hash: str, variant: str, policy_id: str):
+        self.file_hash = file_hash
+        self.variant = variant
+        self.policy_id = policy_id
+        self.artifact_dir = _artifact_dir(file_hash, variant)
+        self.tmp_dir = self.artifact_dir.parent / f".tmp-{uuid.uuid4().hex}"
+        self.chunks_written = 0
+        self.failed = False
+        self._chunks_file = None
+        self._done = False
+
+    def _stored_chunk(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        prefix = f"{self.policy_id}:"
+        chunk_id = chunk["chunk_id"]
+        suffix = chunk_id[len(prefix):] if chunk_id.startswith(prefix) else chunk_id
+        metadata = {
+            k: v for k, v in chunk.get("metadata", {}).items()
+            if k not in _TENANT_METADATA_KEYS
+        }
+        return {
+            "suffix": suffix,
+            "text": chunk["text"],
+            "metadata": metadata,
+            "embedding": list(chunk["embedding"]),
+        }
+
+    def add_chunks(self, chunks: List[Dict[str, Any]]):
+        """Append indexed chunks (with "embedding"; others are skipped)"""
+        if self.failed or self._done:
+            return
+        try:
+            if self._chunks_file is None:
+                self.tmp_dir.mkdir(parents=True, exist_ok=True)
+                self._chunks_file = open(self.tmp_dir / "chunks.json", "w")
+                self._chunks_file.write("[")
+            for chunk in chunks:
+                if "embedding" not in chunk:
+                    continue
+                if self.chunks_written:
+                    self._chunks_file.write(",")
+                json.dump(self._stored_chunk(chunk), self._chunks_file)
+                self.chunks_written += 1
+        except Exception as e:
+            print(f"[Artifacts] WARNING: Failed to write chunks for {self.file_hash[:12]}: {e}")
+            self.failed = True
+
+    def finalize(self, text_dir: Path, pages: List[Dict[str, Any]]) -> bool:
+        """
+        Add page texts and meta.json and move the set into place
+
+        Args:
+            text_dir: Directory holding page_N.txt files for the policy
+            pages: Manifest page entries (pageNumber, ocrUsed, lineCount)
+
+        Returns:
+            True if stored, False otherwise
+        """
+        if self._done:
+            return False
+        if self.failed:
+            self.discard()
+            return False
+        try:
+            self.add_chunks([])  # creates chunks.json for sets without chunks
+            self._chunks_file.write("]")
+            self._chunks_file.close()
+            self._chunks_file = None
+
+            (self.tmp_dir / "pages").mkdir(parents=True, exist_ok=True)
+            page_entries = []
+            for page in pages:
+                page_num = page.get("pageNumber")
+                src = text_dir / f"page_{page_num}.txt"
+                if page.get("status") != "COMPLETED" or not src.exists():
+                    continue
+                shutil.copyfile(src, self.tmp_dir / "pages" / src.name)
+                page_entries.append({
+                    "pageNumber": page_num,
+                    "ocrUsed": bool(page.get("ocrUsed")),
+                    "lineCount": page.get("lineCount", 0),
+                })
+
+            meta = {
+                "fileHash": self.file_hash,
+                "variant": self.variant,
+                "pages": page_entries,
+                "pagesTotal": len(page_entries),
+                "chunksTotal": self.chunks_written,
+                "createdAt": datetime.utcnow().isoformat(),
+            }
+            # meta.json is written last: its presence marks the set as complete
+            with open(self.tmp_dir / "meta.json", "w") as f:
+                json.dump(meta, f, indent=2)
+
+            if self.artifact_dir.exists():
+                shutil.rmtree(self.artifact_dir, ignore_errors=True)
+            os.replace(self.tmp_dir, self.artifact_dir)
+            self._done = True
+
+            print(f"[Artifacts] Stored {len(page_entries)} pages, {self.chunks_written} chunks for {self.file_hash[:12]}/{self.variant}")
+            return True
+
+        except Exception as e:
+            print(f"[Artifacts] WARNING: Failed to store artifacts for {self.file_hash[:12]}: {e}")
+            self.discard()
+            return False
+
+    def discard(self):
+        """Drop an unfinished set (no-op after finalize)"""
+        if self._done:
+            return
+        self._done = True
+        if self._chunks_file is not None:
+            try:
+                self._chunks_file.close()
+            except Exception:
+                pass
+            self._chunks_file = None
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def save_artifacts(
+    file_hash: str,
+    variant: str,
+    policy_id: str,
+    text_dir: Path,
+    pages: List[Dict[str, Any]],
+    chunks: List[Dict[str, Any]]
+) -> bool:
+    """
+    Store page texts, chunks and embeddings for a processed file in one go
+
+    Args:
+        file_hash: SHA256 of the source file
+        variant: Variant key from get_artifact_variant()
+        policy_id: Policy the chunks were built for (stripped from chunk IDs)
+        text_dir: Directory holding page_N.txt files for the policy
+        pages: Manifest page entries (pageNumber, ocrUsed, lineCount)
+        chunks: Chunk dicts including "embedding"
+
+    Returns:
+        True if stored, False otherwise
+    """
+    writer = ArtifactWriter(file_hash, variant, policy_id)
+    writer.add_chunks(chunks)
+    return writer.finalize(text_dir, pages)
+
+
+def restore_artifacts(
+    artifacts: Dict[str, Any],
+    tenant_id: str,
+    policy_id: str,
+    filename: str,
+    text_dir: Path
+) -> List[Dict[str, Any]]:
+    """
+    Copy stored page texts into a policy's text directory and rebind chunks
+
+    Page texts are copied rather than hard-linked: jobs rewrite page_N.txt in
+    place, which would otherwise modify the shared artifact.
+
+    Returns:
+        Chunk dicts (with embeddings) ready for upsert_chunks()
+    """
+    text_dir.mkdir(parents=True, exist_ok=True)
+    pages_dir: Path = artifacts["pages_dir"]
+
+    for page in artifacts["meta"].get("pages", []):
+        name = f"page_{page['pageNumber']}.txt"
+        shutil.copyfile(pages_dir / name, text_dir / name)
+
+    chunks = []
+    for stored in artifacts["chunks"]:
+        metadata = dict(stored.get("metadata", {}))
+        metadata["tenantId"] = tenant_id
+        metadata["policyId"] = policy_id
+        metadata["filename"] = filename
+        chunks.append({
+            "chunk_id": f"{policy_id}:{stored['suffix']}",
+            "text": stored["text"],
+            "metadata": metadata,
+            "embedding": stored["embedding"],
+        })
+
+    return chunks
@@ -2,7 +2,7 @@
 Enhanced chunking utilities with duplicate header removal and clean indexing
 """
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable, Optional
 from app.chunking import chunk_text_with_lines
 
 
@@ -34,32 +34,39 @@ def detect_repeated_header(text_lines: List[str], max_header_lines: int = 5) ->
     return header_text
 
 
-def remove_page_headers(text_pages: List[str], page_numbers: List[int]) -> List[str]:
+# Number of leading lines treated as the page header
+HEADER_LINES = 5
+
+# Pages inspected (after the first) when deciding whether a header repeats
+HEADER_DETECTION_WINDOW = 5
+
+
+def detect_document_header(text_pages: List[str]) -> str | None:
     """
-    Remove repeated headers from pages
+    Detect a header repeated across the first pages of a document
+    
+    Only the first 1 + HEADER_DETECTION_WINDOW pages are inspected, so the
+    header can be decided before the rest of the document is available.
     
     Args:
-        text_pages: List of text strings (one per page)
-        page_numbers: List of page numbers (1-indexed)
+        text_pages: Text of the first pages (in page order)
     
     Returns:
-        List of cleaned text pages (headers removed)
+        Normalized header text if it repeats, None otherwise
     """
     if len(text_pages) < 2:
-        return text_pages  # Can't detect repeated headers with < 2 pages
+        return None  # Can't detect repeated headers with < 2 pages
     
     # Detect header from first page
-    first_page_lines = text_pages[0].splitlines()
-    detected_header = detect_repeated_header(first_page_lines)
+    detected_header = detect_repeated_header(text_pages[0].splitlines(), HEADER_LINES)
     
     if not detected_header:
-        return text_pages  # No header detected
+        return None  # No header detected
     
     # Check how many pages have this header (similarity > 80%)
     header_count = 0
-    for page_text in text_pages[1:6]:  # Check first 5 pages after first
-        page_lines = page_text.splitlines()
-        page_header = detect_repeated_header(page_lines)
+    for page_text in text_pages[1:1 + HEADER_DETECTION_WINDOW]:
+        page_header = detect_repeated_header(page_text.splitlines(), HEADER_LINES)
         if page_header:
             # Calculate similarity
             similarity = _text_similarity(detected_header, page_header)
@@ -68,30 +75,42 @@ def remove_page_headers(text_pages: List[str], page_numbers: List[int]) -> List[
     
     # If header appears in at least 2 pages, it's likely a repeated header
     if header_count < 2:
-        return text_pages  # Not a repeated header
+        return None  # Not a repeated header
     
-    # Remove header from all pages
-    cleaned_pages = []
-    header_line_count = len(first_page_lines[:5])  # Remove first 5 lines if they match header
+    return detected_header
+
+
+def strip_page_header(page_text: str, header: str | None) -> str:
+    """Remove the document header from the top of a page if it matches"""
+    if not header:
+        return page_text
+    
+    page_lines = page_text.splitlines()
+    page_header = detect_repeated_header(page_lines, HEADER_LINES)
+    if page_header and _text_similarity(header, page_header) > 0.80:
+        return '\n'.join(page_lines[HEADER_LINES:])
+    
+    # No header match, keep original
+    return page_text
+
+
+def remove_page_headers(text_pages: List[str], page_numbers: List[int]) -> List[str]:
+    """
+    Remove repeated headers from pages
     
-    for i, page_text in enumerate(text_pages):
-        page_lines = page_text.splitlines()
-        
-        # Check if first lines match header
-        page_header = detect_repeated_header(page_lines)
-        if page_header:
-            similarity = _text_similarity(detected_header, page_header)
-            if similarity > 0.80:
-                # Remove header lines
-                cleaned_lines = page_lines[header_line_count:]
-                cleaned_text = '\n'.join(cleaned_lines)
-                cleaned_pages.append(cleaned_text)
-                continue
-        
-        # No header match, keep original
-        cleaned_pages.append(page_text)
+    Args:
+        text_pages: List of text strings (one per page)
+        page_numbers: List of page numbers (1-indexed)
+    
+    Returns:
+        List of cleaned text pages (headers removed)
+    """
+    detected_header = detect_document_header(text_pages)
+    
+    if not detected_header:
+        return text_pages
     
-    return cleaned_pages
+    return [strip_page_header(page_text, detected_header) for page_text in text_pages]
 
 
 def remove_page_numbers_and_titles(text: str) -> str:
@@ -179,7 +198,8 @@ def build_clean_chunks_from_pages(
     policy_id: str,
     filename: str,
     chunk_size_chars: int = 2000,
-    overlap_chars: int = 300
+    overlap_chars: int = 300,
+    only_pages: Optional[Iterable[int]] = None
 ) -> List[Dict[str, Any]]:
     """
     Build chunks from text pages with duplicate header removal and cleaning
@@ -195,6 +215,8 @@ def build_clean_chunks_from_pages(
         filename: Policy filename
         chunk_size_chars: Target chunk size in characters
         overlap_chars: Overlap between chunks
+        only_pages: Only build chunks for these pages (headers are still detected
+                    across all pages, so chunks match a full rebuild)
     
     Returns:
         List of chunk dictionaries with keys:
@@ -237,53 +259,81 @@ def build_clean_chunks_from_pages(
     
     # Build chunks from cleaned pages
     all_chunks = []
+    only_pages = set(only_pages) if only_pages is not None else None
+    
+    for page_text, page_num in zip(cleaned_text_pages, page_numbers):
+        if only_pages is not None and page_num not in only_pages:
+            continue
+        all_chunks.extend(build_page_chunks(
+            tenant_id, policy_id, filename, page_num, page_text, chunk_size_chars, overlap_chars
+        ))
     
-    for page_idx, (page_text, page_num) in enumerate(zip(cleaned_text_pages, page_numbers)):
-        # Clean text before chunking
-        cleaned_text = clean_text_for_chunking(page_text)
+    return all_chunks
+
+
+def build_page_chunks(
+    tenant_id: str,
+    policy_id: str,
+    filename: str,
+    page_num: int,
+    page_text: str,
+    chunk_size_chars: int = 2000,
+    overlap_chars: int = 300
+) -> List[Dict[str, Any]]:
+    """
+    Build chunks for a single page (header already removed)
+    
+    Cleans the text, splits it with line mapping and drops trivial chunks.
+    
+    Returns:
+        List of chunk dictionaries (same shape as build_clean_chunks_from_pages)
+    """
+    # Clean text before chunking
+    cleaned_text = clean_text_for_chunking(page_text)
+    
+    if not cleaned_text.strip():
+        return []  # Skip empty pages after cleaning
+    
+    # Chunk the cleaned page text
+    page_chunks = chunk_text_with_lines(cleaned_text, chunk_size=chunk_size_chars, chunk_overlap=overlap_chars)
+    
+    chunks = []
+    
+    # Filter out trivial chunks (too short, mostly whitespace, etc.)
+    for chunk_idx, chunk_data in enumerate(page_chunks):
+        chunk_text = chunk_data["text"].strip()
         
-        if not cleaned_text.strip():
-            continue  # Skip empty pages after cleaning
+        # Skip chunks that are too short (< 100 chars) or contain very few words
+        if len(chunk_text) < 100:
+            continue
         
-        # Chunk the cleaned page text
-        page_chunks = chunk_text_with_lines(cleaned_text, chunk_size=chunk_size_chars, chunk_overlap=overlap_chars)
+        words = chunk_text.split()
+        if len(words) < 10:  # Less than 10 words is likely not meaningful
+            continue
         
-        # Filter out trivial chunks (too short, mostly whitespace, etc.)
-        for chunk_idx, chunk_data in enumerate(page_chunks):
-            chunk_text = chunk_data["text"].strip()
-            
-            # Skip chunks that are too short (< 100 chars) or contain very few words
-            if len(chunk_text) < 100:
-                continue
-            
-            words = chunk_text.split()
-            if len(words) < 10:  # Less than 10 words is likely not meaningful
-                continue
-            
-            # Skip chunks that are mostly numbers or special characters
-            alphanumeric_chars = sum(1 for c in chunk_text if c.isalnum())
-            if alphanumeric_chars < len(chunk_text) * 0.5:  # Less than 50% alphanumeric
-                continue
-            
-            # Create chunk
-            chunk_id = f"{policy_id}:p{page_num}:c{chunk_idx}"
-            
-            chunk_dict = {
-                "chunk_id": chunk_id,
-                "text": chunk_text,
-                "metadata": {
-                    "tenantId": tenant_id,
-                    "policyId": policy_id,
-                    "filename": filename,
-                    "page": page_num,
-                    "pageNumber": page_num,
-                    "lineStart": chunk_data["lineStart"],
-                    "lineEnd": chunk_data["lineEnd"],
-                    "chunkIndex": chunk_idx,
-                }
+        # Skip chunks that are mostly numbers or special characters
+        alphanumeric_chars = sum(1 for c in chunk_text if c.isalnum())
+        if alphanumeric_chars < len(chunk_text) * 0.5:  # Less than 50% alphanumeric
+            continue
+        
+        # Create chunk
+        chunk_id = f"{policy_id}:p{page_num}:c{chunk_idx}"
+        
+        chunk_dict = {
+            "chunk_id": chunk_id,
+            "text": chunk_text,
+            "metadata": {
+                "tenantId": tenant_id,
+                "policyId": policy_id,
+                "filename": filename,
+                "page": page_num,
+                "pageNumber": page_num,
+                "lineStart": chunk_data["lineStart"],
+                "lineEnd": chunk_data["lineEnd"],
+                "chunkIndex": chunk_idx,
             }
-            
-            all_chunks.append(chunk_dict)
+        }
+        
+        chunks.append(chunk_dict)
     
-    return all_chunks
-
+    return chunks
@@ -27,16 +27,124 @@ class Settings(BaseSettings):
     chunk_size: int = 1000
     chunk_overlap: int = 150
     
+    # Block size (bytes) used when streaming uploads to disk and hashing them
+    ingest_chunk_size: int = int(os.getenv("INGEST_CHUNK_SIZE", str(1024 * 1024)))
+    
+    # Number of background job worker threads
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+    
+    # Where jobs run: "inline" (API process threads) | "worker" (separate `python -m app.worker` processes)
+    job_runner: str = os.getenv("JOB_RUNNER", "inline")
+    
+    # Seconds between job store polls in standalone workers
+    worker_poll_seconds: float = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+    
+    # Job lease duration: running jobs renew it by heartbeat; jobs with expired leases are re-queued
+    job_lease_seconds: int = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+    
+    # Fair scheduler: per-tenant weights ("tenantA:3,tenantB:1"), starvation bound, initial per-page time estimate
+    scheduler_tenant_weights: str = os.getenv("SCHEDULER_TENANT_WEIGHTS", "")
+    scheduler_max_wait_seconds: float = float(os.getenv("SCHEDULER_MAX_WAIT_SECONDS", "1800"))
+    scheduler_initial_seconds_per_page: float = float(os.getenv("SCHEDULER_INITIAL_SECONDS_PER_PAGE", "5"))
+    
+    # Retries (exponential backoff) for transient OCR provider errors, per page
+    ocr_retry_attempts: int = int(os.getenv("OCR_RETRY_ATTEMPTS", "3"))
+    ocr_retry_base_delay: float = float(os.getenv("OCR_RETRY_BASE_DELAY", "2"))
+    ocr_retry_max_delay: float = float(os.getenv("OCR_RETRY_MAX_DELAY", "30"))
+    
+    # Worker processes for Tesseract OCR (pages of a document are OCR'd in parallel when > 1)
+    ocr_workers: int = int(os.getenv("OCR_WORKERS", "1"))
+    
+    # Job pipeline mode: "staged" (OCR all pages, then chunk/embed/upsert) | "streaming" (stages overlap)
+    job_pipeline_mode: str = os.getenv("JOB_PIPELINE_MODE", "staged")
+    
+    # Max items buffered between streaming pipeline stages (bounds peak memory)
+    pipeline_queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+    
+    # Reuse extracted pages/chunks/embeddings for files already processed (content-addressed by hash)
+    artifact_store_enabled: bool = os.getenv("ARTIFACT_STORE_ENABLED", "true").lower() == "true"
+    
+    # Minimum interval between job/manifest progress writes while a job runs (status changes flush immediately)
+    progress_flush_interval_ms: int = int(os.getenv("PROGRESS_FLUSH_INTERVAL_MS", "2000"))
+    
+    # Text extraction engine: "pypdf2" | "pymupdf" (PyMuPDF; falls back to PyPDF2 if not installed)
+    text_extract_engine: str = os.getenv("TEXT_EXTRACT_ENGINE", "pypdf2")
+    
+    # PyMuPDF extraction of documents with at least this many pages is split across the OCR process pool
+    text_extract_parallel_min_pages: int = int(os.getenv("TEXT_EXTRACT_PARALLEL_MIN_PAGES", "64"))
+    
+    # Memory ceiling (MB) for page images rendered at once by the hybrid OCR pipeline
+    ocr_render_memory_mb: int = int(os.getenv("OCR_RENDER_MEMORY_MB", "256"))
+    
+    # Tesseract preprocessing: pages whose estimated skew (degrees) is below this are not rotated
+    ocr_deskew_min_angle: float = float(os.getenv("OCR_DESKEW_MIN_ANGLE", "0.5"))
+    
+    # Disk cache of rendered pages (data/page_cache), shared by all OCR paths and the page preview endpoint
+    page_cache_enabled: bool = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+    # Cache size limit (MB); least recently used pages are evicted beyond it
+    page_cache_max_mb: int = int(os.getenv("PAGE_CACHE_MAX_MB", "2048"))
+    
+    # Pages with fewer extracted characters are OCR'd (classifier disabled, or no PyMuPDF signals)
+    min_text_before_force_ocr: int = int(os.getenv("MIN_TEXT_BEFORE_FORCE_OCR", "800"))
+    
+    # OCR necessity classifier (glyphs, image coverage, fonts, blank check); false = character threshold only
+    ocr_classifier_enabled: bool = os.getenv("OCR_CLASSIFIER_ENABLED", "true").lower() == "true"
+    # Text-layer glyphs needed to treat a page without large images as digital
+    ocr_classifier_min_glyphs: int = int(os.getenv("OCR_CLASSIFIER_MIN_GLYPHS", "10"))
+    # Image coverage (0-1) from which a page counts as scanned
+    ocr_classifier_image_coverage: float = float(os.getenv("OCR_CLASSIFIER_IMAGE_COVERAGE", "0.5"))
+    # Grey-level standard deviation below which a page without text counts as blank
+    ocr_classifier_blank_stddev: float = float(os.getenv("OCR_CLASSIFIER_BLANK_STDDEV", "4.0"))
+    
+    # Per-page layout analysis (prose/table/form/mostly_blank/dense_small_print) picks OCR preset and DPI;
+    # false = job preset and fixed DPIs (Tesseract 200, Vision 225)
+    ocr_auto_layout: bool = os.getenv("OCR_AUTO_LAYOUT", "true").lower() == "true"
+    # Optional provider per layout, e.g. "table=vision,form=vision" (used when that provider is available)
+    ocr_layout_providers: str = os.getenv("OCR_LAYOUT_PROVIDERS", "")
+    
+    # Per-page script detection: Tesseract runs with eng, ara or eng+ara instead of always eng+ara
+    ocr_script_detect_enabled: bool = os.getenv("OCR_SCRIPT_DETECT_ENABLED", "true").lower() == "true"
+    # Letters (Latin + Arabic) a text layer needs before its script mix is trusted
+    ocr_script_min_letters: int = int(os.getenv("OCR_SCRIPT_MIN_LETTERS", "40"))
+    # Share (0-1) of letters from the minority script from which both languages are kept
+    ocr_script_min_share: float = float(os.getenv("OCR_SCRIPT_MIN_SHARE", "0.02"))
+    # Render DPI and minimum script confidence of the Tesseract OSD pass (pages without a usable text layer)
+    ocr_script_osd_dpi: int = int(os.getenv("OCR_SCRIPT_OSD_DPI", "100"))
+    ocr_script_osd_min_confidence: float = float(os.getenv("OCR_SCRIPT_OSD_MIN_CONFIDENCE", "2.0"))
+    
+    # On-disk OCR result cache (data/ocr_cache) keyed by page image hash, provider, model, preset, language
+    ocr_cache_enabled: bool = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    # Cache size limit (MB); least recently used entries are evicted beyond it
+    ocr_cache_max_mb: int = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+    
+    # Hybrid OCR: pages whose Tesseract quality score (0-1) is below this go to the GPT-4 Vision fallback
+    hybrid_fallback_min_score: float = float(os.getenv("HYBRID_FALLBACK_MIN_SCORE", "0.6"))
+    # Pages with Tesseract word confidences fall back when their mean word confidence (0-100) is below
+    # this, or when more than this share (0-1) of their word area is below OCR_LOW_CONFIDENCE_WORD
+    hybrid_fallback_min_mean_confidence: float = float(os.getenv("HYBRID_FALLBACK_MIN_MEAN_CONFIDENCE", "70"))
+    hybrid_fallback_max_low_confidence_area: float = float(os.getenv("HYBRID_FALLBACK_MAX_LOW_CONFIDENCE_AREA", "0.3"))
+    ocr_low_confidence_word: float = float(os.getenv("OCR_LOW_CONFIDENCE_WORD", "60"))
+    
     # OCR preset: "normal_ocr" | "table_ocr" (default: "normal_ocr")
     ocr_preset: str = os.getenv("OCR_PRESET", "normal_ocr")
     
-    # OCR provider: "vision" | "tesseract" | "auto" (default: "auto")
+    # OCR provider: "vision" | "tesseract" | "tesserocr" | "auto" (default: "auto")
+    # "tesserocr" = Tesseract through persistent in-process engines (app.tesseract_engine)
     ocr_provider: str = os.getenv("OCR_PROVIDER", "auto")
     
     # Vision OCR settings
     vision_ocr_model: str = os.getenv("VISION_OCR_MODEL", "gpt-4o-mini")  # Note: gpt-4.1-mini doesn't exist, using gpt-4o-mini
     vision_ocr_detail: str = os.getenv("VISION_OCR_DETAIL", "high")  # "low" | "high" | "auto"
     vision_ocr_max_concurrency: int = int(os.getenv("VISION_OCR_MAX_CONCURRENCY", "2"))
+    # Page image encoding sent to Vision: "jpeg" | "webp" | "png"
+    vision_image_format: str = os.getenv("VISION_IMAGE_FORMAT", "jpeg")
+    # "gray" | "bilevel" | "color"
+    vision_image_color: str = os.getenv("VISION_IMAGE_COLOR", "gray")
+    vision_image_quality: int = int(os.getenv("VISION_IMAGE_QUALITY", "80"))
+    # Longest side (px) of the image sent; 0 = downscale only as far as the API would for VISION_OCR_DETAIL
+    vision_image_max_side: int = int(os.getenv("VISION_IMAGE_MAX_SIDE", "0"))
+    # Crop blank page margins before scaling (more resolution for the text)
+    vision_image_crop_margins: bool = os.getenv("VISION_IMAGE_CROP_MARGINS", "false").lower() == "true"
     
     class Config:
         env_file = ".env"
@@ -49,13 +157,46 @@ class Settings(BaseSettings):
             raise ValueError(f"EMBEDDINGS_PROVIDER must be 'openai' or 'local', got: {self.embeddings_provider}")
         
         # Validate OCR provider
-        if self.ocr_provider not in ["vision", "tesseract", "auto"]:
-            raise ValueError(f"OCR_PROVIDER must be 'vision', 'tesseract', or 'auto', got: {self.ocr_provider}")
+        if self.ocr_provider not in ["vision", "tesseract", "tesserocr", "auto"]:
+            raise ValueError(f"OCR_PROVIDER must be 'vision', 'tesseract', 'tesserocr', or 'auto', got: {self.ocr_provider}")
+        
+        # Validate per-layout OCR providers
+        for item in filter(None, (i.strip() for i in self.ocr_layout_providers.split(","))):
+            if "=" not in item or item.split("=", 1)[1].strip() not in ["vision", "tesseract"]:
+                raise ValueError(f"OCR_LAYOUT_PROVIDERS entries must be '<layout>=vision|tesseract', got: {item}")
+        
+        # Validate job pipeline mode
+        if self.job_pipeline_mode not in ["staged", "streaming"]:
+            raise ValueError(f"JOB_PIPELINE_MODE must be 'staged' or 'streaming', got: {self.job_pipeline_mode}")
+        
+        # Validate text extraction engine
+        if self.text_extract_engine not in ["pypdf2", "pymupdf"]:
+            raise ValueError(f"TEXT_EXTRACT_ENGINE must be 'pypdf2' or 'pymupdf', got: {self.text_extract_engine}")
+        
+        # Validate job runner
+        if self.job_runner not in ["inline", "worker"]:
+            raise ValueError(f"JOB_RUNNER must be 'inline' or 'worker', got: {self.job_runner}")
+        
+        # Validate scheduler settings
+        for item in filter(None, (i.strip() for i in self.scheduler_tenant_weights.split(","))):
+            tenant, _, weight = item.rpartition(":")
+            if not tenant.strip() or not weight.strip().isdigit() or int(weight) < 1:
+                raise ValueError(f"SCHEDULER_TENANT_WEIGHTS entries must be '<tenant>:<weight >= 1>', got: {item}")
+        if self.scheduler_max_wait_seconds < 0:
+            raise ValueError(f"SCHEDULER_MAX_WAIT_SECONDS must be >= 0, got: {self.scheduler_max_wait_seconds}")
+        if self.scheduler_initial_seconds_per_page <= 0:
+            raise ValueError(f"SCHEDULER_INITIAL_SECONDS_PER_PAGE must be > 0, got: {self.scheduler_initial_seconds_per_page}")
         
         # Validate vision OCR detail
         if self.vision_ocr_detail not in ["low", "high", "auto"]:
             raise ValueError(f"VISION_OCR_DETAIL must be 'low', 'high', or 'auto', got: {self.vision_ocr_detail}")
         
+        # Validate vision image encoding
+        if self.vision_image_format not in ["jpeg", "webp", "png"]:
+            raise ValueError(f"VISION_IMAGE_FORMAT must be 'jpeg', 'webp' or 'png', got: {self.vision_image_format}")
+        if self.vision_image_color not in ["gray", "bilevel", "color"]:
+            raise ValueError(f"VISION_IMAGE_COLOR must be 'gray', 'bilevel' or 'color', got: {self.vision_image_color}")
+        
         # Set ChromaDB persist directory
         data_path = Path(self.data_dir)
         self.chroma_persist_directory = data_path / "chroma"
@@ -3,10 +3,20 @@ from typing import List
 from app.config import settings
 from app.openai_client import get_openai_client
 
+# OpenAI embedding model
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
 # Global model (lazy initialized for local provider)
 _embedding_model = None
 
 
+def get_embedding_model_name() -> str:
+    """Get the name of the embedding model in use (provider-qualified)"""
+    if settings.embeddings_provider == "openai":
+        return f"openai:{OPENAI_EMBEDDING_MODEL}"
+    return f"local:{settings.embedding_model}"
+
+
 def get_embedding_model():
     """Get or load local embedding model (SentenceTransformer)"""
     if settings.embeddings_provider != "local":
@@ -39,7 +49,7 @@ def generate_embeddings_openai(texts: List[str]) -> List[List[float]]:
     
     # Use text-embedding-3-small model
     response = client.embeddings.create(
-        model="text-embedding-3-small",
+        model=OPENAI_EMBEDDING_MODEL,
         input=texts
     )
     
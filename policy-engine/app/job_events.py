@@ -0,0 +1,74 @@
+"""
+In-process job progress events
+
+save_job publishes a snapshot event whenever a job record is written
+(status changes, coalesced progress flushes, errors); Server-Sent Events handlers subscribe per job. Publishing is
+thread-safe (jobs run in worker threads, subscribers live on the event loop).
+
+Events only reach subscribers in the same process. Stream handlers also poll
+the job store periodically, so progress written by another process still
+reaches the client.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, List, Tuple
+
+_subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_lock = threading.Lock()
+
+# Statuses after which no further events are sent for a job
+TERMINAL_STATUSES = {"READY", "FAILED", "OCR_FAILED", "OCR_NEEDED"}
+
+
+def job_event(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the event payload for a job record"""
+    return {
+        "jobId": job.get("jobId"),
+        "policyId": job.get("policyId"),
+        "status": job.get("status"),
+        "progress": job.get("progress", {}),
+        "error": job.get("error"),
+        "updatedAt": job.get("updatedAt"),
+    }
+
+
+def subscribe(job_id: str, max_queued: int = 100) -> asyncio.Queue:
+    """Subscribe to a job's events (call from the event loop)"""
+    q: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _subscribers.setdefault(job_id, []).append((loop, q))
+    return q
+
+
+def unsubscribe(job_id: str, q: asyncio.Queue):
+    """Remove a subscription"""
+    with _lock:
+        subs = _subscribers.get(job_id)
+        if not subs:
+            return
+        subs[:] = [(loop, sq) for loop, sq in subs if sq is not q]
+        if not subs:
+            del _subscribers[job_id]
+
+
+def _offer(q: asyncio.Queue, event: Dict[str, Any]):
+    # Slow consumers only need the latest state: drop the oldest event
+    if q.full():
+        try:
+            q.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    q.put_nowait(event)
+
+
+def publish(job_id: str, event: Dict[str, Any]):
+    """Publish an event to all subscribers of a job (callable from any thread)"""
+    with _lock:
+        subs = list(_subscribers.get(job_id, ()))
+    for loop, q in subs:
+        try:
+            loop.call_soon_threadsafe(_offer, q, event)
+        except RuntimeError:
+            # Loop closed
+            unsubscribe(job_id, q)
@@ -0,0 +1,389 @@
+"""
+Embedded job store (SQLite, WAL mode)
+
+Replaces the one-JSON-file-per-job directory. The full job record is kept as
+JSON; the fields used for lookups (tenantId, policyId, status, updatedAt) are
+stored in indexed columns so listing a tenant's or a policy's jobs does not
+parse every job ever created.
+
+Existing data/jobs/*.json files are imported once, the first time the store
+is opened on a data directory.
+
+Job ownership is tracked with leases (lease_owner, lease_expires_at): a
+worker claims a job atomically before running it and renews the lease while
+it runs. Only jobs whose lease is missing or expired can be claimed, so
+several server/worker processes can share one store without running the same
+job twice.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from app.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id     TEXT PRIMARY KEY,
+    tenant_id  TEXT,
+    policy_id  TEXT,
+    status     TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    data       TEXT NOT NULL,
+    lease_owner      TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_tenant ON jobs (tenant_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_policy ON jobs (tenant_id, policy_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires_at);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths: set[str] = set()
+
+
+def get_db_path() -> Path:
+    """Path of the job database for the configured data directory"""
+    return Path(settings.data_dir) / "jobs.db"
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get the calling thread's connection (one per thread per database)"""
+    db_path = get_db_path()
+    key = str(db_path.resolve())
+
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(key)
+    if conn is None:
+        conn = _connect(db_path)
+        conns[key] = conn
+
+    if key not in _initialized_paths:
+        with _init_lock:
+            if key not in _initialized_paths:
+                _add_lease_columns(conn)
+                conn.executescript(_SCHEMA)
+                migrate_json_jobs(conn, Path(settings.data_dir) / "jobs")
+                _initialized_paths.add(key)
+
+    return conn
+
+
+def _add_lease_columns(conn: sqlite3.Connection):
+    """Add the lease columns to job tables created before leases existed"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if not columns:
+        return  # new database, created by _SCHEMA
+    if "lease_owner" in columns and "lease_expires_at" in columns:
+        return
+
+    # API and worker processes can start together: take the write lock and re-check
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_owner" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+        if "lease_expires_at" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _row_values(job: Dict[str, Any]) -> tuple:
+    return (
+        job["jobId"],
+        job.get("tenantId"),
+        job.get("policyId"),
+        job.get("status"),
+        job.get("createdAt"),
+        job.get("updatedAt"),
+        json.dumps(job),
+    )
+
+
+_UPSERT_SQL = """
+INSERT INTO jobs (job_id, tenant_id, policy_id, status, created_at, updated_at, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(job_id) DO UPDATE SET
+    tenant_id = excluded.tenant_id,
+    policy_id = excluded.policy_id,
+    status = excluded.status,
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+
+def put_job(job: Dict[str, Any]):
+    """Insert or replace a job record"""
+    get_connection().execute(_UPSERT_SQL, _row_values(job))
+
+
+def get_job(job_id: str) -> Dict[str, Any] | None:
+    """Load a job record by ID"""
+    row = get_connection().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    try:
+        return json.loads(row[0])
+    except Exception:
+        return None
+
+
+def get_jobs(job_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Load several job records in one query. Returns job_id -> record (unknown IDs omitted)."""
+    job_ids = list(dict.fromkeys(job_ids))
+    if not job_ids:
+        return {}
+    sql = f"SELECT job_id, data FROM jobs WHERE job_id IN ({', '.join('?' for _ in job_ids)})"
+    jobs = {}
+    for job_id, data in get_connection().execute(sql, job_ids):
+        try:
+            jobs[job_id] = json.loads(data)
+        except Exception:
+            continue
+    return jobs
+
+
+def list_jobs(
+    tenant_id: str | None = None,
+    policy_id: str | None = None,
+    statuses: Iterable[str] | None = None,
+    limit: int | None = None
+) -> List[Dict[str, Any]]:
+    """
+    List job records using the indexed columns
+
+    Args:
+        tenant_id: Only jobs for this tenant
+        policy_id: Only jobs for this policy
+        statuses: Only jobs in one of these statuses
+        limit: Only the most recently updated N jobs
+
+    Returns:
+        Job records ordered by updatedAt (oldest first)
+    """
+    clauses = []
+    params: List[Any] = []
+    if tenant_id is not None:
+        clauses.append("tenant_id = ?")
+        params.append(tenant_id)
+    if policy_id is not None:
+        clauses.append("policy_id = ?")
+        params.append(policy_id)
+    if statuses is not None:
+        statuses = list(statuses)
+        if not statuses:
+            return []
+        clauses.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+
+    sql = "SELECT data, updated_at FROM jobs"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if limit is not None:
+        sql = f"SELECT data, updated_at FROM ({sql} ORDER BY updated_at DESC LIMIT ?)"
+        params.append(limit)
+    sql += " ORDER BY updated_at"
+
+    jobs = []
+    for data, _ in get_connection().execute(sql, params):
+        try:
+            jobs.append(json.loads(data))
+        except Exception:
+            continue
+    return jobs
+
+
+def queue_snapshot(queued_status: str) -> Dict[str, Any]:
+    """
+    Store-wide queue state, for processes that do not run the scheduler themselves
+
+    Args:
+        queued_status: Status of jobs waiting for a worker
+
+    Returns:
+        {"queued": n, "queuedByTenant": {tenant: n}, "running": jobs under a live lease}
+    """
+    conn = get_connection()
+    per_tenant = {
+        tenant: n for tenant, n in conn.execute(
+            "SELECT tenant_id, COUNT(*) FROM jobs WHERE status = ? GROUP BY tenant_id", (queued_status,)
+        )
+    }
+    running = conn.execute(
+        "SELECT COUNT(*) FROM jobs WHERE lease_owner IS NOT NULL AND lease_expires_at >= ?", (time.time(),)
+    ).fetchone()[0]
+    return {"queued": sum(per_tenant.values()), "queuedByTenant": per_tenant, "running": running}
+
+
+def queued_ahead(job_id: str, queued_status: str) -> tuple[int, int] | None:
+    """
+    Arrival-order position of a waiting job among all waiting jobs
+
+    Returns:
+        (jobs queued before it, jobs queued in total), or None if the job is not waiting
+    """
+    arrival = "COALESCE(json_extract(data, '$.queue.enqueuedAt'), json_extract(data, '$.createdAt'))"
+    conn = get_connection()
+    row = conn.execute(
+        f"SELECT {arrival} FROM jobs WHERE job_id = ? AND status = ?", (job_id, queued_status)
+    ).fetchone()
+    if row is None:
+        return None
+    ahead, total = conn.execute(
+        f"SELECT SUM(CASE WHEN {arrival} < ? THEN 1 ELSE 0 END), COUNT(*) FROM jobs WHERE status = ?",
+        (row[0] or "", queued_status),
+    ).fetchone()
+    return int(ahead or 0), int(total)
+
+
+def delete_job(job_id: str) -> bool:
+    """Delete a job record. Returns True if a record was removed."""
+    cur = get_connection().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+    return cur.rowcount > 0
+
+
+def _in_clause(values: List[str]) -> str:
+    return f"({', '.join('?' for _ in values)})"
+
+
+def claim_job(job_id: str, owner: str, lease_seconds: float, statuses: Iterable[str]) -> bool:
+    """
+    Atomically take the lease on a job
+
+    Succeeds only if the job is in one of the given statuses and its lease is
+    free, expired, or already held by this owner.
+
+    Returns:
+        True if the caller now owns the job
+    """
+    statuses = list(statuses)
+    now = time.time()
+    cur = get_connection().execute(
+        f"""UPDATE jobs SET lease_owner = ?, lease_expires_at = ?
+            WHERE job_id = ? AND status IN {_in_clause(statuses)}
+            AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires_at < ?)""",
+        (owner, now + lease_seconds, job_id, *statuses, owner, now),
+    )
+    return cur.rowcount > 0
+
+
+class LeaseLostError(Exception):
+    """The job's lease moved to another owner; the current run must stop writing"""
+
+
+def get_lease_owner(job_id: str) -> str | None:
+    """Current lease owner of a job (None if unleased or unknown)"""
+    row = get_connection().execute("SELECT lease_owner FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return row[0] if row else None
+
+
+def renew_lease(job_id: str, owner: str, lease_seconds: float) -> bool:
+    """Extend a lease held by owner. Returns False if the lease was lost."""
+    cur = get_connection().execute(
+        "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND lease_owner = ?",
+        (time.time() + lease_seconds, job_id, owner),
+    )
+    return cur.rowcount > 0
+
+
+def release_lease(job_id: str, owner: str):
+    """Give up a lease held by owner"""
+    get_connection().execute(
+        "UPDATE jobs SET lease_owner = NULL, lease_expires_at = NULL WHERE job_id = ? AND lease_owner = ?",
+        (job_id, owner),
+    )
+
+
+def list_claimable_jobs(statuses: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Jobs in the given statuses with no lease or an expired lease
+
+    Returns:
+        Job records ordered by updatedAt (oldest first)
+    """
+    statuses = list(statuses)
+    if not statuses:
+        return []
+    sql = f"""SELECT data FROM jobs WHERE status IN {_in_clause(statuses)}
+              AND (lease_owner IS NULL OR lease_expires_at < ?) ORDER BY updated_at"""
+    jobs = []
+    for (data,) in get_connection().execute(sql, (*statuses, time.time())):
+        try:
+            jobs.append(json.loads(data))
+        except Exception:
+            continue
+    return jobs
+
+
+def migrate_json_jobs(conn: sqlite3.Connection, jobs_dir: Path) -> int:
+    """
+    One-shot import of legacy data/jobs/*.json files
+
+    Runs once per database (recorded in store_meta); the JSON files are left
+    in place as a backup and are no longer read afterwards.
+
+    Returns:
+        Number of jobs imported
+    """
+    done = conn.execute("SELECT value FROM store_meta WHERE key = 'json_jobs_migrated'").fetchone()
+    if done is not None:
+        return 0
+
+    imported = 0
+    # API and worker processes can start together: take the write lock first and
+    # re-check the marker so only one of them imports
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        done = conn.execute("SELECT value FROM store_meta WHERE key = 'json_jobs_migrated'").fetchone()
+        if done is not None:
+            conn.execute("COMMIT")
+            return 0
+        if jobs_dir.exists():
+            for job_file in jobs_dir.glob("*.json"):
+                try:
+                    with open(job_file, "r") as f:
+                        job = json.load(f)
+                    if not job.get("jobId"):
+                        continue
+                    conn.execute(_UPSERT_SQL, _row_values(job))
+                    imported += 1
+                except Exception as e:
+                    print(f"[JobStore] WARNING: Skipping unreadable job file {job_file.name}: {e}")
+        conn.execute(
+            "INSERT OR IGNORE INTO store_meta (key, value) VALUES ('json_jobs_migrated', ?)",
+            (str(imported),)
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if imported:
+        print(f"[JobStore] Migrated {imported} job file(s) from {jobs_dir}")
+    return imported
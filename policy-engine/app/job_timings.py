@@ -0,0 +1,201 @@
+"""
+Per-job timing breakdown
+
+process_job records wall time per stage (hashing, text extraction, OCR,
+chunking, embedding, upsert, ...) and individual latencies (OCR per page and
+provider, embedding batches, upsert batches). The summary is stored in the job
+record under "timings"; aggregate_timings() combines many jobs for the
+metrics endpoint. Counters (e.g. OCR cache hits/misses) are kept alongside.
+
+Safe to use from several threads (streaming pipeline stages, OCR callbacks).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List
+
+from app.ocr_cache import cache_summary
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_stats(samples: List[float]) -> Dict[str, Any]:
+    """count/total/mean/p50/p95/max of latency samples (seconds)"""
+    values = sorted(samples)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "totalSeconds": round(total, 3),
+        "meanSeconds": round(total / len(values), 3) if values else 0.0,
+        "p50Seconds": round(_percentile(values, 50), 3),
+        "p95Seconds": round(_percentile(values, 95), 3),
+        "maxSeconds": round(values[-1], 3) if values else 0.0,
+    }
+
+
+class JobTimings:
+    """Collects stage wall times and latency samples for one job"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stages: Dict[str, float] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._pages: Dict[int, Dict[str, Any]] = {}
+        self._counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str, metric: str | None = None):
+        """
+        Time a block as (part of) a stage; repeated blocks accumulate
+
+        Args:
+            name: Stage name
+            metric: Also record the block's duration as a latency sample under this name
+        """
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            seconds = time.monotonic() - t0
+            self.add_stage(name, seconds)
+            if metric is not None:
+                self.record(metric, seconds)
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def record(self, metric: str, seconds: float):
+        """Record one latency sample, e.g. record("embedding_batch", 1.2)"""
+        with self._lock:
+            self._latencies.setdefault(metric, []).append(seconds)
+
+    def count(self, name: str, n: int = 1):
+        """Increment a counter, e.g. count("ocr_cache.hit.tesseract")"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def record_page_ocr(self, page_num: int, provider: str, seconds: float, lang: str | None = None):
+        """
+        Record the OCR latency of one page (also counted under "ocr_page.<provider>")
+
+        With lang (Tesseract languages) the sample is also counted under
+        "ocr_page.<provider>.<lang>" to compare throughput per language set.
+        """
+        self.record(f"ocr_page.{provider}", seconds)
+        if lang is not None:
+            self.record(f"ocr_page.{provider}.{lang}", seconds)
+        with self._lock:
+            self._pages[page_num] = {"provider": provider, "seconds": round(seconds, 3)}
+            if lang is not None:
+                self._pages[page_num]["lang"] = lang
+
+    def summary(self, include_pages: bool = True) -> Dict[str, Any]:
+        """JSON-serializable breakdown stored in the job record"""
+        with self._lock:
+            stages = dict(self._stages)
+            latencies = {name: list(samples) for name, samples in self._latencies.items()}
+            pages = dict(self._pages)
+            counters = dict(self._counters)
+
+        total = time.monotonic() - self._started
+        result: Dict[str, Any] = {
+            "totalSeconds": round(total, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+            "latencies": {name: latency_stats(samples) for name, samples in latencies.items()},
+        }
+        if stages:
+            result["slowestStage"] = max(stages, key=stages.get)
+        if counters:
+            result["counters"] = counters
+            ocr_cache = cache_summary(counters)
+            if ocr_cache:
+                result["ocrCache"] = ocr_cache
+        if include_pages and pages:
+            result["pages"] = {str(n): pages[n] for n in sorted(pages)}
+        return result
+
+
+def summarize_job_timings(timings: Dict[str, Any] | None, max_pages: int = 10) -> Dict[str, Any] | None:
+    """Compact view of a job's timings for status responses (slowest pages only)"""
+    if not timings:
+        return timings
+    summary = {k: v for k, v in timings.items() if k != "pages"}
+    pages = timings.get("pages") or {}
+    if pages:
+        slowest = sorted(pages.items(), key=lambda item: item[1].get("seconds", 0), reverse=True)[:max_pages]
+        summary["slowestPages"] = [{"page": int(n), **info} for n, info in slowest]
+    return summary
+
+
+def aggregate_timings(jobs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the timings of many jobs
+
+    Returns:
+        {"jobs", "totalSeconds", "stages": {name: {totalSeconds, meanSeconds, share}},
+         "latencies": {name: {count, totalSeconds, meanSeconds, maxSeconds, p95SecondsMax}},
+         "counters", "ocrCache", "bottleneck"}
+    """
+    n_jobs = 0
+    total_seconds = 0.0
+    stages: Dict[str, Dict[str, float]] = {}
+    latencies: Dict[str, Dict[str, float]] = {}
+    counters: Dict[str, int] = {}
+
+    for job in jobs:
+        timings = job.get("timings")
+        if not timings:
+            continue
+        n_jobs += 1
+        total_seconds += timings.get("totalSeconds", 0.0)
+        for name, seconds in (timings.get("stages") or {}).items():
+            entry = stages.setdefault(name, {"totalSeconds": 0.0, "jobs": 0})
+            entry["totalSeconds"] += seconds
+            entry["jobs"] += 1
+        for name, stats in (timings.get("latencies") or {}).items():
+            entry = latencies.setdefault(
+                name, {"count": 0, "totalSeconds": 0.0, "maxSeconds": 0.0, "p95SecondsMax": 0.0}
+            )
+            entry["count"] += stats.get("count", 0)
+            entry["totalSeconds"] += stats.get("totalSeconds", 0.0)
+            entry["maxSeconds"] = max(entry["maxSeconds"], stats.get("maxSeconds", 0.0))
+            entry["p95SecondsMax"] = max(entry["p95SecondsMax"], stats.get("p95Seconds", 0.0))
+        for name, n in (timings.get("counters") or {}).items():
+            counters[name] = counters.get(name, 0) + n
+
+    stage_total = sum(entry["totalSeconds"] for entry in stages.values())
+    stage_summary = {
+        name: {
+            "totalSeconds": round(entry["totalSeconds"], 3),
+            "meanSeconds": round(entry["totalSeconds"] / entry["jobs"], 3),
+            "share": round(entry["totalSeconds"] / stage_total, 3) if stage_total > 0 else 0.0,
+        }
+        for name, entry in sorted(stages.items(), key=lambda item: item[1]["totalSeconds"], reverse=True)
+    }
+    latency_summary = {
+        name: {
+            "count": entry["count"],
+            "totalSeconds": round(entry["totalSeconds"], 3),
+            "meanSeconds": round(entry["totalSeconds"] / entry["count"], 3) if entry["count"] else 0.0,
+            "maxSeconds": round(entry["maxSeconds"], 3),
+            "p95SecondsMax": round(entry["p95SecondsMax"], 3),
+        }
+        for name, entry in sorted(latencies.items())
+    }
+
+    return {
+        "jobs": n_jobs,
+        "totalSeconds": round(total_seconds, 3),
+        "stages": stage_summary,
+        "latencies": latency_summary,
+        "counters": counters,
+        "ocrCache": cache_summary(counters),
+        "bottleneck": next(iter(stage_summary), None),
+    }
@@ -1,35 +1,42 @@
 """Job management and background processing"""
-import json
 import uuid
 import asyncio
 import hashlib
 import os
-
-try:
-    import pytesseract  # type: ignore
-except Exception:
-    pytesseract = None
+import threading
+import time
 
 from pathlib import Path
 from typing import Dict, Any, List
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 
-from app.storage import get_file_hash
+from app import job_store, job_events
+from app.storage import get_file_hash_from_path
 from app.config import settings
 from app.manifest import (
-    load_manifest, save_manifest, create_manifest,
+    load_manifest, create_manifest,
     update_manifest_page, update_manifest_chunks, set_manifest_status,
-    should_skip_page
+    should_skip_page, record_ocr_decisions, record_ocr_languages, record_ocr_plans, set_page_info
 )
-from app.text_extract import extract_text_from_pdf, convert_from_path
+from app.text_extract import extract_text_from_pdf, convert_from_path, get_text_extract_engine
 from app.ocr_hybrid import extract_all_pages_hybrid
-from app.ocr_vision import vision_ocr_pdf_page
+from app.ocr_vision import vision_ocr_pdf_page, vision_ocr_pdf_pages
 from app.chunking_enhanced import build_clean_chunks_from_pages
-from app.embeddings import generate_embeddings
-from app.vector_store import upsert_chunks, delete_policy_chunks
+from app.progress_writer import ProgressWriter
+from app.job_timings import JobTimings
+from app.pipeline import StreamingIndexPipeline
+from app.embeddings import generate_embeddings, get_embedding_model_name
+from app.artifact_store import ArtifactWriter, get_artifact_variant, load_artifacts, save_artifacts, restore_artifacts
+from app.vector_store import upsert_chunks, delete_policy_chunks, delete_page_chunks
+from app.retry import call_with_retries
 from app.openai_client import get_openai_client
 from app.ocr import extract_text_from_pdf_page
+from app import ocr_cache, tesseract_engine
+from app.page_raster import release_rasterizer
+from app.page_classifier import classify_pages, summarize_decisions
+from app.page_layout import plan_ocr_pages, summarize_plans
+from app.script_detect import LANG_BOTH, detect_page_languages, summarize_languages
+from app.ocr_pool import ocr_pool_enabled, run_pages_parallel, tesseract_page_task
 
 
 def _normalize_text_for_comparison(text: str) -> str:
@@ -75,25 +82,78 @@ def _detect_duplicate_ocr_pages(text_pages: List[str], similarity_threshold: int
     return False, ""
 
 
+def _save_ocr_page_text(
+    text_dir: Path,
+    manifest: Dict[str, Any],
+    progress: ProgressWriter,
+    checkpoint_pages: set,
+    page_num: int,
+    page_text: str
+):
+    """
+    Write an OCR'd page to text/page_N.txt as soon as it finishes (pool/hybrid callbacks)
+    
+    The page is also checkpointed in the manifest so an interrupted job resumes after it.
+    Nothing is written once the job's lease was lost.
+    """
+    if not page_text or not page_text.strip():
+        return
+    if progress.lease_lost.is_set():
+        return
+    if page_num in checkpoint_pages:
+        return
+    text_dir.mkdir(parents=True, exist_ok=True)
+    text_path = text_dir / f"page_{page_num}.txt"
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(page_text)
+    update_manifest_page(manifest, page_num, "COMPLETED", str(text_path), True, len(page_text.splitlines()))
+    progress.manifest_changed()
+
+
+def _get_checkpoint_pages(
+    manifest: Dict[str, Any],
+    file_hash: str,
+    page_numbers: List[int],
+    reprocess_mode: str | None,
+    resumed_since: str | None
+) -> set:
+    """
+    Pages that were already completed and can be skipped
+    
+    Regular and "failed_pages" jobs skip any page completed for this file. Other
+    reprocess jobs redo every page, except pages completed by an earlier
+    (interrupted) attempt of the same job.
+    """
+    if reprocess_mode in (None, "failed_pages"):
+        return {n for n in page_numbers if should_skip_page(manifest, n, file_hash)}
+    if resumed_since is not None:
+        return {n for n in page_numbers if should_skip_page(manifest, n, file_hash, completed_since=resumed_since)}
+    return set()
+
+
+def _feed_pipeline_from_disk(pipeline: StreamingIndexPipeline, text_dir: Path, page_num: int):
+    """Send an already-completed page (checkpoint) through the streaming pipeline"""
+    text_path = text_dir / f"page_{page_num}.txt"
+    if text_path.exists():
+        pipeline.add_page(page_num, text_path.read_text(encoding="utf-8"))
+
+
 def build_chunks_from_pages(
     tenant_id: str,
     policy_id: str,
     filename: str,
     chunk_size_chars: int = 2000,
-    overlap_chars: int = 300
+    overlap_chars: int = 300,
+    only_pages: List[int] | None = None
 ) -> List[Dict[str, Any]]:
     """
     Build chunks from saved text pages with duplicate header removal and cleaning
     """
     return build_clean_chunks_from_pages(
-        tenant_id, policy_id, filename, chunk_size_chars, overlap_chars
+        tenant_id, policy_id, filename, chunk_size_chars, overlap_chars, only_pages=only_pages
     )
 
 
-# Job executor pool
-executor = ThreadPoolExecutor(max_workers=2)
-
-
 class JobStatus:
     QUEUED = "QUEUED"
     PROCESSING = "PROCESSING"
@@ -108,7 +168,8 @@ def create_job(
     policy_id: str,
     filename: str,
     reprocess_mode: str | None = None,
-    ocr_preset: str | None = None
+    ocr_preset: str | None = None,
+    file_hash: str | None = None
 ) -> str:
     """Create a new job and return job_id"""
     job_id = str(uuid.uuid4())
@@ -116,7 +177,9 @@ def create_job(
     # Check OCR availability (pdf2image/poppler)
     ocr_available = convert_from_path is not None
 
-    # Default OCR preset from env var
+    # Default OCR preset from env var; an explicit preset (job or OCR_PRESET) overrides
+    # the per-page presets of OCR_AUTO_LAYOUT
+    ocr_preset_explicit = ocr_preset is not None or "OCR_PRESET" in os.environ
     if ocr_preset is None:
         ocr_preset = os.getenv("OCR_PRESET", "normal_ocr")
     if ocr_preset not in ["normal_ocr", "table_ocr"]:
@@ -132,8 +195,10 @@ def create_job(
         "ocrAttempted": False,
         "ocrAvailable": ocr_available,
         "ocrPreset": ocr_preset,
+        "ocrPresetExplicit": ocr_preset_explicit,
         "error": None,
         "reprocessMode": reprocess_mode,  # "ocr_only" | "full" | None
+        "fileHash": file_hash,  # SHA256 computed at upload time (None => computed during processing)
         "createdAt": datetime.utcnow().isoformat(),
         "updatedAt": datetime.utcnow().isoformat(),
     }
@@ -143,29 +208,34 @@ def create_job(
 
 
 def save_job(job_id: str, job_data: Dict[str, Any]):
-    """Save job data to disk"""
-    jobs_dir = Path(settings.data_dir) / "jobs"
-    jobs_dir.mkdir(parents=True, exist_ok=True)
-    job_path = jobs_dir / f"{job_id}.json"
+    """Save job data to the job store"""
+    job_data["jobId"] = job_id
     job_data["updatedAt"] = datetime.utcnow().isoformat()
-
-    with open(job_path, "w") as f:
-        json.dump(job_data, f, indent=2)
+    job_store.put_job(job_data)
+    job_events.publish(job_id, job_events.job_event(job_data))
 
 
 def load_job(job_id: str) -> Dict[str, Any] | None:
-    """Load job data from disk"""
-    jobs_dir = Path(settings.data_dir) / "jobs"
-    job_path = jobs_dir / f"{job_id}.json"
-    if not job_path.exists():
-        return None
+    """Load job data from the job store"""
     try:
-        with open(job_path, "r") as f:
-            return json.load(f)
+        return job_store.get_job(job_id)
     except Exception:
         return None
 
 
+def load_jobs(job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Load several jobs at once (job_id -> job data, unknown IDs omitted)"""
+    try:
+        return job_store.get_jobs(job_ids)
+    except Exception:
+        return {}
+
+
+def delete_job(job_id: str) -> bool:
+    """Delete a job from the job store"""
+    return job_store.delete_job(job_id)
+
+
 def update_job_progress(
     job_id: str,
     pages_total: int | None = None,
@@ -176,6 +246,9 @@ def update_job_progress(
     error: str | None = None,
     ocr_attempted: bool | None = None,
     ocr_available: bool | None = None,
+    file_hash: str | None = None,
+    pipeline_stats: Dict[str, Any] | None = None,
+    timings: Dict[str, Any] | None = None,
 ):
     """Update job progress with optional fields"""
     job = load_job(job_id)
@@ -198,6 +271,12 @@ def update_job_progress(
         job["ocrAttempted"] = ocr_attempted
     if ocr_available is not None:
         job["ocrAvailable"] = ocr_available
+    if file_hash is not None:
+        job["fileHash"] = file_hash
+    if pipeline_stats is not None:
+        job["pipelineStats"] = pipeline_stats
+    if timings is not None:
+        job["timings"] = timings
 
     if status == JobStatus.READY and job["progress"].get("chunksTotal", 0) == 0:
         print("[Job] WARNING: Cannot set READY status with chunksTotal=0")
@@ -208,8 +287,31 @@ def update_job_progress(
     save_job(job_id, job)
 
 
-def process_job(job_id: str):
-    """Process a job (runs in background thread)"""
+def process_job(job_id: str, lease_owner: str | None = None, lease_lost: threading.Event | None = None):
+    """
+    Process a job (runs in background thread)
+
+    Args:
+        job_id: Job to run
+        lease_owner: Lease held on the job (scheduler worker id); progress writes stop once it moved elsewhere
+        lease_lost: Set by the scheduler's heartbeat when the lease could not be renewed
+    """
+    timings = JobTimings()
+    # OCR cache hits/misses during this job are counted into its timings
+    with ocr_cache.track(timings):
+        _process_job(job_id, timings, lease_owner, lease_lost)
+
+
+def _process_job(
+    job_id: str,
+    timings: JobTimings,
+    lease_owner: str | None = None,
+    lease_lost: threading.Event | None = None
+):
+    progress: ProgressWriter | None = None
+    pipeline: StreamingIndexPipeline | None = None
+    artifact_writer: ArtifactWriter | None = None
+    file_path: Path | None = None
     try:
         job = load_job(job_id)
         if not job:
@@ -219,9 +321,17 @@ def process_job(job_id: str):
         tenant_id = job["tenantId"]
         policy_id = job["policyId"]
         filename = job["filename"]
-        reprocess_mode = job.get("reprocessMode")  # "ocr_only" | "full" | None
+        reprocess_mode = job.get("reprocessMode")  # "ocr_only" | "full" | "failed_pages" | None
 
-        update_job_progress(job_id, status=JobStatus.PROCESSING)
+        # Still PROCESSING when claimed => a previous attempt was interrupted; resume from checkpoints
+        resumed_since = job.get("startedAt") if job.get("status") == JobStatus.PROCESSING else None
+        if resumed_since:
+            print(f"[Job] Resuming job={job_id} (attempt {job.get('attempts', 1) + 1}, started {resumed_since})")
+        else:
+            job["startedAt"] = datetime.utcnow().isoformat()
+        job["attempts"] = job.get("attempts", 0) + 1
+        job["status"] = JobStatus.PROCESSING
+        save_job(job_id, job)
 
         data_dir = Path(settings.data_dir)
         policy_dir = data_dir / tenant_id / policy_id
@@ -230,13 +340,17 @@ def process_job(job_id: str):
         if not file_path.exists():
             raise Exception(f"File not found: {filename}")
 
-        with open(file_path, "rb") as f:
-            file_hash = get_file_hash(f.read())
+        # Hash is computed while streaming the upload; only hash here for legacy jobs
+        file_hash = job.get("fileHash")
+        if not file_hash:
+            with timings.stage("hash"):
+                file_hash = get_file_hash_from_path(file_path, settings.ingest_chunk_size)
+            update_job_progress(job_id, file_hash=file_hash)
 
         manifest = load_manifest(tenant_id, policy_id)
 
         if reprocess_mode is None:
-            if manifest and manifest.get("fileHash") == file_hash:
+            if manifest and manifest.get("fileHash") == file_hash and manifest.get("status") == "READY":
                 all_completed = all(p.get("status") == "COMPLETED" for p in manifest.get("pages", []))
                 if all_completed:
                     update_job_progress(job_id, status=JobStatus.READY)
@@ -249,6 +363,61 @@ def process_job(job_id: str):
                 delete_policy_chunks(tenant_id, policy_id)
                 manifest = create_manifest(tenant_id, policy_id, filename, file_hash)
 
+        # Job/manifest writes are coalesced; status changes flush immediately
+        progress = ProgressWriter(
+            job_id, tenant_id, policy_id, manifest, timings=timings,
+            lease_owner=lease_owner, lease_lost=lease_lost
+        )
+
+        # Identical file already processed with the same settings => reuse its artifacts
+        text_engine = get_text_extract_engine()
+        # With OCR_AUTO_LAYOUT the preset is chosen per page unless the job set one explicitly,
+        # so the variant names the layout routing (and the fixed preset, if any)
+        job_preset = job.get("ocrPreset") or "normal_ocr"
+        # Jobs created before ocrPresetExplicit existed: only a non-default preset was a choice
+        fixed_preset = job_preset if job.get("ocrPresetExplicit", job_preset != "normal_ocr") else None
+        if settings.ocr_auto_layout:
+            ocr_preset_variant = f"auto_layout:{settings.ocr_layout_providers}"
+            if fixed_preset:
+                ocr_preset_variant += f":{fixed_preset}"
+        else:
+            ocr_preset_variant = job_preset
+        artifact_variant = get_artifact_variant(
+            settings.ocr_provider, ocr_preset_variant, get_embedding_model_name(), text_engine
+        )
+        if reprocess_mode is None and settings.artifact_store_enabled:
+            artifacts = load_artifacts(file_hash, artifact_variant)
+            if artifacts and artifacts["chunks"]:
+                print(f"[Artifacts] Reusing artifacts for hash={file_hash[:12]} policyId={policy_id}")
+                text_dir = data_dir / tenant_id / policy_id / "text"
+                with timings.stage("artifact_restore"):
+                    restored_chunks = restore_artifacts(artifacts, tenant_id, policy_id, filename, text_dir)
+
+                delete_policy_chunks(tenant_id, policy_id)
+                with timings.stage("upsert", metric="upsert_batch"):
+                    upsert_chunks(tenant_id, policy_id, restored_chunks, batch_size=200)
+
+                for page in artifacts["meta"].get("pages", []):
+                    page_num = page["pageNumber"]
+                    update_manifest_page(
+                        manifest, page_num, "COMPLETED", str(text_dir / f"page_{page_num}.txt"),
+                        page.get("ocrUsed", False), page.get("lineCount", 0)
+                    )
+                update_manifest_chunks(manifest, len(restored_chunks))
+                set_manifest_status(manifest, "READY")
+                progress.manifest_changed(flush=True)
+
+                pages_total = artifacts["meta"].get("pagesTotal", 0)
+                progress.update(
+                    status=JobStatus.READY,
+                    pages_total=pages_total,
+                    pages_done=pages_total,
+                    chunks_total=len(restored_chunks),
+                    chunks_done=len(restored_chunks),
+                    error=None,
+                )
+                return
+
         # If full reprocess and text pages exist => skip OCR and rebuild chunks
         text_dir = data_dir / tenant_id / policy_id / "text"
         text_pages_list = list(text_dir.glob("page_*.txt")) if text_dir.exists() else []
@@ -264,46 +433,49 @@ def process_job(job_id: str):
             delete_policy_chunks(tenant_id, policy_id)
 
             pages_total = n_text_pages
-            update_job_progress(job_id, pages_total=pages_total, pages_done=pages_total)
+            progress.update(pages_total=pages_total, pages_done=pages_total)
 
-            all_chunks = build_chunks_from_pages(tenant_id, policy_id, filename, 2000, 300)
+            with timings.stage("chunking"):
+                all_chunks = build_chunks_from_pages(tenant_id, policy_id, filename, 2000, 300)
             total_chunks = len(all_chunks)
             print(f"[REPROCESS] Built {total_chunks} chunks from {pages_total} text pages")
 
             if total_chunks == 0:
-                update_job_progress(job_id, status=JobStatus.FAILED, chunks_total=0, error="No chunks created from text pages")
+                progress.update(status=JobStatus.FAILED, chunks_total=0, error="No chunks created from text pages")
                 return
 
-            update_job_progress(job_id, chunks_total=total_chunks, chunks_done=0)
+            progress.update(chunks_total=total_chunks, chunks_done=0)
 
             embedding_batch_size = 50
             chunks_done = 0
             for batch_start in range(0, len(all_chunks), embedding_batch_size):
+                progress.check_lease()
                 batch = all_chunks[batch_start: batch_start + embedding_batch_size]
                 batch_texts = [c["text"] for c in batch]
 
                 print(f"[REPROCESS] Generating embeddings for batch {batch_start // embedding_batch_size + 1} ({len(batch_texts)} chunks)")
-                batch_embeddings = generate_embeddings(batch_texts)
+                with timings.stage("embedding", metric="embedding_batch"):
+                    batch_embeddings = generate_embeddings(batch_texts)
 
                 chunks_to_upsert = []
                 for chunk_dict, emb in zip(batch, batch_embeddings):
                     chunk_dict["embedding"] = emb
                     chunks_to_upsert.append(chunk_dict)
 
-                upsert_chunks(tenant_id, policy_id, chunks_to_upsert, batch_size=200)
+                with timings.stage("upsert", metric="upsert_batch"):
+                    upsert_chunks(tenant_id, policy_id, chunks_to_upsert, batch_size=200)
                 chunks_done += len(chunks_to_upsert)
 
-                update_job_progress(job_id, chunks_done=chunks_done)
+                progress.update(chunks_done=chunks_done)
                 update_manifest_chunks(manifest, chunks_done)
-                save_manifest(tenant_id, policy_id, manifest)
+                progress.manifest_changed()
 
                 print(f"[REPROCESS] Indexed {chunks_done}/{total_chunks} chunks")
 
             set_manifest_status(manifest, "READY")
-            save_manifest(tenant_id, policy_id, manifest)
+            progress.manifest_changed(flush=True)
 
-            update_job_progress(
-                job_id,
+            progress.update(
                 status=JobStatus.READY,
                 pages_total=pages_total,
                 pages_done=pages_total,
@@ -315,8 +487,8 @@ def process_job(job_id: str):
             return
 
         # OCR provider selection
-        ocr_provider_config = settings.ocr_provider  # "vision" | "tesseract" | "auto"
-        tesseract_available = pytesseract is not None and convert_from_path is not None
+        ocr_provider_config = settings.ocr_provider  # "vision" | "tesseract" | "tesserocr" | "auto"
+        tesseract_available = tesseract_engine.engine_available() and convert_from_path is not None
         vision_available = get_openai_client() is not None
 
         if ocr_provider_config == "vision":
@@ -324,11 +496,12 @@ def process_job(job_id: str):
             ocr_available = vision_available
             if not vision_available:
                 raise Exception("OCR_PROVIDER=vision but OpenAI client not available (check OPENAI_API_KEY)")
-        elif ocr_provider_config == "tesseract":
+        elif ocr_provider_config in ("tesseract", "tesserocr"):
+            # Both run Tesseract; "tesserocr" only swaps the backend (see app.tesseract_engine)
             selected_ocr_provider = "tesseract"
             ocr_available = tesseract_available
             if not tesseract_available:
-                raise Exception("OCR_PROVIDER=tesseract but prerequisites missing (pytesseract/pdf2image)")
+                raise Exception(f"OCR_PROVIDER={ocr_provider_config} but prerequisites missing (pytesseract or tesserocr/pdf2image)")
         else:
             if vision_available:
                 selected_ocr_provider = "vision"
@@ -340,73 +513,193 @@ def process_job(job_id: str):
                 selected_ocr_provider = None
                 ocr_available = False
 
-        print(f"[OCR] Provider: {selected_ocr_provider} (config={ocr_provider_config}, vision_available={vision_available}, tesseract_available={tesseract_available})")
+        print(f"[OCR] Provider: {selected_ocr_provider} (config={ocr_provider_config}, vision_available={vision_available}, tesseract_available={tesseract_available}, tesseract_backend={tesseract_engine.active_backend()})")
 
         ocr_attempted = False
-        update_job_progress(job_id, ocr_available=ocr_available)
+        progress.update(ocr_available=ocr_available)
 
-        pages_info = extract_text_from_pdf(file_path)
+        with timings.stage("extract"):
+            pages_info = extract_text_from_pdf(file_path, engine=text_engine)
         total_pages = len(pages_info)
+
+        # Decide per page whether OCR is needed (structural signals instead of a character threshold)
+        with timings.stage("classify"):
+            ocr_decisions = classify_pages(file_path, pages_info)
+        pages_info = [(n, text, ocr_decisions[n]["needsOcr"]) for n, text, _ in pages_info]
         any_needs_ocr = any(needs_ocr for _, _, needs_ocr in pages_info)
+        record_ocr_decisions(manifest, ocr_decisions, summarize_decisions(ocr_decisions))
 
         print(f"[REPROCESS] mode={reprocess_mode or 'regular'} policyId={policy_id} pagesTotal={total_pages}")
-        update_job_progress(job_id, pages_total=total_pages)
+        progress.update(pages_total=total_pages)
 
         set_manifest_status(manifest, "PROCESSING")
-        save_manifest(tenant_id, policy_id, manifest)
+        progress.manifest_changed(flush=True)
+
+        checkpoint_pages = _get_checkpoint_pages(
+            manifest, file_hash, [n for n, _, _ in pages_info], reprocess_mode, resumed_since
+        )
+        if checkpoint_pages:
+            print(f"[Job] {len(checkpoint_pages)}/{total_pages} pages already completed, skipping them")
 
         total_chunks_processed = 0
         pages_done = 0
         pages_needing_ocr: List[int] = []
         ocr_text_pages: List[str] = []
 
-        # Hybrid OCR (Tesseract only)
+        # Per-page OCR plan: layout -> preset, render DPI and provider
+        ocr_plans: Dict[int, Dict[str, Any]] = {}
+        if any_needs_ocr and ocr_available:
+            with timings.stage("layout"):
+                ocr_plans = plan_ocr_pages(
+                    file_path,
+                    [n for n, _, needs_ocr in pages_info if needs_ocr and n not in checkpoint_pages],
+                    selected_ocr_provider, job_preset, fixed_preset=fixed_preset,
+                    available_providers={"vision": vision_available, "tesseract": tesseract_available}
+                )
+            record_ocr_plans(manifest, ocr_plans, summarize_plans(ocr_plans))
+        tesseract_pages = [n for n, plan in ocr_plans.items() if plan["provider"] == "tesseract"]
+        vision_pages = [n for n, plan in ocr_plans.items() if plan["provider"] == "vision"]
+        page_dpis = {n: plan["dpi"] for n, plan in ocr_plans.items()}
+        page_presets = {n: plan["preset"] for n, plan in ocr_plans.items()}
+
+        # Tesseract languages per OCR page (eng / ara / eng+ara instead of always both models)
+        page_langs: Dict[int, str] = {}
+        if tesseract_pages:
+            with timings.stage("script_detect"):
+                lang_detections = detect_page_languages(file_path, pages_info, tesseract_pages)
+            page_langs = {n: detection["lang"] for n, detection in lang_detections.items()}
+            record_ocr_languages(manifest, lang_detections, summarize_languages(lang_detections))
+
+        # Vision OCR: requests run concurrently (VISION_OCR_MAX_CONCURRENCY), results saved in page order
+        prefetched_ocr: Dict[int, tuple] = {}
+        if vision_pages:
+            ocr_attempted = True
+            print(f"[Vision OCR] Will process {len(vision_pages)} pages using Vision OCR")
+
+            def _on_vision_result(page_num: int, page_text: str | None, error: str | None):
+                if error is None and page_text and page_text.strip():
+                    _save_ocr_page_text(text_dir, manifest, progress, checkpoint_pages, page_num, page_text)
+
+            ocr_latencies: Dict[int, float] = {}
+            with timings.stage("ocr"):
+                prefetched_ocr = vision_ocr_pdf_pages(
+                    file_path, vision_pages, dpi=225, lang_hint="en",
+                    on_result=_on_vision_result, latencies=ocr_latencies, page_dpis=page_dpis
+                )
+            for page_num, seconds in ocr_latencies.items():
+                timings.record_page_ocr(page_num, "vision", seconds)
+
+        # Hybrid OCR (Tesseract pages)
         hybrid_ocr_results = None
-        if any_needs_ocr and ocr_available and selected_ocr_provider == "tesseract":
+        if tesseract_pages:
             try:
-                print(f"[Hybrid OCR] Detected {sum(1 for _, _, n in pages_info if n)} pages needing OCR, using hybrid OCR pipeline...")
+                print(f"[Hybrid OCR] Detected {len(tesseract_pages)} pages needing Tesseract OCR, using hybrid OCR pipeline...")
                 ocr_attempted = True
-                hybrid_text_pages, hybrid_metadata = extract_all_pages_hybrid(file_path, total_pages, dpi=200, lang="eng+ara")
+                known_pages = {}
+                for page_entry in manifest.get("pages", []):
+                    page_num = page_entry.get("pageNumber")
+                    text_path = text_dir / f"page_{page_num}.txt"
+                    if page_num in checkpoint_pages and page_entry.get("ocrUsed") and text_path.exists():
+                        known_pages[page_num] = text_path.read_text(encoding="utf-8")
+                # Pages the classifier marked digital or blank keep their text layer
+                for page_num, text, needs_ocr in pages_info:
+                    if not needs_ocr and page_num not in known_pages:
+                        known_pages[page_num] = text or ""
+                # Pages planned for Vision keep their Vision text
+                for page_num, (page_text, error) in prefetched_ocr.items():
+                    if error is None and page_text and page_text.strip():
+                        known_pages[page_num] = page_text
+                with timings.stage("ocr"):
+                    hybrid_text_pages, hybrid_metadata = extract_all_pages_hybrid(
+                        file_path, total_pages, dpi=200, lang=LANG_BOTH,
+                        on_page=lambda n, t: _save_ocr_page_text(text_dir, manifest, progress, checkpoint_pages, n, t),
+                        known_pages=known_pages, page_langs=page_langs, page_dpis=page_dpis
+                    )
+                for page_num, provider_seconds in hybrid_metadata.get("page_seconds", {}).items():
+                    for provider, seconds in provider_seconds.items():
+                        lang = page_langs.get(page_num, LANG_BOTH) if provider == "tesseract" else None
+                        timings.record_page_ocr(page_num, provider, seconds, lang=lang)
                 hybrid_ocr_results = {"text_pages": hybrid_text_pages, "metadata": hybrid_metadata}
                 print(f"[Hybrid OCR] Completed: {len(hybrid_text_pages)} pages extracted")
-                if hybrid_metadata.get("fallback_used"):
-                    print("[Hybrid OCR] GPT-4 Vision fallback was used due to quality issues")
+                fallback_pages = hybrid_metadata.get("fallback_pages", {})
+                for page_num, verdict in hybrid_metadata.get("page_quality", {}).items():
+                    set_page_info(manifest, page_num, ocrQuality={**verdict, "fallback": page_num in fallback_pages})
+                if fallback_pages:
+                    print(f"[Hybrid OCR] GPT-4 Vision fallback was used for pages {sorted(fallback_pages)} due to quality issues")
+            except job_store.LeaseLostError:
+                raise
             except Exception as hybrid_error:
                 print(f"[Hybrid OCR] Failed: {hybrid_error}, falling back to page-by-page OCR")
                 hybrid_ocr_results = None
-        elif any_needs_ocr and ocr_available and selected_ocr_provider == "vision":
+
+        # Page-by-page Tesseract: fan OCR pages out to the process pool up front
+        if hybrid_ocr_results is None and tesseract_pages and ocr_pool_enabled():
+            print(f"[OCR] Running Tesseract on {len(tesseract_pages)} pages with {settings.ocr_workers} worker processes")
             ocr_attempted = True
-            print(f"[Vision OCR] Will process {sum(1 for _, _, n in pages_info if n)} pages using Vision OCR")
 
-        # ✅ ✅ ✅ FIXED: Force OCR threshold is defined ONCE, before the loop
-        MIN_TEXT_BEFORE_FORCE_OCR = int(os.getenv("MIN_TEXT_BEFORE_FORCE_OCR", "800"))
+            def _on_ocr_result(page_num: int, page_text: str | None, error: str | None):
+                if error is None:
+                    _save_ocr_page_text(text_dir, manifest, progress, checkpoint_pages, page_num, page_text)
+
+            ocr_latencies = {}
+            with timings.stage("ocr"):
+                prefetched_ocr.update(run_pages_parallel(
+                    tesseract_page_task, file_path, tesseract_pages, (200, LANG_BOTH, "normal_ocr"),
+                    on_result=_on_ocr_result, latencies=ocr_latencies,
+                    page_args={
+                        n: (page_dpis[n], page_langs.get(n, LANG_BOTH), page_presets[n]) for n in tesseract_pages
+                    }
+                ))
+            for page_num, seconds in ocr_latencies.items():
+                timings.record_page_ocr(page_num, "tesseract", seconds, lang=page_langs.get(page_num, LANG_BOTH))
+
+        # Streaming mode: chunk/embed/upsert run alongside the page loop
+        # ("failed_pages" only re-indexes the retried pages, done in the staged chunking step)
+        if settings.job_pipeline_mode == "streaming" and reprocess_mode != "failed_pages":
+            if reprocess_mode is not None:
+                delete_policy_chunks(tenant_id, policy_id)
+            # Indexed chunks go straight to a temporary artifact set instead of staying in memory
+            if settings.artifact_store_enabled:
+                artifact_writer = ArtifactWriter(file_hash, artifact_variant, policy_id)
+            pipeline = StreamingIndexPipeline(
+                tenant_id, policy_id, filename, 2000, 300, 50,
+                on_indexed=artifact_writer.add_chunks if artifact_writer is not None else None, timings=timings
+            )
+            pipeline.start()
+            print(f"[Pipeline] Streaming mode: queue_size={settings.pipeline_queue_size}")
 
         # ✅ ✅ ✅ FIXED: for-loop + try are correctly scoped
+        # Page loop time excluding OCR done inside it (counted under "ocr")
+        pages_started = time.monotonic()
+        loop_ocr_seconds = 0.0
+        # Pages (re)extracted by this job, as opposed to checkpoints
+        completed_pages: List[int] = []
         for page_num, text, needs_ocr in pages_info:
-            # Force OCR if extracted text is too small (usually header-only)
-            if len((text or "").strip()) < MIN_TEXT_BEFORE_FORCE_OCR:
-                needs_ocr = True
-
+            # Stop before touching the page once another worker owns the job
+            progress.check_lease()
             try:
-                if reprocess_mode is None:
-                    if should_skip_page(manifest, page_num, file_hash):
-                        if needs_ocr:
-                            page_entry = next((p for p in manifest.get("pages", []) if p.get("pageNumber") == page_num), None)
-                            if page_entry and page_entry.get("status") == "COMPLETED" and page_entry.get("ocrUsed"):
-                                pages_done += 1
-                                update_job_progress(job_id, pages_done=pages_done)
-                                continue
-                        else:
+                if page_num in checkpoint_pages:
+                    if needs_ocr:
+                        page_entry = next((p for p in manifest.get("pages", []) if p.get("pageNumber") == page_num), None)
+                        if page_entry and page_entry.get("status") == "COMPLETED" and page_entry.get("ocrUsed"):
                             pages_done += 1
-                            update_job_progress(job_id, pages_done=pages_done)
+                            progress.update(pages_done=pages_done)
+                            if pipeline is not None:
+                                _feed_pipeline_from_disk(pipeline, text_dir, page_num)
                             continue
+                    else:
+                        pages_done += 1
+                        progress.update(pages_done=pages_done)
+                        if pipeline is not None:
+                            _feed_pipeline_from_disk(pipeline, text_dir, page_num)
+                        continue
 
                 # Use hybrid OCR output if exists
                 if hybrid_ocr_results is not None and page_num <= len(hybrid_ocr_results["text_pages"]):
                     page_text = hybrid_ocr_results["text_pages"][page_num - 1]
-                    ocr_used = True
-                    pages_needing_ocr.append(page_num)
+                    ocr_used = needs_ocr
                     if needs_ocr:
+                        pages_needing_ocr.append(page_num)
                         ocr_text_pages.append(page_text)
                 else:
                     page_text = text
@@ -415,40 +708,64 @@ def process_job(job_id: str):
                     if needs_ocr:
                         pages_needing_ocr.append(page_num)
                         ocr_attempted = True
+                        page_plan = ocr_plans.get(page_num, {})
+                        page_provider = page_plan.get("provider", selected_ocr_provider)
 
                         if not ocr_available:
-                            error_msg = f"OCR prerequisites missing (provider={selected_ocr_provider})"
+                            error_msg = f"OCR prerequisites missing (provider={page_provider})"
                             print(f"[OCR] page={page_num} ERROR: {error_msg}")
                             update_manifest_page(manifest, page_num, "FAILED", None, False, 0, error_msg)
-                            save_manifest(tenant_id, policy_id, manifest)
+                            progress.manifest_changed()
                             continue
 
                         try:
-                            if selected_ocr_provider == "vision":
+                            if page_num in prefetched_ocr:
+                                page_text, prefetch_error = prefetched_ocr[page_num]
+                                if prefetch_error is not None:
+                                    raise Exception(prefetch_error)
+                            elif page_provider == "vision":
                                 print(f"[OCR] page={page_num} using Vision OCR")
-                                page_text = vision_ocr_pdf_page(file_path, page_num, dpi=225, lang_hint="en")
+                                t0 = time.monotonic()
+                                page_text = call_with_retries(
+                                    vision_ocr_pdf_page, file_path, page_num, dpi=page_plan.get("dpi", 225), lang_hint="en",
+                                    label=f"Vision OCR page={page_num}"
+                                )
+                                ocr_seconds = time.monotonic() - t0
+                                timings.record_page_ocr(page_num, "vision", ocr_seconds)
+                                timings.add_stage("ocr", ocr_seconds)
+                                loop_ocr_seconds += ocr_seconds
                             else:
-                                print(f"[OCR] page={page_num} using Tesseract OCR")
-                                page_text = extract_text_from_pdf_page(file_path, page_num, dpi=200, lang="eng+ara", preset="normal_ocr")
+                                page_lang = page_langs.get(page_num, LANG_BOTH)
+                                page_preset = page_plan.get("preset", "normal_ocr")
+                                print(f"[OCR] page={page_num} using Tesseract OCR (lang={page_lang}, preset={page_preset})")
+                                t0 = time.monotonic()
+                                page_text = call_with_retries(
+                                    extract_text_from_pdf_page, file_path, page_num, dpi=page_plan.get("dpi", 200),
+                                    lang=page_lang, preset=page_preset, label=f"Tesseract OCR page={page_num}"
+                                )
+                                ocr_seconds = time.monotonic() - t0
+                                timings.record_page_ocr(page_num, "tesseract", ocr_seconds, lang=page_lang)
+                                timings.add_stage("ocr", ocr_seconds)
+                                loop_ocr_seconds += ocr_seconds
 
                             text_len = len(page_text.strip())
-                            print(f"[OCR] page={page_num} text_len={text_len} provider={selected_ocr_provider}")
+                            print(f"[OCR] page={page_num} text_len={text_len} provider={page_provider}")
 
                             if text_len == 0:
-                                error_msg = f"OCR produced no text (provider={selected_ocr_provider})"
+                                error_msg = f"OCR produced no text (provider={page_provider})"
                                 print(f"[OCR] page={page_num} ERROR: {error_msg}")
                                 update_manifest_page(manifest, page_num, "FAILED", None, True, 0, error_msg)
-                                save_manifest(tenant_id, policy_id, manifest)
+                                progress.manifest_changed()
                                 continue
 
                             ocr_used = True
                             ocr_text_pages.append(page_text)
 
                         except Exception as ocr_error:
-                            error_msg = f"OCR failed ({selected_ocr_provider}): {str(ocr_error)}"
+                            error_msg = f"OCR failed ({page_provider}): {str(ocr_error)}"
                             print(f"[OCR] page={page_num} EXCEPTION: {error_msg}")
                             update_manifest_page(manifest, page_num, "FAILED", None, True, 0, error_msg)
-                            save_manifest(tenant_id, policy_id, manifest)
+                            progress.manifest_changed()
                             continue
 
                 line_count = len(page_text.splitlines())
@@ -462,24 +779,43 @@ def process_job(job_id: str):
                     f.write(page_text)
 
                 update_manifest_page(manifest, page_num, "COMPLETED", str(text_path), ocr_used, line_count)
-                save_manifest(tenant_id, policy_id, manifest)
+                progress.manifest_changed()
 
                 pages_done += 1
-                update_job_progress(job_id, pages_done=pages_done)
+                completed_pages.append(page_num)
+                progress.update(pages_done=pages_done)
 
+                if pipeline is not None:
+                    pipeline.add_page(page_num, page_text)
+                    progress.update(chunks_total=pipeline.chunks_built, chunks_done=pipeline.chunks_indexed)
+
+            except job_store.LeaseLostError:
+                raise
             except Exception as e:
+                if pipeline is not None and pipeline.error is not None:
+                    raise
                 error_msg = str(e)
                 update_manifest_page(manifest, page_num, "FAILED", None, False, 0, error_msg)
-                save_manifest(tenant_id, policy_id, manifest)
+                progress.manifest_changed()
                 continue
 
+        # Stage boundary: OCR done
+        timings.add_stage("pages", time.monotonic() - pages_started - loop_ocr_seconds)
+        pipeline_stats = None
+        if pipeline is not None:
+            with timings.stage("pipeline_drain"):
+                pipeline_stats = pipeline.close()
+            print(f"[Pipeline] Stage stats: {pipeline_stats}")
+        progress.flush()
+
         # Duplicate detection (only when hybrid not used)
         if hybrid_ocr_results is None and ocr_text_pages and len(ocr_text_pages) >= 3:
             is_duplicate, duplicate_error = _detect_duplicate_ocr_pages(ocr_text_pages, similarity_threshold=3)
             if is_duplicate:
                 print(f"[OCR] DUPLICATE DETECTION: {duplicate_error}")
-                update_job_progress(
-                    job_id,
+                if pipeline is not None:
+                    delete_policy_chunks(tenant_id, policy_id)
+                progress.update(
                     status=JobStatus.FAILED,
                     pages_total=total_pages,
                     pages_done=pages_done,
@@ -490,63 +826,98 @@ def process_job(job_id: str):
                     ocr_available=ocr_available,
                 )
                 set_manifest_status(manifest, "FAILED")
-                save_manifest(tenant_id, policy_id, manifest)
+                progress.manifest_changed(flush=True)
                 return
 
         # Chunking + indexing
-        if pages_done > 0:
+        if pipeline is not None:
+            total_chunks_processed = pipeline.chunks_indexed
+            update_manifest_chunks(manifest, total_chunks_processed)
+            progress.manifest_changed()
+            progress.update(
+                chunks_total=pipeline.chunks_built,
+                chunks_done=total_chunks_processed,
+                pipeline_stats=pipeline_stats,
+            )
+            print(f"[Chunking] Streaming pipeline indexed {total_chunks_processed} chunks")
+        elif pages_done > 0:
             print(f"[Chunking] Starting chunking and indexing for {pages_done} pages (mode={reprocess_mode or 'regular'})")
 
-            if reprocess_mode is not None:
+            # "failed_pages": only the retried pages are (re)indexed; other chunks stay as they are
+            only_pages = None
+            previous_chunks = 0
+            if reprocess_mode == "failed_pages":
+                only_pages = completed_pages
+                previous_chunks = manifest.get("chunks", 0)
+                delete_page_chunks(tenant_id, policy_id, only_pages)
+                print(f"[Chunking] failed_pages: re-indexing pages {only_pages} (existing chunks={previous_chunks})")
+            elif reprocess_mode is not None:
                 delete_policy_chunks(tenant_id, policy_id)
 
             text_dir = data_dir / tenant_id / policy_id / "text"
             n_text_pages = len(list(text_dir.glob("page_*.txt"))) if text_dir.exists() else 0
             print(f"[REPROCESS] mode={reprocess_mode or 'regular'} policyId={policy_id} pagesTotal={total_pages} text_pages={n_text_pages}")
 
-            all_chunks = build_chunks_from_pages(tenant_id, policy_id, filename, 2000, 300)
+            with timings.stage("chunking"):
+                all_chunks = build_chunks_from_pages(tenant_id, policy_id, filename, 2000, 300, only_pages=only_pages)
             total_chunks = len(all_chunks)
 
             print(f"[Chunking] Built {total_chunks} chunks from {pages_done} pages")
-            update_job_progress(job_id, chunks_total=total_chunks, chunks_done=0)
+            progress.update(chunks_total=previous_chunks + total_chunks, chunks_done=previous_chunks)
+            progress.flush()
 
             if total_chunks > 0:
                 embedding_batch_size = 50
-                chunks_done = 0
+                chunks_done = previous_chunks
 
                 for batch_start in range(0, len(all_chunks), embedding_batch_size):
+                    progress.check_lease()
                     batch = all_chunks[batch_start: batch_start + embedding_batch_size]
                     batch_texts = [c["text"] for c in batch]
 
                     print(f"[Chunking] Generating embeddings for batch {batch_start // embedding_batch_size + 1} ({len(batch_texts)} chunks)")
-                    batch_embeddings = generate_embeddings(batch_texts)
+                    with timings.stage("embedding", metric="embedding_batch"):
+                        batch_embeddings = generate_embeddings(batch_texts)
 
                     chunks_to_upsert = []
                     for chunk_dict, emb in zip(batch, batch_embeddings):
                         chunk_dict["embedding"] = emb
                         chunks_to_upsert.append(chunk_dict)
 
-                    upsert_chunks(tenant_id, policy_id, chunks_to_upsert, batch_size=200)
+                    with timings.stage("upsert", metric="upsert_batch"):
+                        upsert_chunks(tenant_id, policy_id, chunks_to_upsert, batch_size=200)
                     chunks_done += len(chunks_to_upsert)
 
-                    update_job_progress(job_id, chunks_done=chunks_done)
+                    progress.update(chunks_done=chunks_done)
                     update_manifest_chunks(manifest, chunks_done)
-                    save_manifest(tenant_id, policy_id, manifest)
+                    progress.manifest_changed()
 
-                    print(f"[Chunking] Indexed {chunks_done}/{total_chunks} chunks")
+                    print(f"[Chunking] Indexed {chunks_done}/{previous_chunks + total_chunks} chunks")
 
                 total_chunks_processed = chunks_done
                 print(f"[Chunking] Completed indexing: {total_chunks_processed} chunks")
             else:
-                total_chunks_processed = 0
+                total_chunks_processed = previous_chunks
                 print("[Chunking] WARNING: No chunks created")
 
         # Final status
         if pages_done > 0 and total_chunks_processed > 0:
             set_manifest_status(manifest, "READY")
-            save_manifest(tenant_id, policy_id, manifest)
-            update_job_progress(
-                job_id,
+            progress.manifest_changed(flush=True)
+
+            # Only fully processed files are stored for reuse
+            # ("failed_pages" only holds the retried pages' chunks in memory)
+            if settings.artifact_store_enabled and pages_done == total_pages and reprocess_mode != "failed_pages":
+                with timings.stage("artifact_save"):
+                    if artifact_writer is not None:
+                        artifact_writer.finalize(data_dir / tenant_id / policy_id / "text", manifest.get("pages", []))
+                    else:
+                        save_artifacts(
+                            file_hash, artifact_variant, policy_id,
+                            data_dir / tenant_id / policy_id / "text",
+                            manifest.get("pages", []), all_chunks
+                        )
+            progress.update(
                 status=JobStatus.READY,
                 pages_total=total_pages,
                 pages_done=pages_done,
@@ -558,9 +929,8 @@ def process_job(job_id: str):
             )
         else:
             set_manifest_status(manifest, "FAILED")
-            save_manifest(tenant_id, policy_id, manifest)
-            update_job_progress(
-                job_id,
+            progress.manifest_changed(flush=True)
+            progress.update(
                 status=JobStatus.FAILED,
                 pages_total=total_pages,
                 pages_done=pages_done,
@@ -571,44 +941,87 @@ def process_job(job_id: str):
                 ocr_available=ocr_available,
             )
 
+    except job_store.LeaseLostError as e:
+        # Another worker resumed the job: leave its records alone
+        print(f"[Job] Stopping job={job_id} without further writes: {e}")
+        if pipeline is not None:
+            pipeline.abort()
     except Exception as e:
         import traceback
         error_msg = str(e)
         print(f"[Job] ERROR in process_job({job_id}): {error_msg}")
         print(f"[Job] Traceback:\n{traceback.format_exc()}")
 
+        if pipeline is not None:
+            pipeline.abort()
+
+        # Persist buffered page checkpoints so a retry can resume from them
+        if progress is not None:
+            try:
+                progress.flush()
+            except Exception:
+                pass
+
+        # Only a run that still owns the job may mark it FAILED (another worker may have resumed it)
+        if lease_owner is not None:
+            try:
+                lost = (lease_lost is not None and lease_lost.is_set()) or (
+                    job_store.get_lease_owner(job_id) != lease_owner
+                )
+            except Exception as lease_error:
+                print(f"[Job] WARNING: could not check the lease of job={job_id}: {lease_error}")
+                lost = False
+            if lost:
+                print(f"[Job] Lease on job={job_id} lost, not marking it FAILED")
+                return
+
         try:
             job = load_job(job_id)
             ocr_available = job.get("ocrAvailable", False) if job else False
-            update_job_progress(job_id, status=JobStatus.FAILED, error=error_msg, ocr_available=ocr_available)
+            update_job_progress(
+                job_id, status=JobStatus.FAILED, error=error_msg, ocr_available=ocr_available,
+                timings=timings.summary()
+            )
         except Exception:
             try:
                 update_job_progress(job_id, status=JobStatus.FAILED, error=f"Job failed: {error_msg}")
             except Exception:
                 print(f"[Job] CRITICAL: Could not update job {job_id} status at all")
+    finally:
+        # Unfinished artifact sets (failed, partial or lost jobs) are dropped; no-op once stored
+        if artifact_writer is not None:
+            artifact_writer.discard()
+        # Close this job's open document handle (rendered pages stay in the page cache)
+        if file_path is not None:
+            release_rasterizer(file_path)
 
 
 async def start_job_processing(job_id: str):
-    """Start processing a job asynchronously"""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(executor, process_job, job_id)
+    """Queue a job with the scheduler (returns once queued, not when processed)"""
+    if settings.job_runner == "worker":
+        # Standalone workers pick QUEUED jobs up from the job store
+        return
 
+    from app.scheduler import scheduler
 
-def get_all_jobs(tenant_id: str | None = None) -> List[Dict[str, Any]]:
-    """Get all jobs (optionally filtered by tenant)"""
-    jobs_dir = Path(settings.data_dir) / "jobs"
-    jobs: List[Dict[str, Any]] = []
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, scheduler.submit, job_id)
 
-    if not jobs_dir.exists():
-        return jobs
 
-    for job_file in jobs_dir.glob("*.json"):
-        try:
-            with open(job_file, "r") as f:
-                job = json.load(f)
-                if tenant_id is None or job.get("tenantId") == tenant_id:
-                    jobs.append(job)
-        except Exception:
-            continue
+def update_job_queue(job_id: str, queue_info: Dict[str, Any]):
+    """Persist a job's queue entry (enqueuedAt, pageCount) so queue order survives restarts"""
+    job = load_job(job_id)
+    if not job:
+        return
+    job["queue"] = queue_info
+    save_job(job_id, job)
 
-    return jobs
\ No newline at end of file
+
+def get_all_jobs(
+    tenant_id: str | None = None,
+    policy_id: str | None = None,
+    statuses: List[str] | None = None,
+    limit: int | None = None
+) -> List[Dict[str, Any]]:
+    """Get all jobs (optionally filtered by tenant, policy and status; limit => most recent N)"""
+    return job_store.list_jobs(tenant_id=tenant_id, policy_id=policy_id, statuses=statuses, limit=limit)
@@ -3,7 +3,6 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import routes_ingest, routes_status, routes_search, routes_conflicts, routes_harmonize, routes_generate, routes_policies, routes_issues, routes_tags, routes_risk_detector
-from app.jobs import get_all_jobs
 from app.config import settings
 
 
@@ -68,17 +67,17 @@ async def startup_event():
     else:
         raise ValueError(f"Invalid EMBEDDINGS_PROVIDER: {settings.embeddings_provider}")
     
-    # Get all jobs that are QUEUED or PROCESSING
-    import asyncio
-    from app.jobs import JobStatus, get_all_jobs, start_job_processing
+    if settings.job_runner == "worker":
+        print("[Config] JOB_RUNNER=worker: jobs are processed by `python -m app.worker`")
+        return
     
-    all_jobs = get_all_jobs()
+    # Queue QUEUED/PROCESSING jobs whose lease is free or expired (other processes'
+    # live jobs are left alone; interrupted jobs resume from their page checkpoints)
+    import asyncio
+    from app.scheduler import scheduler
     
-    for job in all_jobs:
-        if job.get("status") in [JobStatus.QUEUED, JobStatus.PROCESSING]:
-            # Resume job processing (non-blocking)
-            asyncio.create_task(start_job_processing(job["jobId"]))
-
+    loop = asyncio.get_event_loop()
+    loop.run_in_executor(None, scheduler.recover_jobs)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,7 @@
 """Manifest/checkpoint management"""
 import json
+import os
+import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -28,8 +30,11 @@ def save_manifest(tenant_id: str, policy_id: str, manifest: Dict[str, Any]):
     manifest_dir.mkdir(parents=True, exist_ok=True)
     manifest_path = manifest_dir / f"{policy_id}.json"
     
-    with open(manifest_path, "w") as f:
+    # Atomic write: readers never see a half-written manifest
+    tmp_path = manifest_dir / f".{policy_id}.json.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
 
 
 def create_manifest(
@@ -88,6 +93,76 @@ def update_manifest_page(
     manifest["lastUpdatedAt"] = datetime.utcnow().isoformat()
 
 
+def set_page_info(manifest: Dict[str, Any], page_number: int, **fields):
+    """Set extra fields on a page entry (created as PENDING if missing)"""
+    page_entry = next((page for page in manifest["pages"] if page["pageNumber"] == page_number), None)
+    if page_entry is None:
+        page_entry = {"pageNumber": page_number, "status": "PENDING"}
+        manifest["pages"].append(page_entry)
+    page_entry.update(fields)
+    manifest["lastUpdatedAt"] = datetime.utcnow().isoformat()
+
+
+def record_ocr_decisions(
+    manifest: Dict[str, Any],
+    decisions: Dict[int, Dict[str, Any]],
+    summary: Dict[str, Any] | None = None
+):
+    """
+    Record the per-page OCR decision (needsOcr, reason, signals) and a summary
+
+    Args:
+        decisions: page_number -> decision from app.page_classifier.classify_pages
+        summary: Counts from app.page_classifier.summarize_decisions
+    """
+    for page_number, decision in decisions.items():
+        set_page_info(manifest, page_number, ocrDecision=decision)
+    
+    if summary is not None:
+        manifest["ocrDecisions"] = summary
+    manifest["lastUpdatedAt"] = datetime.utcnow().isoformat()
+
+
+def record_ocr_languages(
+    manifest: Dict[str, Any],
+    detections: Dict[int, Dict[str, Any]],
+    summary: Dict[str, Any] | None = None
+):
+    """
+    Record the Tesseract languages chosen per page (lang, method, signals) and a summary
+
+    Args:
+        detections: page_number -> detection from app.script_detect.detect_page_languages
+        summary: Counts from app.script_detect.summarize_languages
+    """
+    for page_number, detection in detections.items():
+        set_page_info(manifest, page_number, ocrLanguages=detection)
+    
+    if summary is not None:
+        manifest["ocrLanguages"] = summary
+    manifest["lastUpdatedAt"] = datetime.utcnow().isoformat()
+
+
+def record_ocr_plans(
+    manifest: Dict[str, Any],
+    plans: Dict[int, Dict[str, Any]],
+    summary: Dict[str, Any] | None = None
+):
+    """
+    Record the per-page OCR plan (layout, signals, preset, dpi, provider) and a summary
+
+    Args:
+        plans: page_number -> plan from app.page_layout.plan_ocr_pages
+        summary: Counts from app.page_layout.summarize_plans
+    """
+    for page_number, plan in plans.items():
+        set_page_info(manifest, page_number, ocrPlan=plan)
+    
+    if summary is not None:
+        manifest["ocrPlans"] = summary
+    manifest["lastUpdatedAt"] = datetime.utcnow().isoformat()
+
+
 def update_manifest_chunks(manifest: Dict[str, Any], chunks_count: int):
     """Update total chunks count in manifest"""
     manifest["chunks"] = chunks_count
@@ -109,13 +184,29 @@ def get_completed_pages(manifest: Dict[str, Any]) -> List[int]:
     ]
 
 
-def should_skip_page(manifest: Dict[str, Any], page_number: int, current_hash: str) -> bool:
-    """Check if page should be skipped (already processed with same hash)"""
+def should_skip_page(
+    manifest: Dict[str, Any],
+    page_number: int,
+    current_hash: str,
+    completed_since: str | None = None
+) -> bool:
+    """
+    Check if page should be skipped (already processed with same hash)
+    
+    Args:
+        completed_since: Only count pages completed at or after this ISO timestamp
+                         (e.g. by an earlier attempt of the current job)
+    """
     if manifest.get("fileHash") != current_hash:
         return False
     
     for page in manifest.get("pages", []):
         if page.get("pageNumber") == page_number and page.get("status") == "COMPLETED":
-            return True
+            if completed_since is None:
+                return True
+            try:
+                return datetime.fromisoformat(page.get("updatedAt", "")) >= datetime.fromisoformat(completed_since)
+            except ValueError:
+                return False
     
     return False
@@ -1,18 +1,11 @@
-"""OCR functionality using pytesseract"""
-import hashlib
+"""OCR functionality using Tesseract (pytesseract or persistent tesserocr engines, see app.tesseract_engine)"""
+import functools
 import os
 from pathlib import Path
 from PIL import Image
 
-try:
-    import pytesseract
-except ImportError:
-    pytesseract = None
-
-try:
-    from pdf2image import convert_from_path
-except ImportError:
-    convert_from_path = None
+from app import ocr_cache, tesseract_engine
+from app.page_raster import render_page
 
 # Debug flag (can be set via env var)
 DEBUG_OCR = os.getenv("DEBUG_OCR", "false").lower() == "true"
@@ -20,7 +13,7 @@ DEBUG_OCR = os.getenv("DEBUG_OCR", "false").lower() == "true"
 
 def extract_text_with_ocr(image: Image.Image, lang: str = "eng+ara", preset: str = "normal_ocr") -> str:
     """
-    Extract text from image using pytesseract OCR
+    Extract text from image using Tesseract OCR
     
     Args:
         image: PIL Image object
@@ -30,16 +23,15 @@ def extract_text_with_ocr(image: Image.Image, lang: str = "eng+ara", preset: str
     Returns:
         Extracted text
     """
-    if pytesseract is None:
-        raise ImportError("pytesseract not installed - OCR functionality unavailable")
+    if not tesseract_engine.engine_available():
+        raise ImportError("Tesseract not installed (pytesseract or tesserocr) - OCR functionality unavailable")
     
     try:
         # Configure Tesseract based on preset
         tesseract_config = _get_tesseract_config(preset)
         
-        # Use pytesseract to extract text
         # lang="eng+ara" supports both English and Arabic
-        text = pytesseract.image_to_string(image, lang=lang, config=tesseract_config)
+        text = tesseract_engine.image_to_string(image, lang=lang, config=tesseract_config)
         return text
     except Exception as e:
         raise Exception(f"OCR extraction failed: {str(e)}")
@@ -65,6 +57,15 @@ def _get_tesseract_config(preset: str) -> str:
         return ""
 
 
+@functools.lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    """Installed Tesseract version (part of the OCR cache key)"""
+    try:
+        return f"tesseract-{tesseract_engine.engine_version()}"
+    except Exception:
+        return "tesseract"
+
+
 def extract_text_from_image_path(image_path: Path, lang: str = "eng+ara") -> str:
     """Extract text from image file using OCR"""
     image = Image.open(image_path)
@@ -72,15 +73,9 @@ def extract_text_from_image_path(image_path: Path, lang: str = "eng+ara") -> str
 
 
 def _hash_image_bytes(image: Image.Image) -> str:
-    """Compute hash of image bytes (first 1MB)"""
+    """Hash of the image pixels (the same hash keys the OCR cache)"""
     try:
-        import io
-        img_bytes = io.BytesIO()
-        image.save(img_bytes, format='PNG')
-        img_bytes.seek(0)
-        # Hash first 1MB (1048576 bytes)
-        data = img_bytes.read(1048576)
-        return hashlib.md5(data).hexdigest()
+        return ocr_cache.image_hash(image)
     except Exception as e:
         if DEBUG_OCR:
             print(f"[DEBUG] Failed to hash image: {e}")
@@ -149,20 +144,12 @@ def extract_text_from_pdf_page(
     Returns:
         Extracted text
     """
-    if convert_from_path is None:
-        raise ImportError("pdf2image not installed - OCR functionality unavailable")
-    
-    if pytesseract is None:
-        raise ImportError("pytesseract not installed - OCR functionality unavailable")
+    if not tesseract_engine.engine_available():
+        raise ImportError("Tesseract not installed (pytesseract or tesserocr) - OCR functionality unavailable")
     
     try:
-        # Convert PDF page to image
-        images = convert_from_path(str(pdf_path), dpi=dpi, first_page=page_num, last_page=page_num)
-        if not images:
-            raise Exception(f"Failed to convert page {page_num} to image")
-        
-        # Extract text from image
-        image = images[0]
+        # Render PDF page to image (shared rasterizer + page cache)
+        image = render_page(pdf_path, page_num, dpi=dpi)
         
         # Debug logging: image size and hash
         if DEBUG_OCR:
@@ -170,17 +157,22 @@ def extract_text_from_pdf_page(
             img_hash = _hash_image_bytes(image)
             print(f"[DEBUG OCR] page={page_num} image_size={img_size} image_hash={img_hash}")
         
-        # Apply preprocessing for table_ocr preset
-        if preset == "table_ocr":
-            image = _preprocess_image_for_table(image)
-            if DEBUG_OCR:
-                print(f"[DEBUG OCR] page={page_num} applied table_ocr preprocessing")
-        
-        # Get Tesseract config based on preset
-        tesseract_config = _get_tesseract_config(preset)
+        def _ocr() -> str:
+            ocr_image = image
+            # Apply preprocessing for table_ocr preset
+            if preset == "table_ocr":
+                ocr_image = _preprocess_image_for_table(ocr_image)
+                if DEBUG_OCR:
+                    print(f"[DEBUG OCR] page={page_num} applied table_ocr preprocessing")
+            
+            # Get Tesseract config based on preset
+            tesseract_config = _get_tesseract_config(preset)
+            
+            # Extract text
+            return tesseract_engine.image_to_string(ocr_image, lang=lang, config=tesseract_config)
         
-        # Extract text
-        text = pytesseract.image_to_string(image, lang=lang, config=tesseract_config)
+        # Pages whose pixels were OCR'd before come from the OCR cache
+        text = ocr_cache.cached_ocr(image, "tesseract", tesseract_version(), preset, lang, _ocr)
         
         # Debug logging: first 200 chars of OCR text
         if DEBUG_OCR:
@@ -0,0 +1,264 @@
+"""
+Persistent OCR result cache
+
+Reprocessing (mode=ocr_only), re-uploading a corrected PDF where only a few
+pages changed, or re-running the hybrid Vision fallback used to OCR pages whose
+pixels had not changed. OCR results are cached on disk keyed by the rendered
+page image plus everything else that determines the output:
+
+    sha256(image hash | provider | model | preset | lang)
+
+The image hash covers mode, size and pixels, so the render DPI is part of it.
+Entries live under data/ocr_cache as small JSON files; once the cache exceeds
+OCR_CACHE_MAX_MB the least recently used entries are evicted.
+
+Hits and misses are counted per job: process_job wraps its work in
+track(timings), and OCR pool workers report their counts back with each task
+(see app.ocr_pool), so the job record shows the cache hit rate.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from app.config import settings
+
+_evict_lock = threading.Lock()
+_bytes_since_sweep = 0
+
+# Counter sink of the job running on the current thread (JobTimings or anything with count())
+_sink: contextvars.ContextVar = contextvars.ContextVar("ocr_cache_sink", default=None)
+
+
+def _cache_root() -> Path:
+    return Path(settings.data_dir) / "ocr_cache"
+
+
+def image_hash(image) -> str:
+    """Hash of a PIL image's mode, size and raw pixels (no PNG encoding)"""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}|{image.size[0]}x{image.size[1]}|".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def cache_key(img_hash: str, provider: str, model: str, preset: str, lang: str) -> str:
+    raw = f"{img_hash}|{provider}|{model}|{preset}|{lang}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return _cache_root() / key[:2] / f"{key}.json"
+
+
+@contextmanager
+def track(sink):
+    """Count cache hits/misses on this thread (and threads started with its context) into sink.count()"""
+    token = _sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _sink.reset(token)
+
+
+def current_sink():
+    """Counter sink of the current thread (None outside a tracked job)"""
+    return _sink.get()
+
+
+def _count(provider: str, hit: bool):
+    sink = _sink.get()
+    if sink is not None:
+        sink.count(f"ocr_cache.{'hit' if hit else 'miss'}.{provider}")
+
+
+def _load(key: str) -> Dict[str, Any] | None:
+    """Cache entry for a key (None on miss)"""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)  # LRU: mark as recently used
+        return entry
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[OCR Cache] Ignoring unreadable cache entry {path}: {e}")
+        return None
+
+
+def get(key: str) -> str | None:
+    """Cached text for a key (None on miss)"""
+    entry = _load(key)
+    return entry["text"] if entry is not None else None
+
+
+def put(key: str, text: str, provider: str, model: str, data: Any = None):
+    """Store OCR text (and optional JSON-serializable data, e.g. confidence stats) for a key"""
+    path = _entry_path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        entry = {
+            "text": text,
+            "provider": provider,
+            "model": model,
+            "createdAt": datetime.utcnow().isoformat(),
+        }
+        if data is not None:
+            entry["data"] = data
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        _evict_if_needed(path.stat().st_size)
+    except Exception as e:
+        print(f"[OCR Cache] Could not cache result: {e}")
+
+
+def cached_ocr(
+    image,
+    provider: str,
+    model: str,
+    preset: str,
+    lang: str,
+    ocr_fn: Callable[[], str]
+) -> str:
+    """
+    Return the cached OCR text for a page image, or run ocr_fn() and cache its result
+
+    Args:
+        image: Rendered page image (before any OCR-specific preprocessing)
+        provider: "tesseract" | "vision" | "gpt4_vision" | ...
+        model: Model or engine version
+        preset: OCR preset / pipeline variant (anything that changes the output)
+        lang: Language(s) or language hint
+        ocr_fn: Runs the OCR on a miss
+
+    Returns:
+        Extracted text
+    """
+    if not settings.ocr_cache_enabled:
+        return ocr_fn()
+
+    key = cache_key(image_hash(image), provider, model, preset, lang)
+    text = get(key)
+    if text is not None:
+        _count(provider, hit=True)
+        return text
+
+    _count(provider, hit=False)
+    text = ocr_fn()
+    # Empty results are not cached: they are usually failures worth retrying
+    if text and text.strip():
+        put(key, text, provider, model)
+    return text
+
+
+def cached_ocr_with_data(
+    image,
+    provider: str,
+    model: str,
+    preset: str,
+    lang: str,
+    ocr_fn: Callable[[], Tuple[str, Any]]
+) -> Tuple[str, Any]:
+    """
+    Like cached_ocr, for OCR functions that return (text, data)
+
+    Entries cached without data (e.g. by cached_ocr) count as misses.
+
+    Returns:
+        (text, data)
+    """
+    if not settings.ocr_cache_enabled:
+        return ocr_fn()
+
+    key = cache_key(image_hash(image), provider, model, preset, lang)
+    entry = _load(key)
+    if entry is not None and "data" in entry:
+        _count(provider, hit=True)
+        return entry["text"], entry["data"]
+
+    _count(provider, hit=False)
+    text, data = ocr_fn()
+    if text and text.strip():
+        put(key, text, provider, model, data=data)
+    return text, data
+
+
+def _evict_if_needed(added_bytes: int):
+    """LRU eviction by file mtime (hits touch their file); sweeps after ~10% of the limit was written"""
+    global _bytes_since_sweep
+    limit = settings.ocr_cache_max_mb * 1024 * 1024
+    with _evict_lock:
+        _bytes_since_sweep += added_bytes
+        if _bytes_since_sweep < limit // 10:
+            return
+        _bytes_since_sweep = 0
+
+        entries = []
+        total = 0
+        for path in _cache_root().rglob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= limit:
+            return
+
+        target = int(limit * 0.9)
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        print(f"[OCR Cache] Evicted {removed} entries (cache now {total // (1024 * 1024)} MB)")
+
+
+class CacheCounter:
+    """Plain counter sink, used in OCR pool workers to ship counts back to the job"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+
+def cache_summary(counters: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Hit rate from "ocr_cache.<hit|miss>.<provider>" counters
+
+    Returns:
+        {"hits", "misses", "hitRate", "byProvider": {provider: {"hits", "misses"}}} or None
+    """
+    by_provider: Dict[str, Dict[str, int]] = {}
+    for name, n in counters.items():
+        parts = name.split(".", 2)
+        if len(parts) != 3 or parts[0] != "ocr_cache":
+            continue
+        entry = by_provider.setdefault(parts[2], {"hits": 0, "misses": 0})
+        entry["hits" if parts[1] == "hit" else "misses"] += n
+    if not by_provider:
+        return None
+    hits = sum(e["hits"] for e in by_provider.values())
+    misses = sum(e["misses"] for e in by_provider.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hitRate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "byProvider": by_provider,
+    }
@@ -12,17 +12,13 @@ This module implements automatic OCR that works for any document type:
 - Forms/checklists
 """
 import os
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterable, Iterator, TYPE_CHECKING
 from PIL import Image
 import hashlib
 import re
 
-try:
-    import pytesseract
-except ImportError:
-    pytesseract = None
-
 try:
     from pdf2image import convert_from_path
 except ImportError:
@@ -43,15 +39,80 @@ if TYPE_CHECKING:
 
 from app.openai_client import get_openai_client
 from app.config import settings
+from app import ocr_cache, tesseract_engine
+from app.ocr import tesseract_version
+from app.ocr_vision import image_to_base64_data_url, vision_encoding_signature
+from app.page_raster import get_rasterizer, render_page
 
 DEBUG_OCR = os.getenv("DEBUG_OCR", "false").lower() == "true"
 
 
+def iter_page_images(
+    pdf_path: Path,
+    page_numbers: Iterable[int],
+    dpi: int = 200,
+    memory_limit_mb: int | None = None,
+    colorspace: str = "rgb"
+) -> Iterator[Tuple[int, Optional[Image.Image]]]:
+    """
+    Render PDF pages lazily through the shared page rasterizer
+    
+    Rendering a whole scan at once keeps every page in RAM as a full-resolution
+    image. Pages are handed out one by one; with the pdftoppm backend pages are
+    rendered in windows sized so one window stays under memory_limit_mb
+    (OCR_RENDER_MEMORY_MB). Pages already rendered at this DPI come from the
+    page cache.
+    
+    Args:
+        pdf_path: Path to PDF file
+        page_numbers: Pages to render (1-indexed; need not be contiguous)
+        dpi: Render resolution
+        memory_limit_mb: Ceiling for decoded images held by one window
+        colorspace: "rgb" | "gray" (Tesseract Stage 1 renders gray: no conversion before thresholding)
+    
+    Yields:
+        (page_num, image) in page order; image is None if the page could not be rendered
+    """
+    yield from get_rasterizer(pdf_path).render_many(
+        page_numbers, dpi=dpi, colorspace=colorspace, memory_limit_mb=memory_limit_mb
+    )
+
+
+# Skew is estimated on a copy downsampled to this longest side (px)
+SKEW_ESTIMATE_MAX_SIDE = 1000
+# Searched skew range (degrees either way) and the steps of the coarse and fine search
+SKEW_SEARCH_RANGE = 5.0
+SKEW_COARSE_STEP = 0.5
+SKEW_FINE_STEP = 0.1
+# Ink pixels used for the projection profiles (evenly subsampled beyond this)
+SKEW_MAX_POINTS = 100_000
+# Bump whenever preprocess_image_for_ocr changes its output (part of the OCR cache key)
+PREPROCESS_VERSION = 2
+
+
+def preprocess_variant() -> str:
+    """
+    Identifies the Stage 1 preprocessing for the OCR cache key
+
+    Covers the preprocessing version, the OpenCV/PIL path and the deskew
+    parameters, so cached text from another pipeline or OCR_DESKEW_* setting
+    is not reused.
+    """
+    if not OPENCV_AVAILABLE:
+        return f"pre{PREPROCESS_VERSION}:pil"
+    return (
+        f"pre{PREPROCESS_VERSION}:cv:deskew={settings.ocr_deskew_min_angle}"
+        f"/{SKEW_SEARCH_RANGE}/{SKEW_FINE_STEP}/{SKEW_ESTIMATE_MAX_SIDE}"
+    )
+
+
 def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
     """
     Preprocess image for OCR: grayscale, adaptive threshold, deskew
     
-    This is Stage 1 preprocessing - always applied for Tesseract OCR
+    This is Stage 1 preprocessing - always applied for Tesseract OCR. The page
+    is converted to NumPy once (grayscale renders are used as-is), thresholded,
+    and only rotated when the estimated skew reaches OCR_DESKEW_MIN_ANGLE.
     
     Args:
         image: PIL Image object
@@ -60,21 +121,22 @@ def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
         Preprocessed PIL Image object
     """
     try:
-        # Convert to grayscale if not already
-        if image.mode != 'L':
+        if image.mode not in ('L', 'RGB'):
             image = image.convert('L')
         
         if not OPENCV_AVAILABLE:
             # Fallback to PIL-only preprocessing
             from PIL import ImageEnhance, ImageFilter
+            if image.mode != 'L':
+                image = image.convert('L')
             enhancer = ImageEnhance.Contrast(image)
             image = enhancer.enhance(1.2)
             image = image.filter(ImageFilter.MedianFilter(size=3))
             return image
         
-        # Use OpenCV for better preprocessing
-        # Convert PIL to numpy array
-        img_array = np.array(image)
+        img_array = np.asarray(image)
+        if img_array.ndim == 3:
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
         
         # Apply adaptive threshold
         img_thresh = cv2.adaptiveThreshold(
@@ -90,10 +152,7 @@ def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
                 print(f"[OCR Preprocess] Deskew failed: {e}, using original")
             img_deskewed = img_thresh
         
-        # Convert back to PIL Image
-        image = Image.fromarray(img_deskewed)
-        
-        return image
+        return Image.fromarray(img_deskewed)
     
     except Exception as e:
         if DEBUG_OCR:
@@ -104,6 +163,48 @@ def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
         return image
 
 
+def estimate_skew_angle(image_array: "np.ndarray") -> float:
+    """
+    Estimate the skew of text lines with projection profiles on a downsampled copy
+    
+    Ink pixels are projected onto the vertical axis along candidate angles; the
+    angle whose profile has the sharpest peaks (text lines aligned) wins. Each
+    candidate is a bincount over the pixel coordinates, no image rotation.
+    
+    Args:
+        image_array: Grayscale image as numpy array (dark text on light background)
+    
+    Returns:
+        Skew in degrees (positive = lines descend to the right); 0.0 if undetermined
+    """
+    h, w = image_array.shape[:2]
+    scale = min(1.0, SKEW_ESTIMATE_MAX_SIDE / max(h, w))
+    small = image_array
+    if scale < 1.0:
+        small = cv2.resize(image_array, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > SKEW_MAX_POINTS:
+        step = len(ys) // SKEW_MAX_POINTS + 1
+        ys, xs = ys[::step], xs[::step]
+    ys = ys.astype(np.float32)
+    xs = xs.astype(np.float32) - small.shape[1] / 2
+    
+    def _profile_sharpness(angle: float) -> float:
+        rows = np.rint(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        hist = np.bincount(rows - rows.min())
+        return float(np.dot(hist, hist))
+    
+    coarse = np.arange(-SKEW_SEARCH_RANGE, SKEW_SEARCH_RANGE + SKEW_COARSE_STEP / 2, SKEW_COARSE_STEP)
+    best = max(coarse, key=_profile_sharpness)
+    fine = np.arange(best - SKEW_COARSE_STEP, best + SKEW_COARSE_STEP + SKEW_FINE_STEP / 2, SKEW_FINE_STEP)
+    best = max(fine, key=_profile_sharpness)
+    return round(float(best), 2)
+
+
 def deskew_image(image_array: "np.ndarray") -> "np.ndarray":
     """
     Deskew (straighten) rotated text in image
@@ -112,44 +213,29 @@ def deskew_image(image_array: "np.ndarray") -> "np.ndarray":
         image_array: Grayscale image as numpy array
     
     Returns:
-        Deskewed image array
+        Deskewed image array (the input itself if the skew is below OCR_DESKEW_MIN_ANGLE)
     """
     if not OPENCV_AVAILABLE:
         return image_array
     
     try:
-        # Find angle using HoughLines
-        # Apply edge detection
-        edges = cv2.Canny(image_array, 50, 150, apertureSize=3)
-        lines = cv2.HoughLines(edges, 1, np.pi / 180, 100)
-        
-        if lines is None or len(lines) == 0:
-            return image_array  # No lines found, return original
-        
-        # Calculate angles
-        angles = []
-        for rho, theta in lines[:20]:  # Use first 20 lines
-            angle = theta * 180 / np.pi - 90
-            if -45 < angle < 45:
-                angles.append(angle)
-        
-        if not angles:
-            return image_array
-        
-        # Get median angle (more robust than mean)
-        median_angle = np.median(angles)
+        angle = estimate_skew_angle(image_array)
         
         # If angle is very small, skip deskewing
-        if abs(median_angle) < 0.5:
+        if abs(angle) < settings.ocr_deskew_min_angle:
             return image_array
         
+        if DEBUG_OCR:
+            print(f"[OCR Deskew] Rotating by {angle:.2f} degrees")
+        
         # Rotate image to correct angle
         (h, w) = image_array.shape[:2]
         center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, median_angle, 1.0)
-        rotated = cv2.warpAffine(image_array, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-        
-        return rotated
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        return cv2.warpAffine(
+            image_array, M, (w, h), flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=255
+        )
     
     except Exception as e:
         if DEBUG_OCR:
@@ -168,116 +254,231 @@ def extract_text_with_tesseract(image: Image.Image, lang: str = "eng+ara") -> st
     Returns:
         Extracted text
     """
-    if pytesseract is None:
-        raise ImportError("pytesseract not installed")
+    if not tesseract_engine.engine_available():
+        raise ImportError("Tesseract not installed (pytesseract or tesserocr)")
     
     try:
         # Use OEM 3 (default, assume both), PSM 6 (single uniform block) or auto
         # PSM 6 works well for most documents including tables
         config = "--oem 3 --psm 6"
-        text = pytesseract.image_to_string(image, lang=lang, config=config)
+        text = tesseract_engine.image_to_string(image, lang=lang, config=config)
         return text
     except Exception as e:
         raise Exception(f"Tesseract OCR failed: {str(e)}")
 
 
-def validate_ocr_quality(text_pages: List[str], page_numbers: List[int]) -> Tuple[bool, List[str]]:
+def extract_text_and_confidence_with_tesseract(
+    image: Image.Image,
+    lang: str = "eng+ara"
+) -> Tuple[str, List[List[int]]]:
     """
-    Validate OCR quality and detect common issues
+    Extract text plus word confidences using Tesseract OCR (Stage 1, one recognition pass)
+    
+    Args:
+        image: Preprocessed PIL Image
+        lang: Tesseract language code
     
     Returns:
-        (is_valid, issues) tuple
-        is_valid: False if quality checks fail (should use GPT-4 Vision)
-        issues: List of detected quality issues
+        (text, [[confidence 0-100, word box area], ...])
     """
-    if not text_pages:
-        return False, ["No text extracted"]
+    if not tesseract_engine.engine_available():
+        raise ImportError("Tesseract not installed (pytesseract or tesserocr)")
     
-    issues = []
-    
-    # Check 1: Detect repeated headers (similarity > 85% across pages)
-    if len(text_pages) >= 2:
-        # Normalize first 5 lines of each page (header area)
-        header_texts = []
-        for page_text in text_pages:
-            lines = page_text.splitlines()[:5]
-            header = ' '.join(lines).lower().strip()
-            # Remove extra whitespace
-            header = re.sub(r'\s+', ' ', header)
-            if len(header) > 20:  # Only check substantial headers
-                header_texts.append(header)
-        
-        if len(header_texts) >= 2:
-            # Calculate similarity between consecutive headers
-            similar_count = 0
-            for i in range(len(header_texts) - 1):
-                similarity = _text_similarity(header_texts[i], header_texts[i + 1])
-                if similarity > 0.85:
-                    similar_count += 1
-            
-            if similar_count >= len(header_texts) * 0.5:  # More than 50% similar
-                issues.append(f"Repeated headers detected ({similar_count}/{len(header_texts) - 1} pairs similar >85%)")
+    try:
+        # Same config as extract_text_with_tesseract
+        text, words = tesseract_engine.image_to_data(image, lang=lang, config="--oem 3 --psm 6")
+        return text, [[int(round(conf)), area] for conf, area in words]
+    except Exception as e:
+        raise Exception(f"Tesseract OCR failed: {str(e)}")
+
+
+def tesseract_page_ocr(image: Image.Image, lang: str = "eng+ara") -> Tuple[str, List[List[int]]]:
+    """
+    Stage 1 OCR of a rendered page: preprocessing + Tesseract, through the OCR cache
     
-    # Check 2: Detect very low unique-token ratio (duplicate content)
-    for i, page_text in enumerate(text_pages):
-        if len(page_text.strip()) < 50:
-            continue  # Skip very short pages
-        
-        tokens = page_text.lower().split()
-        if len(tokens) < 10:
-            continue
-        
-        unique_tokens = set(tokens)
-        unique_ratio = len(unique_tokens) / len(tokens)
-        
-        if unique_ratio < 0.3:  # Less than 30% unique tokens
-            issues.append(f"Page {page_numbers[i] if i < len(page_numbers) else i+1}: Low unique token ratio ({unique_ratio:.2%})")
-    
-    # Check 3: Detect pages with mostly same text (consecutive duplicates)
-    if len(text_pages) >= 3:
-        page_hashes = [_text_hash(text) for text in text_pages]
-        consecutive_duplicates = 0
-        for i in range(len(page_hashes) - 1):
-            if page_hashes[i] == page_hashes[i + 1]:
-                consecutive_duplicates += 1
-        
-        if consecutive_duplicates >= 2:
-            issues.append(f"Consecutive duplicate pages detected ({consecutive_duplicates} pairs)")
+    Args:
+        image: Rendered page (before preprocessing; the cache is keyed by its pixels)
+        lang: Tesseract language code
     
-    # Check 4: Detect table-heavy layouts (many short lines, few long lines)
-    for i, page_text in enumerate(text_pages):
-        if len(page_text.strip()) < 100:
-            continue
-        
-        lines = [line.strip() for line in page_text.splitlines() if line.strip()]
-        if len(lines) < 10:
-            continue
-        
-        # Table pages have many short lines
-        short_lines = sum(1 for line in lines if 5 <= len(line) <= 60)
-        short_line_ratio = short_lines / len(lines)
-        
-        # Table pages also have few very long lines (most content is in short rows)
-        long_lines = sum(1 for line in lines if len(line) > 100)
-        long_line_ratio = long_lines / len(lines)
-        
-        if short_line_ratio > 0.6 and long_line_ratio < 0.2:
-            issues.append(f"Page {page_numbers[i] if i < len(page_numbers) else i+1}: Table-heavy layout detected")
+    Returns:
+        (text, word confidences) - see extract_text_and_confidence_with_tesseract
+    """
+    return ocr_cache.cached_ocr_with_data(
+        image, "tesseract", tesseract_version(), f"hybrid:{preprocess_variant()}", lang,
+        lambda: extract_text_and_confidence_with_tesseract(preprocess_image_for_ocr(image), lang=lang)
+    )
+
+
+def tesseract_page_text(image: Image.Image, lang: str = "eng+ara") -> str:
+    """Stage 1 OCR of a rendered page, text only (see tesseract_page_ocr)"""
+    return tesseract_page_ocr(image, lang=lang)[0]
+
+
+def confidence_stats(words: Optional[List[List[int]]]) -> Optional[Dict[str, Any]]:
+    """
+    Page-level confidence metrics from Tesseract word confidences
+    
+    Args:
+        words: [[confidence 0-100, word box area], ...] (None if not available)
+    
+    Returns:
+        {"words", "meanConf", "lowConfWords", "lowConfArea"} or None;
+        lowConfArea is the share of word box area below OCR_LOW_CONFIDENCE_WORD
+    """
+    if words is None:
+        return None
+    if not words:
+        return {"words": 0, "meanConf": 0.0, "lowConfWords": 0, "lowConfArea": 1.0}
+    threshold = settings.ocr_low_confidence_word
+    total_area = sum(area for _, area in words) or 1
+    low = [(conf, area) for conf, area in words if conf < threshold]
+    return {
+        "words": len(words),
+        "meanConf": round(sum(conf for conf, _ in words) / len(words), 1),
+        "lowConfWords": len(low),
+        "lowConfArea": round(sum(area for _, area in low) / total_area, 3),
+    }
+
+
+# Score penalties per page issue (a page starts at 1.0 and falls back below HYBRID_FALLBACK_MIN_SCORE)
+QUALITY_PENALTIES = {
+    "no_text": 1.0,
+    "low_mean_confidence": 0.5,
+    "low_confidence_area": 0.5,
+    "few_words": 0.6,
+    "low_unique_tokens": 0.5,
+    "table_layout": 0.5,
+    "duplicate_of_previous": 0.5,
+    "repeated_header": 0.15,
+}
+
+_ISSUE_MESSAGES = {
+    "no_text": "No text extracted",
+    "low_mean_confidence": "Low mean word confidence",
+    "low_confidence_area": "Large low-confidence area",
+    "few_words": "Very few words extracted",
+    "low_unique_tokens": "Low unique token ratio",
+    "table_layout": "Table-heavy layout detected",
+    "duplicate_of_previous": "Same text as previous page",
+    "repeated_header": "Header repeated from previous page",
+}
+
+
+def assess_page_quality(
+    text_pages: List[str],
+    page_numbers: List[int],
+    skip_pages: Iterable[int] = (),
+    confidences: Optional[Dict[int, Dict[str, Any]]] = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Score the OCR quality of every page
+    
+    Pages with Tesseract word confidences are judged on them (mean confidence
+    and low-confidence area, HYBRID_FALLBACK_MIN_MEAN_CONFIDENCE /
+    HYBRID_FALLBACK_MAX_LOW_CONFIDENCE_AREA); the text heuristics (unique
+    tokens, table layout, repeated header) are only used for pages without
+    confidences, since they also trigger on well-recognized table pages.
+    
+    Args:
+        text_pages: Extracted text per page (aligned with page_numbers)
+        page_numbers: Page numbers
+        skip_pages: Pages not to assess (e.g. text-layer or previously completed pages)
+        confidences: page_num -> confidence_stats() of the page's Tesseract result
+    
+    Returns:
+        page_num -> {"score": 0.0-1.0, "valid": bool, "issues": [issue, ...], "details": {...},
+                     "confidence": {...} (pages with confidences)}
+    """
+    skip = set(skip_pages)
+    min_score = settings.hybrid_fallback_min_score
+    verdicts: Dict[int, Dict[str, Any]] = {}
+    previous_header = None
+    previous_hash = None
     
-    # Check 5: Check for "no meaningful content" (mostly whitespace or special chars)
     for i, page_text in enumerate(text_pages):
-        if len(page_text.strip()) < 20:
-            continue
-        
-        # Check if text has reasonable word-to-char ratio
-        words = re.findall(r'\b\w+\b', page_text)
-        if len(words) < 5:
-            issues.append(f"Page {page_numbers[i] if i < len(page_numbers) else i+1}: Very few words extracted")
+        page_num = page_numbers[i] if i < len(page_numbers) else i + 1
+        issues: List[str] = []
+        details: Dict[str, Any] = {}
+        stripped = page_text.strip()
+        
+        # Normalized first 5 lines (header area) and text hash, compared with the previous page
+        header = re.sub(r'\s+', ' ', ' '.join(page_text.splitlines()[:5]).lower().strip())
+        text_hash = _text_hash(page_text) if stripped else None
+        
+        confidence = (confidences or {}).get(page_num)
+        if page_num not in skip:
+            if len(stripped) < 20:
+                issues.append("no_text")
+            elif confidence is not None:
+                if confidence["meanConf"] < settings.hybrid_fallback_min_mean_confidence:
+                    issues.append("low_mean_confidence")
+                if confidence["lowConfArea"] > settings.hybrid_fallback_max_low_confidence_area:
+                    issues.append("low_confidence_area")
+                if text_hash is not None and text_hash == previous_hash:
+                    issues.append("duplicate_of_previous")
+            else:
+                # Reasonable word-to-char ratio
+                words = re.findall(r'\b\w+\b', page_text)
+                if len(words) < 5:
+                    issues.append("few_words")
+                
+                # Very low unique-token ratio (duplicate content)
+                tokens = page_text.lower().split()
+                if len(stripped) >= 50 and len(tokens) >= 10:
+                    unique_ratio = len(set(tokens)) / len(tokens)
+                    details["uniqueTokenRatio"] = round(unique_ratio, 3)
+                    if unique_ratio < 0.3:
+                        issues.append("low_unique_tokens")
+                
+                # Table-heavy layout: many short lines, few very long lines
+                lines = [line.strip() for line in page_text.splitlines() if line.strip()]
+                if len(stripped) >= 100 and len(lines) >= 10:
+                    short_line_ratio = sum(1 for line in lines if 5 <= len(line) <= 60) / len(lines)
+                    long_line_ratio = sum(1 for line in lines if len(line) > 100) / len(lines)
+                    details["shortLineRatio"] = round(short_line_ratio, 3)
+                    if short_line_ratio > 0.6 and long_line_ratio < 0.2:
+                        issues.append("table_layout")
+                
+                if text_hash is not None and text_hash == previous_hash:
+                    issues.append("duplicate_of_previous")
+                elif len(header) > 20 and previous_header and _text_similarity(header, previous_header) > 0.85:
+                    issues.append("repeated_header")
+            
+            score = max(0.0, 1.0 - sum(QUALITY_PENALTIES[issue] for issue in issues))
+            verdicts[page_num] = {
+                "score": round(score, 3),
+                "valid": score >= min_score,
+                "issues": issues,
+                "details": details,
+            }
+            if confidence is not None:
+                verdicts[page_num]["confidence"] = confidence
+        
+        previous_header = header if len(header) > 20 else None
+        previous_hash = text_hash
+    
+    return verdicts
+
+
+def validate_ocr_quality(text_pages: List[str], page_numbers: List[int]) -> Tuple[bool, List[str]]:
+    """
+    Validate OCR quality and detect common issues (document-level view of assess_page_quality)
     
-    # If any issues found, OCR quality is questionable
-    is_valid = len(issues) == 0
+    Returns:
+        (is_valid, issues) tuple
+        is_valid: False if any page fails its quality check
+        issues: List of detected quality issues
+    """
+    if not text_pages:
+        return False, ["No text extracted"]
     
-    return is_valid, issues
+    verdicts = assess_page_quality(text_pages, page_numbers)
+    issues = [
+        f"Page {page_num}: {_ISSUE_MESSAGES[issue]} (score {verdict['score']:.2f})"
+        for page_num, verdict in verdicts.items()
+        for issue in verdict["issues"]
+    ]
+    return all(verdict["valid"] for verdict in verdicts.values()), issues
 
 
 def _text_similarity(text1: str, text2: str) -> float:
@@ -313,7 +514,7 @@ def _text_hash(text: str) -> str:
 
 def extract_text_with_gpt4_vision(image: Image.Image, page_num: int) -> str:
     """
-    Extract text using GPT-4.1 Vision API (Stage 2 fallback)
+    Extract text using GPT-4.1 Vision API (Stage 2 fallback), through the OCR cache
     
     Args:
         image: PIL Image object
@@ -322,20 +523,21 @@ def extract_text_with_gpt4_vision(image: Image.Image, page_num: int) -> str:
     Returns:
         Extracted text
     """
+    return ocr_cache.cached_ocr(
+        image, "gpt4_vision", "gpt-4o", f"hybrid_fallback|{vision_encoding_signature(detail='auto')}", "",
+        lambda: _gpt4_vision_request(image, page_num)
+    )
+
+
+def _gpt4_vision_request(image: Image.Image, page_num: int) -> str:
+    """GPT-4 Vision API call behind extract_text_with_gpt4_vision"""
     openai_client = get_openai_client()
     if not openai_client:
         raise Exception("OpenAI client not available (OPENAI_API_KEY not configured)")
     
     try:
-        # Convert PIL Image to base64
-        import base64
-        import io
-        
-        # Save image to bytes
-        img_bytes = io.BytesIO()
-        image.save(img_bytes, format='PNG')
-        img_bytes.seek(0)
-        image_b64 = base64.b64encode(img_bytes.read()).decode('utf-8')
+        # Compact encoding (VISION_IMAGE_* settings), sized for the API's default "auto" detail
+        image_data_url = image_to_base64_data_url(image, detail="auto")
         
         # Prepare prompt
         prompt = """Extract ALL readable text from this document page. 
@@ -362,7 +564,7 @@ CRITICAL INSTRUCTIONS:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_b64}",
+                                "url": image_data_url,
                             },
                         },
                     ],
@@ -403,15 +605,8 @@ def extract_text_from_pdf_page_hybrid(
         (extracted_text, method_used) tuple
         method_used: "tesseract" or "gpt4_vision"
     """
-    if convert_from_path is None:
-        raise ImportError("pdf2image not installed")
-    
-    # Convert PDF page to image
-    images = convert_from_path(str(pdf_path), dpi=dpi, first_page=page_num, last_page=page_num)
-    if not images:
-        raise Exception(f"Failed to convert page {page_num} to image")
-    
-    image = images[0]
+    # Render PDF page to image (shared rasterizer + page cache)
+    image = render_page(pdf_path, page_num, dpi=dpi)
     original_image = image.copy()  # Keep original for GPT-4 Vision
     
     if force_gpt4:
@@ -421,8 +616,7 @@ def extract_text_from_pdf_page_hybrid(
     
     # Stage 1: Tesseract OCR with preprocessing
     try:
-        preprocessed_image = preprocess_image_for_ocr(image)
-        text_tesseract = extract_text_with_tesseract(preprocessed_image, lang=lang)
+        text_tesseract = tesseract_page_text(image, lang=lang)
         
         if DEBUG_OCR:
             print(f"[Hybrid OCR] page={page_num} Tesseract extracted {len(text_tesseract)} chars")
@@ -444,7 +638,11 @@ def extract_all_pages_hybrid(
     pdf_path: Path,
     total_pages: int,
     dpi: int = 200,
-    lang: str = "eng+ara"
+    lang: str = "eng+ara",
+    on_page: Optional[Callable[[int, str], None]] = None,
+    known_pages: Optional[Dict[int, str]] = None,
+    page_langs: Optional[Dict[int, str]] = None,
+    page_dpis: Optional[Dict[int, int]] = None
 ) -> Tuple[List[str], Dict[str, Any]]:
     """
     Extract text from all pages using hybrid OCR pipeline
@@ -458,92 +656,180 @@ def extract_all_pages_hybrid(
         total_pages: Total number of pages
         dpi: DPI for image conversion
         lang: Tesseract language code
+        on_page: Optional callback(page_num, text) called with each OCR'd page's final text: after
+                 quality validation for pages that pass, after the Vision fallback (or with the
+                 Tesseract text if the fallback fails) for the others. Pages are only
+                 checkpointed by the caller once no further OCR stage can replace their text.
+        known_pages: Text of pages that need no OCR (page_num -> text): pages completed by an
+                     earlier attempt, or digital/blank pages keeping their text layer; these pages
+                     are not OCR'd, neither by Tesseract nor by the Vision fallback
+        page_langs: Per-page Tesseract languages (page_num -> lang, see app.script_detect);
+                    pages not listed use lang
+        page_dpis: Per-page render DPI (page_num -> dpi, see app.page_layout); pages not listed use dpi
     
     Returns:
         (text_pages, metadata) tuple
         text_pages: List of extracted text per page
-        metadata: Dict with extraction metadata (methods_used, quality_issues, etc.)
+        metadata: Dict with extraction metadata (methods_used, quality_issues,
+                  page_seconds = {page_num: {"tesseract": s, "gpt4_vision": s}},
+                  page_confidence = {page_num: confidence_stats}, etc.)
     """
     if convert_from_path is None:
         raise ImportError("pdf2image not installed")
     
+    from app.ocr_pool import ocr_pool_enabled, run_pages_parallel, hybrid_tesseract_page_task
+    
     # Stage 1: Extract all pages with Tesseract
     text_pages = []
     page_numbers = list(range(1, total_pages + 1))
     methods_used = []
-    
-    print(f"[Hybrid OCR] Stage 1: Extracting {total_pages} pages with Tesseract...")
-    
-    # Convert all pages to images (more efficient)
-    all_images = convert_from_path(str(pdf_path), dpi=dpi)
-    
-    for page_num in range(1, total_pages + 1):
-        if page_num > len(all_images):
-            text_pages.append("")
-            methods_used.append("failed")
-            continue
-        
-        image = all_images[page_num - 1]
-        original_image = image.copy()
-        
-        try:
-            preprocessed_image = preprocess_image_for_ocr(image)
-            text_tesseract = extract_text_with_tesseract(preprocessed_image, lang=lang)
-            text_pages.append(text_tesseract)
-            methods_used.append("tesseract")
-            
+    page_seconds: Dict[int, Dict[str, float]] = {}
+    page_confidence: Dict[int, Dict[str, Any]] = {}
+    known_pages = known_pages or {}
+    page_langs = page_langs or {}
+    page_dpis = page_dpis or {}
+    if known_pages:
+        print(f"[Hybrid OCR] Stage 1: reusing {len(known_pages)} already extracted pages")
+    
+    if ocr_pool_enabled() and total_pages > 1:
+        print(f"[Hybrid OCR] Stage 1: Extracting {total_pages} pages with Tesseract (process pool)...")
+        
+        def _on_result(page_num: int, result: Tuple[str, List[List[int]]] | None, error: str | None):
+            if error is not None:
+                if DEBUG_OCR:
+                    print(f"[Hybrid OCR] page={page_num} Tesseract failed: {error}")
+                return
+            text, words = result
+            page_confidence[page_num] = confidence_stats(words)
             if DEBUG_OCR:
-                print(f"[Hybrid OCR] page={page_num} Tesseract: {len(text_tesseract)} chars")
+                print(f"[Hybrid OCR] page={page_num} Tesseract: {len(text)} chars")
+        
+        latencies: Dict[int, float] = {}
+        results = run_pages_parallel(
+            hybrid_tesseract_page_task, pdf_path, [n for n in page_numbers if n not in known_pages],
+            (dpi, lang), on_result=_on_result, latencies=latencies,
+            page_args={
+                n: (page_dpis.get(n, dpi), page_langs.get(n, lang)) for n in set(page_dpis) | set(page_langs)
+            }
+        )
+        for page_num, seconds in latencies.items():
+            page_seconds[page_num] = {"tesseract": seconds}
+        results.update({n: ((text, None), None) for n, text in known_pages.items()})
+        for page_num in page_numbers:
+            result, error = results.get(page_num, (None, "not processed"))
+            if error is None:
+                text_pages.append(result[0])
+                methods_used.append("tesseract")
+            else:
+                text_pages.append("")
+                methods_used.append("tesseract_failed")
+    else:
+        print(f"[Hybrid OCR] Stage 1: Extracting {total_pages} pages with Tesseract...")
+        
+        # Pages are rendered in small windows (OCR_RENDER_MEMORY_MB), not all at once
+        # Pages planned at another DPI are rendered on their own
+        rendered = iter_page_images(
+            pdf_path, [n for n in page_numbers if n not in known_pages and page_dpis.get(n, dpi) == dpi],
+            dpi=dpi, colorspace="gray"
+        )
         
-        except Exception as e:
-            if DEBUG_OCR:
-                print(f"[Hybrid OCR] page={page_num} Tesseract failed: {e}")
-            text_pages.append("")
-            methods_used.append("tesseract_failed")
+        for page_num in range(1, total_pages + 1):
+            if page_num in known_pages:
+                text_pages.append(known_pages[page_num])
+                methods_used.append("tesseract")
+                continue
+            if page_dpis.get(page_num, dpi) != dpi:
+                try:
+                    image = render_page(pdf_path, page_num, dpi=page_dpis[page_num], colorspace="gray")
+                except Exception as e:
+                    print(f"[Hybrid OCR] page={page_num} render failed: {e}")
+                    image = None
+            else:
+                _, image = next(rendered, (page_num, None))
+            if image is None:
+                text_pages.append("")
+                methods_used.append("failed")
+                continue
+            
+            try:
+                t0 = time.monotonic()
+                text_tesseract, words = tesseract_page_ocr(image, lang=page_langs.get(page_num, lang))
+                page_seconds[page_num] = {"tesseract": time.monotonic() - t0}
+                page_confidence[page_num] = confidence_stats(words)
+                text_pages.append(text_tesseract)
+                methods_used.append("tesseract")
+                
+                if DEBUG_OCR:
+                    print(f"[Hybrid OCR] page={page_num} Tesseract: {len(text_tesseract)} chars")
+            
+            except Exception as e:
+                if DEBUG_OCR:
+                    print(f"[Hybrid OCR] page={page_num} Tesseract failed: {e}")
+                text_pages.append("")
+                methods_used.append("tesseract_failed")
     
-    # Quality Validation
+    # Quality Validation: per-page verdicts; pages that need no OCR are not assessed
     print(f"[Hybrid OCR] Quality validation...")
-    is_valid, issues = validate_ocr_quality(text_pages, page_numbers)
+    verdicts = assess_page_quality(text_pages, page_numbers, skip_pages=known_pages, confidences=page_confidence)
+    fallback_reasons = {n: v["issues"] for n, v in verdicts.items() if not v["valid"]}
+    issues = [
+        f"Page {n}: {', '.join(_ISSUE_MESSAGES[i] for i in reasons)} (score {verdicts[n]['score']:.2f})"
+        for n, reasons in fallback_reasons.items()
+    ]
     
     metadata = {
         "methods_used": methods_used,
         "quality_issues": issues,
-        "quality_valid": is_valid,
+        "quality_valid": not fallback_reasons,
+        "page_quality": verdicts,
+        "page_confidence": page_confidence,
+        "fallback_pages": fallback_reasons,
+        "page_seconds": page_seconds,
     }
     
-    if is_valid:
+    # Pages that passed are final now
+    if on_page is not None:
+        for page_num in page_numbers:
+            if page_num not in known_pages and page_num not in fallback_reasons and text_pages[page_num - 1]:
+                on_page(page_num, text_pages[page_num - 1])
+    
+    if not fallback_reasons:
         print(f"[Hybrid OCR] Quality check passed, using Tesseract results")
         return text_pages, metadata
     
-    # Stage 2: GPT-4 Vision fallback
-    print(f"[Hybrid OCR] Quality check failed ({len(issues)} issues), using GPT-4 Vision fallback...")
-    print(f"[Hybrid OCR] Issues: {', '.join(issues)}")
+    # Stage 2: GPT-4 Vision fallback for the failing pages only
+    # (VISION_OCR_MAX_CONCURRENCY requests in flight; Tesseract text is kept if a page fails)
+    print(f"[Hybrid OCR] Quality check failed on {len(fallback_reasons)}/{len(verdicts)} pages, using GPT-4 Vision fallback for them...")
+    print(f"[Hybrid OCR] Issues: {'; '.join(issues)}")
     
-    # Use GPT-4 Vision for all pages (replace Tesseract results)
-    text_pages_gpt4 = []
-    for page_num in range(1, total_pages + 1):
-        if page_num > len(all_images):
-            text_pages_gpt4.append("")
-            continue
-        
-        original_image = all_images[page_num - 1]
-        
-        try:
-            text_gpt4 = extract_text_with_gpt4_vision(original_image, page_num)
-            text_pages_gpt4.append(text_gpt4)
-            methods_used[page_num - 1] = "gpt4_vision"
-            
-            if DEBUG_OCR:
-                print(f"[Hybrid OCR] page={page_num} GPT-4 Vision: {len(text_gpt4)} chars")
-        
-        except Exception as e:
-            print(f"[Hybrid OCR] page={page_num} GPT-4 Vision failed: {e}")
+    from app.ocr_vision import vision_ocr_pdf_pages
+    
+    text_pages_gpt4 = list(text_pages)
+    fallback_latencies: Dict[int, float] = {}
+    
+    def _on_fallback_result(page_num: int, text_gpt4: str | None, error: str | None):
+        if on_page is not None:
+            on_page(page_num, text_gpt4 if error is None else text_pages[page_num - 1])
+    
+    results = vision_ocr_pdf_pages(
+        pdf_path, list(fallback_reasons), dpi=dpi, latencies=fallback_latencies,
+        ocr_fn=extract_text_with_gpt4_vision, label="GPT-4 Vision", page_dpis=page_dpis,
+        on_result=_on_fallback_result
+    )
+    for page_num, (text_gpt4, error) in results.items():
+        if error is not None:
+            print(f"[Hybrid OCR] page={page_num} GPT-4 Vision failed: {error}")
             # Keep Tesseract result if GPT-4 fails
-            text_pages_gpt4.append(text_pages[page_num - 1] if page_num <= len(text_pages) else "")
             methods_used[page_num - 1] = "gpt4_vision_failed"
+            continue
+        text_pages_gpt4[page_num - 1] = text_gpt4
+        methods_used[page_num - 1] = "gpt4_vision"
+        page_seconds.setdefault(page_num, {})["gpt4_vision"] = fallback_latencies.get(page_num, 0.0)
+        
+        if DEBUG_OCR:
+            print(f"[Hybrid OCR] page={page_num} GPT-4 Vision: {len(text_gpt4)} chars")
     
     metadata["methods_used"] = methods_used
     metadata["fallback_used"] = True
     
     return text_pages_gpt4, metadata
-
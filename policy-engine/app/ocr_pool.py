@@ -0,0 +1,155 @@
+"""
+Process-pool OCR execution
+
+Tesseract and the OpenCV preprocessing are CPU-bound, so running them page by
+page inside one job thread leaves most cores idle. This module fans the pages
+of a document out to a process pool (OCR_WORKERS processes). Each worker
+renders its own page from the PDF, so only page numbers and text cross the
+process boundary.
+
+Worker processes are limited to one thread each (OMP_THREAD_LIMIT etc.) so
+N workers use N cores instead of oversubscribing them.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.config import settings
+
+# Env vars that cap per-process threading in tesseract (OpenMP), numpy BLAS and OpenCV
+_THREAD_LIMIT_VARS = (
+    "OMP_THREAD_LIMIT",
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    """Process initializer: one thread per worker"""
+    for var in _THREAD_LIMIT_VARS:
+        os.environ[var] = "1"
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except Exception:
+        pass
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Get (lazily create) the shared OCR process pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a multi-threaded server process is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.ocr_workers),
+                mp_context=ctx,
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def shutdown_ocr_pool():
+    """Shut down the OCR process pool (if started)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def ocr_pool_enabled() -> bool:
+    """Whether OCR should be fanned out to worker processes"""
+    return settings.ocr_workers > 1
+
+
+# ----------------------------------------------------------------------
+# Worker tasks (module-level so they can be pickled)
+# ----------------------------------------------------------------------
+def tesseract_page_task(pdf_path: str, page_num: int, dpi: int, lang: str, preset: str) -> str:
+    """Render + Tesseract OCR of one page (app.ocr path)"""
+    from app.ocr import extract_text_from_pdf_page
+    return extract_text_from_pdf_page(Path(pdf_path), page_num, dpi=dpi, lang=lang, preset=preset)
+
+
+def hybrid_tesseract_page_task(pdf_path: str, page_num: int, dpi: int, lang: str) -> Tuple[str, List[List[int]]]:
+    """Render + preprocess + Tesseract OCR of one page (hybrid pipeline Stage 1): (text, word confidences)"""
+    from app.ocr_hybrid import tesseract_page_ocr
+    from app.page_raster import render_page
+    return tesseract_page_ocr(render_page(Path(pdf_path), page_num, dpi=dpi, colorspace="gray"), lang=lang)
+
+
+def _timed_task(task: Callable[..., str], *args) -> Tuple[str, float, Dict[str, int]]:
+    """Run a task in the worker and return (result, seconds spent in the worker, OCR cache counts)"""
+    from app import ocr_cache
+    counter = ocr_cache.CacheCounter()
+    t0 = time.monotonic()
+    with ocr_cache.track(counter):
+        result = task(*args)
+    return result, time.monotonic() - t0, counter.counts
+
+
+def run_pages_parallel(
+    task: Callable[..., str],
+    pdf_path: Path,
+    page_numbers: List[int],
+    task_args: Tuple = (),
+    on_result: Callable[[int, str | None, str | None], None] | None = None,
+    latencies: Dict[int, float] | None = None,
+    page_args: Dict[int, Tuple] | None = None
+) -> Dict[int, Tuple[str | None, str | None]]:
+    """
+    Run a per-page OCR task for many pages on the process pool
+
+    Args:
+        task: Module-level worker function called as task(pdf_path, page_num, *task_args)
+        pdf_path: Path to PDF file
+        page_numbers: Pages to process (1-indexed)
+        task_args: Extra positional args for the task
+        on_result: Called as on_result(page_num, text, error) in completion order
+        latencies: If given, filled with page_num -> seconds spent on the page in the worker
+        page_args: Per-page task args replacing task_args (e.g. per-page OCR languages)
+
+    Returns:
+        Dict page_num -> (text, error); iterate sorted(keys) for page order
+    """
+    from app import ocr_cache
+    # OCR cache hits/misses counted in the workers are added to the calling job's counters
+    sink = ocr_cache.current_sink()
+    pool = get_ocr_pool()
+    futures = {
+        pool.submit(_timed_task, task, str(pdf_path), page_num, *(page_args or {}).get(page_num, task_args)): page_num
+        for page_num in page_numbers
+    }
+
+    results: Dict[int, Tuple[str | None, str | None]] = {}
+    for future in as_completed(futures):
+        page_num = futures[future]
+        try:
+            text, seconds, counts = future.result()
+            error = None
+            if latencies is not None:
+                latencies[page_num] = seconds
+            if sink is not None:
+                for name, n in counts.items():
+                    sink.count(name, n)
+        except Exception as e:
+            text, error = None, str(e)
+        results[page_num] = (text, error)
+        if on_result is not None:
+            try:
+                on_result(page_num, text, error)
+            except Exception as cb_error:
+                print(f"[OCR Pool] page={page_num} result callback failed: {cb_error}")
+
+    return dict(sorted(results.items()))
@@ -5,9 +5,15 @@ Extracts text from PDF pages using OpenAI Vision API (Responses API with image i
 """
 import os
 import base64
+import contextvars
+import hashlib
 import io
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 from PIL import Image
 
 try:
@@ -19,22 +25,47 @@ except ImportError:
 
 from app.openai_client import get_openai_client
 from app.config import settings
+from app import ocr_cache
+from app.page_raster import render_page
 
 DEBUG_OCR = os.getenv("DEBUG_OCR", "false").lower() == "true"
 
+# Prompt with safeguard
+VISION_OCR_PROMPT = """Extract ALL text from this document page exactly as it appears.
+
+CRITICAL INSTRUCTIONS:
+- Extract EVERY word, number, and character you can see
+- Preserve the exact order and layout
+- Keep headings, bullets, and formatting indicators
+- Do NOT summarize, paraphrase, or interpret
+- Do NOT add explanations or comments
+- If text is unreadable or unclear, return empty string
+- Do NOT invent or hallucinate text that is not visible
+- Output ONLY the extracted text, nothing else
+
+Extract the text now:"""
+# Part of the OCR cache key, so editing the prompt invalidates cached results
+VISION_OCR_CACHE_PRESET = "vision_ocr:" + hashlib.sha256(VISION_OCR_PROMPT.encode("utf-8")).hexdigest()[:12]
+
 
 def render_pdf_page_to_image(
     pdf_path: Path,
     page_num: int,
-    dpi: int = 225
+    dpi: int = 225,
+    colorspace: str | None = None
 ) -> Image.Image:
     """
-    Render a single PDF page to PIL Image using PyMuPDF
+    Render a single PDF page to PIL Image
+    
+    Goes through the shared page rasterizer, so the document stays open across
+    pages of a job and a page already rendered at this DPI (e.g. by Tesseract)
+    comes from the page cache.
     
     Args:
         pdf_path: Path to PDF file
         page_num: Page number (1-indexed)
         dpi: Target DPI (default: 225, between 200-250 as requested)
+        colorspace: "rgb" | "gray" (default: gray unless VISION_IMAGE_COLOR=color)
     
     Returns:
         PIL Image object
@@ -42,60 +73,175 @@ def render_pdf_page_to_image(
     if not PYMUPDF_AVAILABLE:
         raise ImportError("PyMuPDF (fitz) not installed - required for Vision OCR")
     
-    try:
-        # Open PDF
-        doc = fitz.open(str(pdf_path))
-        
-        # Get page (0-indexed)
-        page = doc[page_num - 1]
-        
-        # Calculate zoom factor for target DPI
-        # PyMuPDF default DPI is 72, so zoom = target_dpi / 72
-        zoom = dpi / 72.0
-        mat = fitz.Matrix(zoom, zoom)
-        
-        # Render page to pixmap
-        pix = page.get_pixmap(matrix=mat)
-        
-        # Convert to PIL Image
-        img_data = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_data))
-        
-        # Close document
-        doc.close()
-        
+    if colorspace is None:
+        colorspace = "rgb" if settings.vision_image_color == "color" else "gray"
+    return render_page(pdf_path, page_num, dpi=dpi, colorspace=colorspace)
+
+
+def _vision_encoding(**overrides) -> Dict[str, Any]:
+    """Effective encoding options (settings, overridden by non-None keyword arguments)"""
+    encoding = {
+        "format": settings.vision_image_format,
+        "color": settings.vision_image_color,
+        "quality": settings.vision_image_quality,
+        "max_side": settings.vision_image_max_side,
+        "crop": settings.vision_image_crop_margins,
+        "detail": settings.vision_ocr_detail,
+    }
+    encoding.update({k: v for k, v in overrides.items() if v is not None})
+    return encoding
+
+
+def vision_encoding_signature(**overrides) -> str:
+    """Encoding options as a string (part of the OCR cache key)"""
+    encoding = _vision_encoding(**overrides)
+    return ",".join(f"{k}={encoding[k]}" for k in sorted(encoding))
+
+
+def _vision_target_size(width: int, height: int, detail: str, max_side: int) -> Tuple[int, int]:
+    """
+    Size the API would downscale the image to anyway
+    
+    detail=low: fit in 512x512. high/auto: fit in 2048x2048, then shortest
+    side at most 768px. Sending more pixels only costs upload time.
+    max_side < 0 keeps the original size.
+    """
+    if max_side < 0:
+        return width, height
+    if detail == "low":
+        scale = min(1.0, 512 / max(width, height))
+    else:
+        scale = min(1.0, 2048 / max(width, height), 768 / min(width, height))
+    if max_side > 0:
+        scale = min(scale, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _otsu_threshold(gray: Image.Image) -> int:
+    """Otsu threshold of a grayscale image"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_threshold, best_variance = 127, -1.0
+    for t in range(256):
+        weight_bg += histogram[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * histogram[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = t, variance
+    return best_threshold
+
+
+def _crop_margins(image: Image.Image, pad_ratio: float = 0.02) -> Image.Image:
+    """Crop near-white borders, keeping a small padding"""
+    gray = image if image.mode == "L" else image.convert("L")
+    ink = gray.point(lambda p: 255 if p < 235 else 0)
+    bbox = ink.getbbox()
+    if not bbox:
         return image
+    pad = int(max(image.size) * pad_ratio)
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - pad), max(0, top - pad),
+        min(image.width, right + pad), min(image.height, bottom + pad)
+    ))
+
+
+def encode_image_for_vision(
+    image: Image.Image,
+    format: str | None = None,
+    color: str | None = None,
+    quality: int | None = None,
+    max_side: int | None = None,
+    crop: bool | None = None,
+    detail: str | None = None
+) -> Tuple[bytes, str]:
+    """
+    Encode a page image compactly for a Vision request
+    
+    A 225-dpi color PNG of an A4 page is several MB. Pages are sent as
+    grayscale (or bilevel) JPEG/WebP, cropped to the printed area if enabled,
+    and no larger than the API would process at the configured detail.
+    Options default to the VISION_IMAGE_* settings.
+    
+    Args:
+        image: Rendered page
+        format: "jpeg" | "webp" | "png"
+        color: "gray" | "bilevel" | "color"
+        quality: JPEG/WebP quality
+        max_side: Cap for the longest side in px (0 = API-driven only, -1 = no downscaling)
+        crop: Crop blank margins
+        detail: Vision detail level used for adaptive sizing
+    
+    Returns:
+        (image_bytes, mime_type) tuple
+    """
+    encoding = _vision_encoding(
+        format=format, color=color, quality=quality, max_side=max_side, crop=crop, detail=detail
+    )
+    
+    if encoding["color"] == "color":
+        image = image if image.mode == "RGB" else image.convert("RGB")
+    else:
+        image = image if image.mode == "L" else image.convert("L")
     
-    except Exception as e:
-        raise Exception(f"Failed to render PDF page {page_num} to image: {str(e)}")
+    if encoding["crop"]:
+        image = _crop_margins(image)
+    
+    size = _vision_target_size(image.width, image.height, encoding["detail"], encoding["max_side"])
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+    
+    if encoding["color"] == "bilevel":
+        threshold = _otsu_threshold(image)
+        image = image.point(lambda p: 255 if p > threshold else 0)
+    
+    buffer = io.BytesIO()
+    fmt = encoding["format"]
+    if fmt == "png":
+        if encoding["color"] == "bilevel":
+            image = image.convert("1")
+        image.save(buffer, format="PNG", optimize=True)
+        mime = "image/png"
+    elif fmt == "webp":
+        image.save(buffer, format="WEBP", quality=encoding["quality"], method=4)
+        mime = "image/webp"
+    else:
+        image.save(buffer, format="JPEG", quality=encoding["quality"], optimize=True)
+        mime = "image/jpeg"
+    return buffer.getvalue(), mime
 
 
-def image_to_base64_data_url(image: Image.Image) -> str:
+def image_to_base64_data_url(image: Image.Image, **encoding) -> str:
     """
     Convert PIL Image to base64 data URL
     
     Args:
         image: PIL Image object
+        **encoding: Overrides for encode_image_for_vision (format, color, quality, ...)
     
     Returns:
-        Base64 data URL string (data:image/png;base64,...)
+        Base64 data URL string (data:image/jpeg;base64,...)
     """
-    # Convert to PNG bytes
-    img_bytes = io.BytesIO()
-    image.save(img_bytes, format='PNG')
-    img_bytes.seek(0)
-    
-    # Encode to base64
-    img_base64 = base64.b64encode(img_bytes.read()).decode('utf-8')
-    
-    return f"data:image/png;base64,{img_base64}"
+    img_bytes, mime = encode_image_for_vision(image, **encoding)
+    img_base64 = base64.b64encode(img_bytes).decode('utf-8')
+    return f"data:{mime};base64,{img_base64}"
 
 
 def vision_ocr_page(
     image_bytes: bytes | None = None,
     image: Image.Image | None = None,
     page_num: int = 1,
-    lang_hint: str = "en"
+    lang_hint: str = "en",
+    encoding: Dict[str, Any] | None = None
 ) -> str:
     """
     Extract text from a page image using OpenAI Vision API
@@ -105,13 +251,12 @@ def vision_ocr_page(
         image: PIL Image object - either this or image_bytes must be provided
         page_num: Page number (for logging)
         lang_hint: Language hint (currently not used by Vision API, but kept for compatibility)
+        encoding: Overrides for encode_image_for_vision (default: VISION_IMAGE_* settings)
     
     Returns:
         Extracted plain text
     """
-    openai_client = get_openai_client()
-    if not openai_client:
-        raise Exception("OpenAI client not available (OPENAI_API_KEY not configured)")
+    encoding = encoding or {}
     
     # Get image
     if image is None:
@@ -119,74 +264,72 @@ def vision_ocr_page(
             raise ValueError("Either image_bytes or image must be provided")
         image = Image.open(io.BytesIO(image_bytes))
     
-    # Convert image to base64 data URL
-    image_data_url = image_to_base64_data_url(image)
-    
     # Get model and detail from config
     model = settings.vision_ocr_model
-    detail = settings.vision_ocr_detail
+    detail = encoding.get("detail") or settings.vision_ocr_detail
     
-    # Build prompt with safeguard
-    prompt = """Extract ALL text from this document page exactly as it appears.
-
-CRITICAL INSTRUCTIONS:
-- Extract EVERY word, number, and character you can see
-- Preserve the exact order and layout
-- Keep headings, bullets, and formatting indicators
-- Do NOT summarize, paraphrase, or interpret
-- Do NOT add explanations or comments
-- If text is unreadable or unclear, return empty string
-- Do NOT invent or hallucinate text that is not visible
-- Output ONLY the extracted text, nothing else
-
-Extract the text now:"""
+    def _ocr() -> str:
+        openai_client = get_openai_client()
+        if not openai_client:
+            raise Exception("OpenAI client not available (OPENAI_API_KEY not configured)")
+        
+        # Convert image to base64 data URL
+        image_data_url = image_to_base64_data_url(image, **encoding)
+    
+        prompt = VISION_OCR_PROMPT
+    
+        if DEBUG_OCR:
+            print(f"[VISION_OCR] start page={page_num} model={model} detail={detail}")
     
-    if DEBUG_OCR:
-        print(f"[VISION_OCR] start page={page_num} model={model} detail={detail}")
-    
-    try:
-        # Call OpenAI Vision API
-        response = openai_client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_data_url,
-                                "detail": detail,
+        try:
+            # Call OpenAI Vision API
+            response = openai_client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": image_data_url,
+                                    "detail": detail,
+                                },
                             },
-                        },
-                    ],
-                }
-            ],
-            max_tokens=4000,
-        )
+                        ],
+                    }
+                ],
+                max_tokens=4000,
+            )
         
-        # Extract text from response
-        extracted_text = response.choices[0].message.content or ""
+            # Extract text from response
+            extracted_text = response.choices[0].message.content or ""
         
-        # Log response metadata if available
-        if DEBUG_OCR:
-            response_id = getattr(response, 'id', None)
-            usage = getattr(response, 'usage', None)
-            if response_id:
-                print(f"[VISION_OCR] response_id={response_id}")
-            if usage:
-                tokens_used = getattr(usage, 'total_tokens', None)
-                if tokens_used:
-                    print(f"[VISION_OCR] tokens_used={tokens_used}")
-            print(f"[VISION_OCR] page={page_num} extracted {len(extracted_text)} chars")
+            # Log response metadata if available
+            if DEBUG_OCR:
+                response_id = getattr(response, 'id', None)
+                usage = getattr(response, 'usage', None)
+                if response_id:
+                    print(f"[VISION_OCR] response_id={response_id}")
+                if usage:
+                    tokens_used = getattr(usage, 'total_tokens', None)
+                    if tokens_used:
+                        print(f"[VISION_OCR] tokens_used={tokens_used}")
+                print(f"[VISION_OCR] page={page_num} extracted {len(extracted_text)} chars")
         
-        return extracted_text
+            return extracted_text
+    
+        except Exception as e:
+            error_msg = f"OpenAI Vision OCR failed for page {page_num}: {str(e)}"
+            print(f"[VISION_OCR] ERROR: {error_msg}")
+            raise Exception(error_msg)
     
-    except Exception as e:
-        error_msg = f"OpenAI Vision OCR failed for page {page_num}: {str(e)}"
-        print(f"[VISION_OCR] ERROR: {error_msg}")
-        raise Exception(error_msg)
+    # Pages whose pixels were OCR'd before come from the OCR cache
+    return ocr_cache.cached_ocr(
+        image, "vision", f"{model}:{detail}",
+        f"{VISION_OCR_CACHE_PRESET}|{vision_encoding_signature(**encoding)}", lang_hint, _ocr
+    )
 
 
 def vision_ocr_pdf_page(
@@ -217,3 +360,109 @@ def vision_ocr_pdf_page(
     
     return text
 
+
+
+def vision_ocr_pdf_pages(
+    pdf_path: Path,
+    page_numbers: List[int],
+    dpi: int = 225,
+    lang_hint: str = "en",
+    max_concurrency: int | None = None,
+    on_result: Optional[Callable[[int, str | None, str | None], None]] = None,
+    latencies: Dict[int, float] | None = None,
+    ocr_fn: Optional[Callable[[Image.Image, int], str]] = None,
+    label: str = "Vision OCR",
+    page_dpis: Dict[int, int] | None = None
+) -> Dict[int, Tuple[str | None, str | None]]:
+    """
+    Vision OCR of many pages with a bounded number of requests in flight
+    
+    Pages are rendered in order on the calling thread while up to
+    max_concurrency requests (VISION_OCR_MAX_CONCURRENCY) run on worker threads,
+    so rendering the next page overlaps with the round trips of earlier ones.
+    At most one rendered page waits for a free slot. Transient API errors are
+    retried (app.retry).
+    
+    Args:
+        pdf_path: Path to PDF file
+        page_numbers: Pages to process (1-indexed)
+        dpi: DPI for rendering
+        lang_hint: Language hint (for compatibility, not used by Vision API)
+        max_concurrency: Requests in flight (default: VISION_OCR_MAX_CONCURRENCY)
+        on_result: Called as on_result(page_num, text, error) in page order, on the calling thread
+        latencies: If given, filled with page_num -> seconds spent on the request
+        ocr_fn: OCR call as ocr_fn(image, page_num) (default: vision_ocr_page); e.g. the
+                hybrid pipeline's GPT-4 Vision fallback
+        label: Used in log messages
+        page_dpis: Per-page render DPI overriding dpi (see app.page_layout)
+    
+    Returns:
+        Dict page_num -> (text, error) in page order
+    """
+    from app.retry import call_with_retries
+    
+    concurrency = max(1, max_concurrency or settings.vision_ocr_max_concurrency)
+    slots = threading.BoundedSemaphore(concurrency)
+    pending: Deque[Tuple[int, Future | None, str | None]] = deque()
+    results: Dict[int, Tuple[str | None, str | None]] = {}
+    
+    def _request(page_num: int, image: Image.Image) -> Tuple[str, float]:
+        try:
+            t0 = time.monotonic()
+            if ocr_fn is not None:
+                text = call_with_retries(ocr_fn, image, page_num, label=f"{label} page={page_num}")
+            else:
+                text = call_with_retries(
+                    vision_ocr_page, image=image, page_num=page_num, lang_hint=lang_hint,
+                    label=f"{label} page={page_num}"
+                )
+            return text, time.monotonic() - t0
+        finally:
+            slots.release()
+    
+    def _emit(block: bool):
+        # Hand results out in page order: stop at the first page still in flight
+        while pending and (block or pending[0][1] is None or pending[0][1].done()):
+            page_num, future, error = pending.popleft()
+            text = None
+            if future is not None:
+                try:
+                    text, seconds = future.result()
+                    if latencies is not None:
+                        latencies[page_num] = seconds
+                except Exception as e:
+                    error = str(e)
+            results[page_num] = (text, error)
+            if on_result is not None:
+                try:
+                    on_result(page_num, text, error)
+                except Exception as cb_error:
+                    print(f"[VISION_OCR] page={page_num} result callback failed: {cb_error}")
+    
+    print(f"[VISION_OCR] {label}: {len(page_numbers)} pages with {concurrency} concurrent requests")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="vision-ocr") as executor:
+        for page_num in page_numbers:
+            try:
+                colorspace = "rgb" if settings.vision_image_color == "color" else "gray"
+                page_dpi = (page_dpis or {}).get(page_num, dpi)
+                image = render_page(pdf_path, page_num, dpi=page_dpi, colorspace=colorspace)
+            except Exception as e:
+                pending.append((page_num, None, str(e)))
+                _emit(block=False)
+                continue
+            
+            # Wait for a free slot, handing out finished pages meanwhile
+            while not slots.acquire(timeout=0.1):
+                _emit(block=False)
+            try:
+                # Run in a copy of this thread's context so OCR cache hits count towards the job
+                future = executor.submit(contextvars.copy_context().run, _request, page_num, image)
+            except Exception:
+                slots.release()
+                raise
+            pending.append((page_num, future, None))
+            _emit(block=False)
+        
+        _emit(block=True)
+    
+    return results
@@ -0,0 +1,193 @@
+"""
+OCR necessity classifier
+
+Forcing OCR on every page with fewer than MIN_TEXT_BEFORE_FORCE_OCR extracted
+characters sends short but fully digital pages (signature pages, section
+dividers, short procedures) to Vision OCR or Tesseract. This module decides
+per page from cheap structural signals instead:
+
+- glyphs: non-whitespace characters in the text layer
+- imageCoverage: share of the page area covered by raster images
+- fonts / embeddedFonts: fonts referenced by the page (PyMuPDF)
+- pixelStddev: grey-level standard deviation of a low-resolution render
+  (only computed for pages with (almost) no text and no large image)
+
+Decisions (needsOcr + reason + signals) are recorded in the manifest so OCR
+savings can be audited. OCR_CLASSIFIER_ENABLED=false restores the character
+threshold.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from app.config import settings
+
+# Reasons (recorded in the manifest)
+REASON_DIGITAL_TEXT = "digital_text"              # text layer with fonts, no large images -> no OCR
+REASON_TEXT_OVER_IMAGE = "text_layer_over_image"  # scan that already carries a full text layer -> no OCR
+REASON_BLANK = "blank"                            # no text, uniform pixels -> no OCR
+REASON_SCANNED = "scanned"                        # large image, little or no text layer -> OCR
+REASON_NO_TEXT_LAYER = "no_text_layer"            # visible content but no usable text layer -> OCR
+REASON_BELOW_MIN_TEXT = "below_min_text"          # threshold mode: fewer than MIN_TEXT_BEFORE_FORCE_OCR chars -> OCR
+REASON_TEXT = "text"                              # threshold mode: enough text -> no OCR
+
+# Resolution of the render used for the blank-page check
+BLANK_CHECK_DPI = 36
+
+
+def _glyph_count(text: str | None) -> int:
+    return sum(1 for c in (text or "") if not c.isspace())
+
+
+def _image_coverage(page) -> float:
+    """Share of the page area covered by images (overlaps counted once per image, capped at 1)"""
+    page_rect = page.rect
+    page_area = max(1.0, page_rect.width * page_rect.height)
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
+
+
+def _pixel_stddev(pdf_path: Path, page_num: int) -> float | None:
+    """Grey-level standard deviation of a low-resolution render (None if the page cannot be rendered)"""
+    try:
+        from PIL import ImageStat
+        from app.page_raster import render_page
+        image = render_page(pdf_path, page_num, dpi=BLANK_CHECK_DPI, colorspace="gray")
+        return ImageStat.Stat(image).stddev[0]
+    except Exception as e:
+        print(f"[OCR Classifier] page={page_num} blank check failed: {e}")
+        return None
+
+
+def _threshold_decision(text: str | None, needs_ocr: bool) -> Dict[str, Any]:
+    """Character-threshold rule used before the classifier existed"""
+    glyphs = _glyph_count(text)
+    if needs_ocr or len((text or "").strip()) < settings.min_text_before_force_ocr:
+        return {"needsOcr": True, "reason": REASON_BELOW_MIN_TEXT, "signals": {"glyphs": glyphs}}
+    return {"needsOcr": False, "reason": REASON_TEXT, "signals": {"glyphs": glyphs}}
+
+
+def classify_page(
+    pdf_path: Path,
+    page_num: int,
+    text: str | None,
+    page=None
+) -> Dict[str, Any]:
+    """
+    Decide whether one page needs OCR
+
+    Args:
+        pdf_path: Path to PDF file
+        page_num: Page number (1-indexed)
+        text: Text extracted from the page's text layer
+        page: Open PyMuPDF page (None if PyMuPDF is unavailable)
+
+    Returns:
+        {"needsOcr": bool, "reason": str, "signals": {...}}
+    """
+    glyphs = _glyph_count(text)
+    signals: Dict[str, Any] = {"glyphs": glyphs}
+
+    if page is not None:
+        fonts = page.get_fonts()
+        coverage = _image_coverage(page)
+        signals["fonts"] = len(fonts)
+        signals["embeddedFonts"] = sum(1 for font in fonts if font[1] != "n/a")
+        signals["imageCoverage"] = round(coverage, 3)
+
+        if coverage >= settings.ocr_classifier_image_coverage:
+            # Scanned page: trust its text layer only if it is substantial (earlier OCR / searchable scan)
+            if glyphs >= settings.min_text_before_force_ocr:
+                return {"needsOcr": False, "reason": REASON_TEXT_OVER_IMAGE, "signals": signals}
+            return {"needsOcr": True, "reason": REASON_SCANNED, "signals": signals}
+
+        if glyphs >= settings.ocr_classifier_min_glyphs and fonts:
+            return {"needsOcr": False, "reason": REASON_DIGITAL_TEXT, "signals": signals}
+    elif glyphs >= settings.min_text_before_force_ocr:
+        # Without PyMuPDF there are no structural signals; keep the threshold for non-blank pages
+        return {"needsOcr": False, "reason": REASON_TEXT, "signals": signals}
+
+    stddev = _pixel_stddev(pdf_path, page_num)
+    if stddev is not None:
+        signals["pixelStddev"] = round(stddev, 2)
+        if stddev < settings.ocr_classifier_blank_stddev:
+            return {"needsOcr": False, "reason": REASON_BLANK, "signals": signals}
+
+    if page is None:
+        return {"needsOcr": True, "reason": REASON_BELOW_MIN_TEXT, "signals": signals}
+    return {"needsOcr": True, "reason": REASON_NO_TEXT_LAYER, "signals": signals}
+
+
+def classify_pages(
+    pdf_path: Path,
+    pages_info: List[Tuple[int, str, bool]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Decide OCR necessity for every page
+
+    Args:
+        pdf_path: Path to PDF file
+        pages_info: (page_number, text, needs_ocr) tuples from extract_text_from_pdf
+
+    Returns:
+        page_number -> {"needsOcr", "reason", "signals"}
+    """
+    if not settings.ocr_classifier_enabled:
+        return {page_num: _threshold_decision(text, needs_ocr) for page_num, text, needs_ocr in pages_info}
+
+    decisions: Dict[int, Dict[str, Any]] = {}
+    doc = None
+    if fitz is not None and Path(pdf_path).suffix.lower() == ".pdf":
+        try:
+            doc = fitz.open(str(pdf_path))
+        except Exception as e:
+            print(f"[OCR Classifier] Could not open {pdf_path} with PyMuPDF ({e}); using text and pixel signals only")
+
+    try:
+        for page_num, text, _ in pages_info:
+            page = doc[page_num - 1] if doc is not None and page_num <= doc.page_count else None
+            try:
+                decisions[page_num] = classify_page(pdf_path, page_num, text, page)
+            except Exception as e:
+                print(f"[OCR Classifier] page={page_num} classification failed ({e}); using threshold")
+                decisions[page_num] = _threshold_decision(text, False)
+    finally:
+        if doc is not None:
+            doc.close()
+
+    summary = summarize_decisions(decisions)
+    print(f"[OCR Classifier] {summary['ocrPages']}/{len(decisions)} pages need OCR; reasons={summary['reasons']}")
+    return decisions
+
+
+def summarize_decisions(decisions: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Counts for the manifest
+
+    Returns:
+        {"ocrPages", "skippedPages", "reasons": {reason: count},
+         "savedVsThreshold": pages the character threshold would have OCR'd}
+    """
+    reasons: Dict[str, int] = {}
+    ocr_pages = 0
+    saved = 0
+    for decision in decisions.values():
+        reasons[decision["reason"]] = reasons.get(decision["reason"], 0) + 1
+        if decision["needsOcr"]:
+            ocr_pages += 1
+        elif decision["signals"].get("glyphs", 0) < settings.min_text_before_force_ocr:
+            saved += 1
+    return {
+        "ocrPages": ocr_pages,
+        "skippedPages": len(decisions) - ocr_pages,
+        "reasons": reasons,
+        "savedVsThreshold": saved,
+    }
@@ -0,0 +1,273 @@
+"""
+Page layout analysis and per-page OCR plans
+
+The OCR preset (normal_ocr / table_ocr) and render DPI used to be global, so
+a document with a few table pages needed an operator rerun with another
+preset. Pages about to be OCR'd are now classified from a low-resolution
+grayscale render:
+
+- mostly_blank: almost no ink
+- table: long horizontal and vertical ruling lines
+- form: ruled fields (horizontal lines without a grid) or many checkboxes
+- dense_small_print: many tightly spaced text lines
+- prose: everything else
+- unknown: the page could not be analyzed (no OpenCV, render failure)
+
+Each layout maps to a plan (LAYOUT_PROFILES): the Tesseract preset, the render
+DPI per provider, and optionally a provider (OCR_LAYOUT_PROVIDERS, e.g.
+"table=vision,form=vision"). Table pages get --psm 6 at a higher DPI while
+prose and blank pages use cheaper settings. A preset set explicitly on the job
+(or through OCR_PRESET) is kept for every page; the layout then only picks DPI
+and provider. Plans (layout, signals, preset, dpi, provider) are recorded per
+page in the manifest. OCR_AUTO_LAYOUT=false uses the job's preset and the
+default DPIs for every page.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    np = None
+    cv2 = None
+
+from app.config import settings
+
+LAYOUT_PROSE = "prose"
+LAYOUT_TABLE = "table"
+LAYOUT_FORM = "form"
+LAYOUT_BLANK = "mostly_blank"
+LAYOUT_SMALL_PRINT = "dense_small_print"
+LAYOUT_UNKNOWN = "unknown"
+
+# Preset and render DPI per layout and provider (Vision images are downscaled to the
+# detail box anyway, so higher Vision DPIs only help with cropping or small print)
+LAYOUT_PROFILES: Dict[str, Dict[str, Any]] = {
+    LAYOUT_PROSE: {"preset": "normal_ocr", "dpi": {"tesseract": 200, "vision": 150}},
+    LAYOUT_TABLE: {"preset": "table_ocr", "dpi": {"tesseract": 300, "vision": 225}},
+    LAYOUT_FORM: {"preset": "table_ocr", "dpi": {"tesseract": 250, "vision": 225}},
+    LAYOUT_BLANK: {"preset": "normal_ocr", "dpi": {"tesseract": 150, "vision": 150}},
+    LAYOUT_SMALL_PRINT: {"preset": "normal_ocr", "dpi": {"tesseract": 300, "vision": 300}},
+    LAYOUT_UNKNOWN: {"preset": "normal_ocr", "dpi": {"tesseract": 200, "vision": 225}},
+}
+
+# Render DPI when OCR_AUTO_LAYOUT is off (the previous fixed values)
+DEFAULT_DPI = {"tesseract": 200, "vision": 225}
+
+# Resolution of the analysis render
+ANALYSIS_DPI = 100
+# Ink share below which a page is mostly blank
+BLANK_INK_RATIO = 0.005
+# Ruling lines must span at least this share of the page width / height
+MIN_HLINE_SHARE = 0.15
+MIN_VLINE_SHARE = 0.05
+# Line counts for tables (grid) and forms (ruled fields)
+TABLE_MIN_HLINES = 3
+TABLE_MIN_VLINES = 2
+FORM_MIN_HLINES = 4
+FORM_MIN_CHECKBOXES = 4
+# Checkbox side length (points)
+CHECKBOX_MIN_PT = 6
+CHECKBOX_MAX_PT = 16
+# Dense small print: median text line pitch (points) at most this, with at least this many lines
+SMALL_PRINT_MAX_PITCH_PT = 9.5
+SMALL_PRINT_MIN_LINES = 60
+
+
+def _ruling_lines(ink: "np.ndarray", kernel_size: Tuple[int, int], min_length: int, axis: int) -> Tuple[int, "np.ndarray"]:
+    """Count ruling lines of one orientation; returns (count, mask of the lines)"""
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, kernel_size)
+    mask = cv2.morphologyEx(ink, cv2.MORPH_OPEN, kernel)
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    length_stat = cv2.CC_STAT_WIDTH if axis == 0 else cv2.CC_STAT_HEIGHT
+    count = int(sum(1 for i in range(1, n) if stats[i, length_stat] >= min_length))
+    return count, mask
+
+
+def _checkbox_count(ink: "np.ndarray") -> int:
+    """Small, square, hollow outlines (glyphs are rounder or filled)"""
+    min_px = int(CHECKBOX_MIN_PT * ANALYSIS_DPI / 72)
+    max_px = int(CHECKBOX_MAX_PT * ANALYSIS_DPI / 72)
+    # Two-level hierarchy: outer boundaries and their holes
+    contours, hierarchy = cv2.findContours(ink, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return 0
+    count = 0
+    for i, contour in enumerate(contours):
+        _, _, child, parent = hierarchy[0][i]
+        if parent != -1 or child == -1:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        if not (min_px <= w <= max_px and min_px <= h <= max_px and 0.8 <= w / h <= 1.25):
+            continue
+        box_area = w * h
+        if cv2.contourArea(contour) >= 0.9 * box_area and cv2.contourArea(contours[child]) >= 0.5 * box_area:
+            count += 1
+    return count
+
+
+def _text_line_pitch(ink: "np.ndarray") -> Tuple[int, float | None]:
+    """(text lines, median distance between line starts in points) from the horizontal ink profile"""
+    profile = (ink > 0).sum(axis=1)
+    rows = profile > max(2, int(ink.shape[1] * 0.01))
+    starts = [i for i in range(1, len(rows)) if rows[i] and not rows[i - 1]]
+    if rows.size and rows[0]:
+        starts.insert(0, 0)
+    if len(starts) < 2:
+        return len(starts), None
+    pitch_px = float(np.median(np.diff(starts)))
+    return len(starts), round(pitch_px * 72 / ANALYSIS_DPI, 1)
+
+
+def analyze_page_layout(pdf_path: Path, page_num: int) -> Dict[str, Any]:
+    """
+    Classify the layout of one page
+
+    Args:
+        pdf_path: Path to PDF file
+        page_num: Page number (1-indexed)
+
+    Returns:
+        {"layout": str, "signals": {...}}
+    """
+    if not OPENCV_AVAILABLE:
+        return {"layout": LAYOUT_UNKNOWN, "signals": {"error": "OpenCV not installed"}}
+
+    from app.page_raster import render_page
+    image = render_page(Path(pdf_path), page_num, dpi=ANALYSIS_DPI, colorspace="gray")
+    gray = np.asarray(image)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    h, w = ink.shape
+
+    ink_ratio = float(np.count_nonzero(ink)) / ink.size
+    signals: Dict[str, Any] = {"inkRatio": round(ink_ratio, 4)}
+    if ink_ratio < BLANK_INK_RATIO:
+        return {"layout": LAYOUT_BLANK, "signals": signals}
+
+    hlines, hmask = _ruling_lines(ink, (max(10, w // 20), 1), int(w * MIN_HLINE_SHARE), axis=0)
+    vlines, vmask = _ruling_lines(ink, (1, max(10, h // 40)), int(h * MIN_VLINE_SHARE), axis=1)
+    checkboxes = _checkbox_count(ink)
+    # Text lines are measured without the ruling lines
+    text_ink = cv2.subtract(ink, cv2.bitwise_or(hmask, vmask))
+    lines, pitch = _text_line_pitch(text_ink)
+    signals.update({
+        "hLines": hlines, "vLines": vlines, "checkboxes": checkboxes,
+        "textLines": lines, "linePitchPt": pitch,
+    })
+
+    if hlines >= TABLE_MIN_HLINES and vlines >= TABLE_MIN_VLINES:
+        layout = LAYOUT_TABLE
+    elif hlines >= FORM_MIN_HLINES or checkboxes >= FORM_MIN_CHECKBOXES:
+        layout = LAYOUT_FORM
+    elif pitch is not None and pitch <= SMALL_PRINT_MAX_PITCH_PT and lines >= SMALL_PRINT_MIN_LINES:
+        layout = LAYOUT_SMALL_PRINT
+    else:
+        layout = LAYOUT_PROSE
+    return {"layout": layout, "signals": signals}
+
+
+def layout_page_task(pdf_path: str, page_num: int) -> Dict[str, Any]:
+    """Layout analysis of one page (module-level for the OCR process pool)"""
+    return analyze_page_layout(Path(pdf_path), page_num)
+
+
+def layout_providers() -> Dict[str, str]:
+    """OCR_LAYOUT_PROVIDERS ("table=vision,form=vision") as {layout: provider}"""
+    providers = {}
+    for item in settings.ocr_layout_providers.split(","):
+        if "=" in item:
+            layout, provider = item.split("=", 1)
+            providers[layout.strip()] = provider.strip()
+    return providers
+
+
+def _analyze_pages(pdf_path: Path, page_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Layout analysis for many pages (process pool when enabled)"""
+    from app.ocr_pool import ocr_pool_enabled, run_pages_parallel
+    if ocr_pool_enabled() and len(page_numbers) > 1:
+        results = run_pages_parallel(layout_page_task, pdf_path, page_numbers)
+    else:
+        results = {}
+        for page_num in page_numbers:
+            try:
+                results[page_num] = (layout_page_task(str(pdf_path), page_num), None)
+            except Exception as e:
+                results[page_num] = (None, str(e))
+
+    analyses = {}
+    for page_num in page_numbers:
+        analysis, error = results.get(page_num, (None, "not processed"))
+        if analysis is None:
+            print(f"[Page Layout] page={page_num} analysis failed: {error}")
+            analysis = {"layout": LAYOUT_UNKNOWN, "signals": {"error": error}}
+        analyses[page_num] = analysis
+    return analyses
+
+
+def plan_ocr_pages(
+    pdf_path: Path,
+    page_numbers: List[int],
+    default_provider: str,
+    default_preset: str = "normal_ocr",
+    available_providers: Dict[str, bool] | None = None,
+    fixed_preset: str | None = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Choose layout-based preset, DPI and provider for the pages about to be OCR'd
+
+    Args:
+        pdf_path: Path to PDF file
+        page_numbers: Pages to plan
+        default_provider: Provider selected for the job ("vision" | "tesseract")
+        default_preset: Job preset (used for every page when OCR_AUTO_LAYOUT is off)
+        available_providers: provider -> available; OCR_LAYOUT_PROVIDERS routes only to available ones
+        fixed_preset: Preset chosen explicitly for the job; used for every page instead of the layout's
+
+    Returns:
+        page_number -> {"layout", "signals", "preset", "dpi", "provider"}
+    """
+    if not settings.ocr_auto_layout:
+        return {
+            n: {"layout": None, "signals": {}, "preset": default_preset,
+                "dpi": DEFAULT_DPI.get(default_provider, 200), "provider": default_provider}
+            for n in page_numbers
+        }
+
+    available = available_providers or {default_provider: True}
+    routing = layout_providers()
+    plans: Dict[int, Dict[str, Any]] = {}
+    for page_num, analysis in _analyze_pages(pdf_path, page_numbers).items():
+        layout = analysis["layout"]
+        profile = LAYOUT_PROFILES[layout]
+        provider = routing.get(layout, default_provider)
+        if not available.get(provider):
+            provider = default_provider
+        plans[page_num] = {
+            "layout": layout,
+            "signals": analysis["signals"],
+            "preset": fixed_preset or profile["preset"],
+            "dpi": profile["dpi"].get(provider, DEFAULT_DPI.get(provider, 200)),
+            "provider": provider,
+        }
+
+    summary = summarize_plans(plans)
+    print(f"[Page Layout] {len(plans)} pages: layouts={summary['layouts']} providers={summary['providers']}")
+    return plans
+
+
+def summarize_plans(plans: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Counts for the manifest
+
+    Returns:
+        {"layouts": {layout: pages}, "presets": {preset: pages}, "providers": {provider: pages}}
+    """
+    summary: Dict[str, Dict[str, int]] = {"layouts": {}, "presets": {}, "providers": {}}
+    for plan in plans.values():
+        for key, field in (("layouts", "layout"), ("presets", "preset"), ("providers", "provider")):
+            value = plan[field] or "fixed"
+            summary[key][value] = summary[key].get(value, 0) + 1
+    return summary
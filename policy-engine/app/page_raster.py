@@ -0,0 +1,339 @@
+"""
+Page raster service
+
+OCR paths used to rasterize the same page independently (a pdftoppm
+subprocess per page in app.ocr, a fresh fitz document per page in
+app.ocr_vision, whole-document renders in the hybrid pipeline). All rendering
+now goes through this module:
+
+- PageRasterizer keeps one open document handle per PDF (PyMuPDF when
+  installed, otherwise pdf2image/pdftoppm) and renders each
+  (page, dpi, colorspace) once.
+- Rendered pages are cached on disk under data/page_cache as PNG and evicted
+  least-recently-used once the cache exceeds PAGE_CACHE_MAX_MB, so the hybrid
+  pipeline, the Vision fallback, OCR workers (separate processes) and the page
+  preview endpoint share renders.
+
+Rasterizers are per process and per file: get_rasterizer(path) returns the
+open one and release_rasterizer(path) closes it (process_job does this when a
+job ends). At most MAX_OPEN_RASTERIZERS stay open per process; the least
+recently used one is closed when another PDF is opened.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    from pdf2image import convert_from_path
+except ImportError:
+    convert_from_path = None
+
+from app.config import settings
+
+COLORSPACES = ("rgb", "gray")
+
+_evict_lock = threading.Lock()
+_bytes_since_sweep = 0
+
+
+def _cache_root() -> Path:
+    return Path(settings.data_dir) / "page_cache"
+
+
+def _document_key(pdf_path: Path) -> str:
+    """Identify a file version cheaply (path, size, mtime) without hashing its contents"""
+    stat = pdf_path.stat()
+    raw = f"{pdf_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def _evict_if_needed(added_bytes: int):
+    """LRU eviction by file mtime (hits touch their file); sweeps after ~10% of the limit was written"""
+    global _bytes_since_sweep
+    limit = settings.page_cache_max_mb * 1024 * 1024
+    with _evict_lock:
+        _bytes_since_sweep += added_bytes
+        if _bytes_since_sweep < limit // 10:
+            return
+        _bytes_since_sweep = 0
+
+        entries = []
+        total = 0
+        for path in _cache_root().rglob("*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= limit:
+            return
+
+        target = int(limit * 0.9)
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                continue
+        print(f"[Page Cache] Evicted {removed} page images (cache now {total // (1024 * 1024)} MB)")
+
+
+class PageRasterizer:
+    """Renders pages of one PDF through a shared open document handle and the disk cache"""
+
+    def __init__(self, pdf_path: Path):
+        self.pdf_path = Path(pdf_path)
+        self.doc_key = _document_key(self.pdf_path)
+        self._lock = threading.Lock()
+        self._doc = None
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+    def _cache_path(self, page_num: int, dpi: int, colorspace: str) -> Path:
+        return _cache_root() / self.doc_key[:2] / self.doc_key / f"p{page_num}_{dpi}_{colorspace}.png"
+
+    def _cache_get(self, page_num: int, dpi: int, colorspace: str) -> Optional[Image.Image]:
+        if not settings.page_cache_enabled:
+            return None
+        path = self._cache_path(page_num, dpi, colorspace)
+        try:
+            with open(path, "rb") as f:
+                image = Image.open(io.BytesIO(f.read()))
+                image.load()
+            os.utime(path)  # LRU: mark as recently used
+            return image
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[Page Cache] Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+    def _cache_put(self, page_num: int, dpi: int, colorspace: str, image: Image.Image):
+        if not settings.page_cache_enabled:
+            return
+        path = self._cache_path(page_num, dpi, colorspace)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            image.save(tmp, format="PNG", compress_level=1)
+            os.replace(tmp, path)
+            _evict_if_needed(path.stat().st_size)
+        except Exception as e:
+            print(f"[Page Cache] Could not cache page {page_num}: {e}")
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _convert(image: Image.Image, colorspace: str) -> Image.Image:
+        mode = "L" if colorspace == "gray" else "RGB"
+        return image if image.mode == mode else image.convert(mode)
+
+    def _render_fitz(self, page_num: int, dpi: int, colorspace: str) -> Image.Image:
+        with self._lock:
+            if self._doc is None:
+                self._doc = fitz.open(str(self.pdf_path))
+            page = self._doc[page_num - 1]
+            zoom = dpi / 72.0
+            pix = page.get_pixmap(
+                matrix=fitz.Matrix(zoom, zoom),
+                colorspace=fitz.csGRAY if colorspace == "gray" else fitz.csRGB,
+                alpha=False,
+            )
+            mode = "L" if colorspace == "gray" else "RGB"
+            return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+    def _render_pdftoppm(self, first_page: int, last_page: int, dpi: int, colorspace: str):
+        if convert_from_path is None:
+            raise ImportError("Neither PyMuPDF nor pdf2image is installed - cannot render PDF pages")
+        images = convert_from_path(
+            str(self.pdf_path), dpi=dpi, first_page=first_page, last_page=last_page,
+            grayscale=colorspace == "gray"
+        )
+        return [self._convert(image, colorspace) for image in images]
+
+    def render(self, page_num: int, dpi: int = 200, colorspace: str = "rgb") -> Image.Image:
+        """
+        Render one page (1-indexed), from the cache when available
+
+        Raises:
+            Exception if the page cannot be rendered
+        """
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"colorspace must be one of {COLORSPACES}, got: {colorspace}")
+
+        image = self._cache_get(page_num, dpi, colorspace)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        try:
+            if fitz is not None:
+                image = self._render_fitz(page_num, dpi, colorspace)
+            else:
+                images = self._render_pdftoppm(page_num, page_num, dpi, colorspace)
+                if not images:
+                    raise Exception("no image produced")
+                image = images[0]
+        except Exception as e:
+            raise Exception(f"Failed to render PDF page {page_num} to image: {str(e)}")
+
+        self._cache_put(page_num, dpi, colorspace, image)
+        return image
+
+    def render_many(
+        self,
+        page_numbers: Iterable[int],
+        dpi: int = 200,
+        colorspace: str = "rgb",
+        memory_limit_mb: int | None = None
+    ) -> Iterator[Tuple[int, Optional[Image.Image]]]:
+        """
+        Render pages lazily in page order, holding at most memory_limit_mb of images
+
+        PyMuPDF renders page by page. The pdftoppm fallback renders consecutive
+        uncached pages in windows sized from the first rendered page so a window
+        stays under the limit (OCR_RENDER_MEMORY_MB).
+
+        Yields:
+            (page_num, image); image is None if the page could not be rendered
+        """
+        limit_bytes = max(1, memory_limit_mb or settings.ocr_render_memory_mb) * 1024 * 1024
+        pages = sorted(set(page_numbers))
+        window = 1
+        i = 0
+        while i < len(pages):
+            page_num = pages[i]
+            if fitz is not None:
+                # render() checks the cache first
+                i += 1
+                try:
+                    image = self.render(page_num, dpi, colorspace)
+                except Exception as e:
+                    print(f"[Page Raster] {e}")
+                    image = None
+                yield page_num, image
+                continue
+
+            cached = self._cache_get(page_num, dpi, colorspace)
+            if cached is not None:
+                i += 1
+                self.hits += 1
+                yield page_num, cached
+                continue
+
+            # pdftoppm: consecutive run of at most `window` pages
+            j = i
+            while j + 1 < len(pages) and j + 1 - i < window and pages[j + 1] == pages[j] + 1:
+                j += 1
+            first_page, last_page = pages[i], pages[j]
+            i = j + 1
+
+            try:
+                images = self._render_pdftoppm(first_page, last_page, dpi, colorspace)
+            except Exception as e:
+                print(f"[Page Raster] Failed to render pages {first_page}-{last_page}: {e}")
+                images = []
+            self.misses += last_page - first_page + 1
+
+            if images:
+                first = images[0]
+                page_bytes = max(1, first.width * first.height * len(first.getbands()))
+                window = max(1, int(limit_bytes // page_bytes))
+
+            images.reverse()
+            for num in range(first_page, last_page + 1):
+                image = images.pop() if images else None
+                if image is not None:
+                    self._cache_put(num, dpi, colorspace, image)
+                yield num, image
+
+    def page_count(self) -> int:
+        """Number of pages in the document"""
+        if fitz is not None:
+            with self._lock:
+                if self._doc is None:
+                    self._doc = fitz.open(str(self.pdf_path))
+                return self._doc.page_count
+        from PyPDF2 import PdfReader
+        with open(self.pdf_path, "rb") as f:
+            return len(PdfReader(f).pages)
+
+    def close(self):
+        """Close the document handle"""
+        with self._lock:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+
+# Open rasterizers per process; least recently used ones are closed beyond this, so
+# long-lived OCR pool workers do not keep a document handle for every PDF they touched
+MAX_OPEN_RASTERIZERS = 8
+
+_rasterizers: "OrderedDict[str, PageRasterizer]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def get_rasterizer(pdf_path: Path) -> PageRasterizer:
+    """Get the open rasterizer for a PDF (created on first use, reopened if the file changed)"""
+    key = str(Path(pdf_path).resolve())
+    evicted = []
+    with _registry_lock:
+        rasterizer = _rasterizers.get(key)
+        if rasterizer is None or rasterizer.doc_key != _document_key(Path(pdf_path)):
+            if rasterizer is not None:
+                evicted.append(rasterizer)
+            rasterizer = PageRasterizer(Path(pdf_path))
+            _rasterizers[key] = rasterizer
+        _rasterizers.move_to_end(key)
+        while len(_rasterizers) > MAX_OPEN_RASTERIZERS:
+            evicted.append(_rasterizers.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return rasterizer
+
+
+def release_rasterizer(pdf_path: Path):
+    """Close and forget the rasterizer for a PDF (cached renders stay on disk)"""
+    key = str(Path(pdf_path).resolve())
+    with _registry_lock:
+        rasterizer = _rasterizers.pop(key, None)
+    if rasterizer is not None:
+        rasterizer.close()
+
+
+def render_page(pdf_path: Path, page_num: int, dpi: int = 200, colorspace: str = "rgb") -> Image.Image:
+    """Render one page through the shared rasterizer and cache"""
+    return get_rasterizer(pdf_path).render(page_num, dpi, colorspace)
+
+
+def delete_cached_pages(pdf_path: Path):
+    """Drop cached renders of a file (e.g. before deleting it)"""
+    import shutil
+    try:
+        doc_key = _document_key(Path(pdf_path))
+    except FileNotFoundError:
+        return
+    shutil.rmtree(_cache_root() / doc_key[:2] / doc_key, ignore_errors=True)
@@ -0,0 +1,266 @@
+"""
+Streaming indexing pipeline: page text -> chunk -> embed -> upsert
+
+In the staged job flow every page is OCR'd before chunking starts, then
+chunks are embedded in sequential batches, then upserted, so the embedding
+API idles during OCR and vice versa. With the streaming pipeline the job's
+page loop hands each finished page to add_page(); background stages connected
+by bounded queues chunk, embed and upsert it while later pages are still being
+extracted/OCR'd.
+
+Memory is bounded by the queue sizes (plus the few pages held back to detect
+a repeated document header). Indexed chunks are not retained: on_indexed
+(e.g. ArtifactWriter.add_chunks) receives each upserted batch instead. Each
+stage records items processed and busy time so per-stage throughput can be
+reported.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from app.config import settings
+from app.chunking_enhanced import (
+    HEADER_DETECTION_WINDOW, detect_document_header, strip_page_header, build_page_chunks
+)
+from app.embeddings import generate_embeddings
+from app.vector_store import upsert_chunks
+
+_DONE = object()
+
+
+class StageStats:
+    """Counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        wall = (self.finished_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            "items": self.items,
+            "busySeconds": round(self.busy_seconds, 3),
+            "wallSeconds": round(max(wall, 0.0), 3),
+            "itemsPerSecond": round(self.items / self.busy_seconds, 2) if self.busy_seconds > 0 else None,
+        }
+
+
+class StreamingIndexPipeline:
+    """Chunk/embed/upsert stages running concurrently with page extraction"""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        policy_id: str,
+        filename: str,
+        chunk_size_chars: int = 2000,
+        overlap_chars: int = 300,
+        embedding_batch_size: int = 50,
+        queue_size: int | None = None,
+        on_indexed: Callable[[List[Dict[str, Any]]], None] | None = None,
+        timings=None
+    ):
+        self.tenant_id = tenant_id
+        self.policy_id = policy_id
+        self.filename = filename
+        self.chunk_size_chars = chunk_size_chars
+        self.overlap_chars = overlap_chars
+        self.embedding_batch_size = embedding_batch_size
+        # Called with every upserted batch (chunks with embeddings), e.g. to stream them to the artifact store
+        self.on_indexed = on_indexed
+        # Optional JobTimings receiving per-batch embedding/upsert latencies
+        self.timings = timings
+
+        size = max(1, queue_size or settings.pipeline_queue_size)
+        self._pages_q: queue.Queue = queue.Queue(maxsize=size)
+        self._embed_q: queue.Queue = queue.Queue(maxsize=size)
+        self._upsert_q: queue.Queue = queue.Queue(maxsize=size)
+
+        self.stats = {
+            "pages": StageStats("pages"),
+            "chunk": StageStats("chunk"),
+            "embed": StageStats("embed"),
+            "upsert": StageStats("upsert"),
+        }
+        self.chunks_built = 0
+        self.chunks_indexed = 0
+        self.error: BaseException | None = None
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    # ------------------------------------------------------------------
+    # Producer API (called from the job thread)
+    # ------------------------------------------------------------------
+    def start(self):
+        """Start the background stages"""
+        for name, target in (("chunk", self._chunk_stage), ("embed", self._embed_stage), ("upsert", self._upsert_stage)):
+            thread = threading.Thread(target=self._run_stage, args=(name, target), name=f"pipeline-{name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        self.stats["pages"].started_at = time.monotonic()
+
+    def add_page(self, page_num: int, page_text: str):
+        """Hand a finished page to the pipeline (blocks while the page queue is full)"""
+        self._put(self._pages_q, (page_num, page_text))
+        self.stats["pages"].items += 1
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Signal end of pages and wait for all stages to drain
+
+        Raises:
+            The first exception raised by any stage
+
+        Returns:
+            Per-stage stats (see stage_stats())
+        """
+        if not self._closed:
+            self._closed = True
+            pages = self.stats["pages"]
+            pages.finished_at = time.monotonic()
+            # Page production (extraction/OCR) happens in the job thread: its busy time is its wall time
+            pages.busy_seconds = pages.finished_at - (pages.started_at or pages.finished_at)
+            self._put(self._pages_q, _DONE)
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.stage_stats()
+
+    def abort(self):
+        """Stop all stages (used when the job fails mid-way)"""
+        with self._lock:
+            if self.error is None:
+                self.error = RuntimeError("pipeline aborted")
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def stage_stats(self) -> Dict[str, Any]:
+        """Per-stage counters and throughput"""
+        return {name: stage.to_dict() for name, stage in self.stats.items()}
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def _put(self, q: queue.Queue, item):
+        # Poll so producers don't block forever after a downstream failure
+        while True:
+            if self.error is not None:
+                raise self.error
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self.error is not None:
+                return _DONE
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _run_stage(self, name: str, target):
+        stage = self.stats[name]
+        stage.started_at = time.monotonic()
+        try:
+            target(stage)
+        except BaseException as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = e
+            print(f"[Pipeline] ERROR in {name} stage: {e}")
+        finally:
+            stage.finished_at = time.monotonic()
+
+    def _chunk_stage(self, stage: StageStats):
+        held: List[tuple] = []  # pages held back until the header can be decided
+        header_decided = False
+        header = None
+        pending: List[Dict[str, Any]] = []
+
+        def emit_page(page_num: int, page_text: str):
+            nonlocal pending
+            t0 = time.monotonic()
+            chunks = build_page_chunks(
+                self.tenant_id, self.policy_id, self.filename, page_num,
+                strip_page_header(page_text, header), self.chunk_size_chars, self.overlap_chars
+            )
+            stage.busy_seconds += time.monotonic() - t0
+            stage.items += len(chunks)
+            with self._lock:
+                self.chunks_built += len(chunks)
+            pending.extend(chunks)
+            while len(pending) >= self.embedding_batch_size:
+                batch, pending = pending[:self.embedding_batch_size], pending[self.embedding_batch_size:]
+                self._put(self._embed_q, batch)
+
+        while True:
+            item = self._get(self._pages_q)
+            if item is _DONE:
+                break
+            page_num, page_text = item
+            if not page_text or not page_text.strip():
+                continue
+            if header_decided:
+                emit_page(page_num, page_text)
+                continue
+            held.append((page_num, page_text))
+            if len(held) > HEADER_DETECTION_WINDOW:
+                header = detect_document_header([t for _, t in held])
+                header_decided = True
+                for held_num, held_text in held:
+                    emit_page(held_num, held_text)
+                held = []
+
+        if self.error is not None:
+            return
+        if not header_decided:
+            header = detect_document_header([t for _, t in held])
+            for held_num, held_text in held:
+                emit_page(held_num, held_text)
+        if pending:
+            self._put(self._embed_q, pending)
+        self._put(self._embed_q, _DONE)
+
+    def _embed_stage(self, stage: StageStats):
+        while True:
+            batch = self._get(self._embed_q)
+            if batch is _DONE:
+                break
+            t0 = time.monotonic()
+            embeddings = generate_embeddings([c["text"] for c in batch])
+            elapsed = time.monotonic() - t0
+            stage.busy_seconds += elapsed
+            if self.timings is not None:
+                self.timings.record("embedding_batch", elapsed)
+            for chunk_dict, emb in zip(batch, embeddings):
+                chunk_dict["embedding"] = emb
+            stage.items += len(batch)
+            self._put(self._upsert_q, batch)
+        if self.error is None:
+            self._put(self._upsert_q, _DONE)
+
+    def _upsert_stage(self, stage: StageStats):
+        while True:
+            batch = self._get(self._upsert_q)
+            if batch is _DONE:
+                break
+            t0 = time.monotonic()
+            upsert_chunks(self.tenant_id, self.policy_id, batch, batch_size=200)
+            elapsed = time.monotonic() - t0
+            stage.busy_seconds += elapsed
+            if self.timings is not None:
+                self.timings.record("upsert_batch", elapsed)
+            stage.items += len(batch)
+            with self._lock:
+                self.chunks_indexed += len(batch)
+            if self.on_indexed is not None:
+                self.on_indexed(batch)
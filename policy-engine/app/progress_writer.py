@@ -0,0 +1,104 @@
+"""
+Coalesced (write-behind) progress updates for running jobs
+
+process_job reports progress after every page and every embedding batch.
+Writing the job record and the per-policy manifest each time costs thousands
+of synchronous rewrites on long documents, so this writer keeps the pending
+job fields and the manifest in memory and flushes them at most once per
+flush interval, at explicit stage boundaries, and immediately on status
+transitions.
+
+When the job runs under a lease (scheduler workers), every flush first checks
+that the lease is still held: once another worker has taken the job over,
+check_lease() and flush() raise LeaseLostError instead of writing.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from app import job_store
+from app.config import settings
+from app.manifest import save_manifest
+
+
+class ProgressWriter:
+    """Buffers job progress and manifest changes for one job"""
+
+    def __init__(
+        self,
+        job_id: str,
+        tenant_id: str,
+        policy_id: str,
+        manifest: Dict[str, Any],
+        flush_interval_ms: int | None = None,
+        timings=None,
+        lease_owner: str | None = None,
+        lease_lost: threading.Event | None = None
+    ):
+        self.job_id = job_id
+        self.tenant_id = tenant_id
+        self.policy_id = policy_id
+        self.manifest = manifest
+        if flush_interval_ms is None:
+            flush_interval_ms = settings.progress_flush_interval_ms
+        self.flush_interval = max(0, flush_interval_ms) / 1000.0
+        # Optional JobTimings: its summary is written along with every job update
+        self.timings = timings
+        # Lease held by this run (None: not leased, no ownership checks); the
+        # scheduler's heartbeat sets lease_lost when a renewal fails
+        self.lease_owner = lease_owner
+        self.lease_lost = lease_lost if lease_lost is not None else threading.Event()
+
+        self._pending: Dict[str, Any] = {}
+        self._manifest_dirty = False
+        self._last_flush = time.monotonic()
+
+    def update(self, **fields):
+        """
+        Record job progress fields (same keywords as update_job_progress)
+
+        Status changes are flushed immediately together with anything pending.
+        """
+        self._pending.update({k: v for k, v in fields.items() if v is not None})
+        if fields.get("status"):
+            self.flush()
+        else:
+            self._maybe_flush()
+
+    def manifest_changed(self, flush: bool = False):
+        """Mark the manifest as modified (optionally forcing a flush)"""
+        self._manifest_dirty = True
+        if flush:
+            self.flush()
+        else:
+            self._maybe_flush()
+
+    def check_lease(self):
+        """Raise LeaseLostError if the job was taken over by another worker"""
+        if self.lease_lost.is_set():
+            raise job_store.LeaseLostError(f"Lease on job {self.job_id} lost by {self.lease_owner}")
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending manifest and job changes now"""
+        # Imported here: app.jobs imports this module
+        from app.jobs import update_job_progress
+
+        self.check_lease()
+        if self.lease_owner is not None and (self._manifest_dirty or self._pending):
+            owner = job_store.get_lease_owner(self.job_id)
+            if owner != self.lease_owner:
+                self.lease_lost.set()
+                raise job_store.LeaseLostError(f"Lease on job {self.job_id} moved from {self.lease_owner} to {owner}")
+        if self._manifest_dirty:
+            save_manifest(self.tenant_id, self.policy_id, self.manifest)
+            self._manifest_dirty = False
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            if self.timings is not None:
+                pending["timings"] = self.timings.summary()
+            update_job_progress(self.job_id, **pending)
+        self._last_flush = time.monotonic()
@@ -0,0 +1,111 @@
+"""
+Exponential-backoff retries for transient OCR provider errors
+
+Vision OCR calls fail now and then with rate limits, timeouts or 5xx errors
+that succeed when retried a few seconds later. call_with_retries() retries
+such errors inside the job (OCR_RETRY_ATTEMPTS, OCR_RETRY_BASE_DELAY,
+OCR_RETRY_MAX_DELAY) instead of leaving the page FAILED. Permanent errors
+(bad input, missing prerequisites) are raised immediately. Errors are
+classified by exception type and HTTP status first; message phrases are only
+a last resort for errors re-raised as plain Exception.
+"""
+import random
+import time
+from typing import Any, Callable
+
+from app.config import settings
+
+# Exception class names (anywhere in the cause/context chain) treated as transient
+_TRANSIENT_ERROR_TYPES = {
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "Timeout",
+    "TimeoutError",
+    "ConnectionError",
+    "ConnectionResetError",
+    "ReadTimeout",
+    "ConnectTimeout",
+}
+
+# HTTP statuses (status_code / status attribute, or the attached response) worth retrying
+_TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Message phrases that indicate a transient failure when no type or status is available
+# (no bare numbers: "429" or "500" also appear in page numbers and paths)
+_TRANSIENT_MESSAGE_MARKERS = (
+    "rate limit",
+    "timed out",
+    "temporarily unavailable",
+    "overloaded",
+    "connection reset",
+)
+
+
+def _status_code(error: BaseException) -> int | None:
+    """HTTP status of an API client error (openai/httpx/requests style), if any"""
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an error is worth retrying"""
+    seen = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if type(current).__name__ in _TRANSIENT_ERROR_TYPES:
+            return True
+        status = _status_code(current)
+        if status is not None:
+            # A concrete HTTP status decides on its own
+            return status in _TRANSIENT_STATUS_CODES
+        message = str(current).lower()
+        if any(marker in message for marker in _TRANSIENT_MESSAGE_MARKERS):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+def call_with_retries(
+    fn: Callable[..., Any],
+    *args,
+    attempts: int | None = None,
+    base_delay: float | None = None,
+    max_delay: float | None = None,
+    label: str = "call",
+    **kwargs
+) -> Any:
+    """
+    Call fn(*args, **kwargs), retrying transient errors with exponential backoff
+
+    Args:
+        attempts: Total attempts (default OCR_RETRY_ATTEMPTS)
+        base_delay: Delay before the first retry in seconds, doubled each retry (default OCR_RETRY_BASE_DELAY)
+        max_delay: Upper bound for a single delay (default OCR_RETRY_MAX_DELAY)
+        label: Used in log messages
+
+    Raises:
+        The last error if all attempts fail, or the first non-transient error
+    """
+    attempts = max(1, attempts if attempts is not None else settings.ocr_retry_attempts)
+    base_delay = base_delay if base_delay is not None else settings.ocr_retry_base_delay
+    max_delay = max_delay if max_delay is not None else settings.ocr_retry_max_delay
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= attempts or not is_transient_error(e):
+                raise
+            # Full jitter keeps concurrent pages from retrying in lockstep
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            delay = random.uniform(delay / 2, delay)
+            print(f"[Retry] {label} attempt {attempt}/{attempts} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,403 @@
+"""
+Job scheduler with per-tenant fairness
+
+Replaces the fixed ThreadPoolExecutor(max_workers=2). Jobs are queued per
+tenant and dispatched to a configurable number of worker threads:
+
+- Tenants are served weighted round-robin (SCHEDULER_TENANT_WEIGHTS, e.g.
+  "tenantA:3,tenantB:1"; unlisted tenants get weight 1), so one tenant's bulk
+  upload cannot block everyone else.
+- Within a tenant, smaller jobs (by page count) go first, unless a job has
+  waited longer than SCHEDULER_MAX_WAIT_SECONDS, in which case it is served in
+  arrival order so large documents are not starved.
+
+The queue is persistent: each job's queue entry (enqueuedAt, page count) is
+stored in the job record, and QUEUED jobs are re-submitted on startup in their
+original order.
+
+Several processes may share the job store (e.g. uvicorn --workers N). A
+worker thread claims a job's lease in the store before running it and skips
+the job if another process holds the lease; a heartbeat thread renews leases
+of running jobs and periodically re-queues jobs whose lease has expired
+(their owner died), which then resume from the manifest's page checkpoints.
+When a renewal fails because another worker took the job over, the local run
+is cancelled (ProgressWriter raises LeaseLostError before its next write).
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app import job_store
+from app.config import settings
+
+# Statuses a job can be claimed (and resumed) in
+_CLAIMABLE_STATUSES = ("QUEUED", "PROCESSING")
+
+
+def _parse_tenant_weights(raw: str) -> Dict[str, int]:
+    weights: Dict[str, int] = {}
+    for item in raw.split(","):
+        if ":" not in item:
+            continue
+        tenant, weight = item.rsplit(":", 1)
+        try:
+            weights[tenant.strip()] = max(1, int(weight))
+        except ValueError:
+            continue
+    return weights
+
+
+def estimate_page_count(file_path: Path) -> int:
+    """Cheap page count for queue ordering (0 if unknown)"""
+    try:
+        from PyPDF2 import PdfReader
+        with open(file_path, "rb") as f:
+            return len(PdfReader(f).pages)
+    except Exception:
+        return 0
+
+
+class _QueueEntry:
+    __slots__ = ("job_id", "tenant_id", "pages", "seq", "enqueued_at")
+
+    def __init__(self, job_id: str, tenant_id: str, pages: int, seq: int, enqueued_at: float):
+        self.job_id = job_id
+        self.tenant_id = tenant_id
+        self.pages = pages
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+
+
+class _DispatchState:
+    """Round-robin cursor over tenants with queued jobs"""
+
+    def __init__(self, queues: Dict[str, List[_QueueEntry]], ring: List[str], cursor: int, served: int):
+        self.queues = queues
+        self.ring = ring
+        self.cursor = cursor
+        self.served = served
+
+    def copy(self) -> "_DispatchState":
+        return _DispatchState(
+            {t: list(q) for t, q in self.queues.items()}, list(self.ring), self.cursor, self.served
+        )
+
+
+class JobScheduler:
+    """Fair, size-aware dispatcher for process_job"""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        tenant_weights: Dict[str, int] | None = None,
+        max_wait_seconds: float | None = None,
+        lease_seconds: float | None = None
+    ):
+        self.max_workers = max(1, max_workers or settings.job_workers)
+        self.tenant_weights = tenant_weights if tenant_weights is not None else _parse_tenant_weights(
+            settings.scheduler_tenant_weights
+        )
+        self.max_wait_seconds = max_wait_seconds if max_wait_seconds is not None else settings.scheduler_max_wait_seconds
+
+        self._cond = threading.Condition()
+        self._state = _DispatchState({}, [], 0, 0)
+        self._queued: Dict[str, _QueueEntry] = {}
+        self._running: Dict[str, Tuple[_QueueEntry, float]] = {}
+        # Set by the heartbeat when a running job's lease could not be renewed
+        self._lease_lost: Dict[str, threading.Event] = {}
+        self._seq = 0
+        self._workers: List[threading.Thread] = []
+        self._heartbeat: threading.Thread | None = None
+
+        # Lease owner identity of this process
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = max(5.0, float(lease_seconds or settings.job_lease_seconds))
+        # Moving average processing time per page, used for start-time estimates
+        self._seconds_per_page = settings.scheduler_initial_seconds_per_page
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+    def submit(self, job_id: str) -> bool:
+        """
+        Queue a job for processing
+
+        Returns:
+            False if the job is unknown or already queued/running
+        """
+        from app.jobs import load_job, update_job_queue
+
+        job = load_job(job_id)
+        if not job:
+            print(f"[Scheduler] Job {job_id} not found, not queued")
+            return False
+
+        with self._cond:
+            if job_id in self._queued or job_id in self._running:
+                return False
+
+        queue_info = dict(job.get("queue") or {})
+        if "pageCount" not in queue_info or "enqueuedAt" not in queue_info:
+            if "pageCount" not in queue_info:
+                file_path = Path(settings.data_dir) / job["tenantId"] / job["policyId"] / job["filename"]
+                queue_info["pageCount"] = estimate_page_count(file_path)
+            if "enqueuedAt" not in queue_info:
+                queue_info["enqueuedAt"] = datetime.utcnow().isoformat()
+            update_job_queue(job_id, queue_info)
+
+        try:
+            enqueued_at = datetime.fromisoformat(queue_info["enqueuedAt"]).timestamp()
+        except Exception:
+            enqueued_at = time.time()
+
+        with self._cond:
+            if job_id in self._queued or job_id in self._running:
+                return False
+            self._seq += 1
+            entry = _QueueEntry(job_id, job["tenantId"], queue_info["pageCount"], self._seq, enqueued_at)
+            self._queued[job_id] = entry
+            self._state.queues.setdefault(entry.tenant_id, []).append(entry)
+            if entry.tenant_id not in self._state.ring:
+                self._state.ring.append(entry.tenant_id)
+            self._ensure_workers()
+            self._cond.notify()
+
+        print(f"[Scheduler] Queued job={job_id} tenant={entry.tenant_id} pages={entry.pages} queued={len(self._queued)}")
+        return True
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    def _weight(self, tenant_id: str) -> int:
+        return self.tenant_weights.get(tenant_id, 1)
+
+    def _pick_from_tenant(self, queue: List[_QueueEntry], now: float) -> _QueueEntry:
+        oldest = min(queue, key=lambda e: e.seq)
+        if now - oldest.enqueued_at >= self.max_wait_seconds:
+            return oldest
+        return min(queue, key=lambda e: (e.pages, e.seq))
+
+    def _pop_next(self, state: _DispatchState, now: float) -> _QueueEntry | None:
+        if not state.ring:
+            return None
+        if state.cursor >= len(state.ring):
+            state.cursor = 0
+
+        tenant_id = state.ring[state.cursor]
+        queue = state.queues[tenant_id]
+        entry = self._pick_from_tenant(queue, now)
+        queue.remove(entry)
+        state.served += 1
+
+        if not queue:
+            del state.queues[tenant_id]
+            state.ring.pop(state.cursor)
+            state.served = 0
+        elif state.served >= self._weight(tenant_id):
+            state.cursor = (state.cursor + 1) % len(state.ring)
+            state.served = 0
+        return entry
+
+    def _ensure_workers(self):
+        self._workers = [w for w in self._workers if w.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{len(self._workers) + 1}", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _worker_loop(self):
+        from app.jobs import process_job, load_job
+
+        while True:
+            with self._cond:
+                entry = self._pop_next(self._state, time.time())
+                while entry is None:
+                    self._cond.wait()
+                    entry = self._pop_next(self._state, time.time())
+                del self._queued[entry.job_id]
+                started = time.time()
+                self._running[entry.job_id] = (entry, started)
+
+            try:
+                claimed = job_store.claim_job(entry.job_id, self.worker_id, self.lease_seconds, _CLAIMABLE_STATUSES)
+            except Exception as e:
+                print(f"[Scheduler] ERROR: could not claim job={entry.job_id}: {e}")
+                claimed = False
+            if not claimed:
+                # Finished, or leased by another process
+                print(f"[Scheduler] Skipping job={entry.job_id}: not claimable")
+                with self._cond:
+                    self._running.pop(entry.job_id, None)
+                continue
+
+            lease_lost = threading.Event()
+            with self._cond:
+                self._lease_lost[entry.job_id] = lease_lost
+
+            print(f"[Scheduler] Starting job={entry.job_id} tenant={entry.tenant_id} pages={entry.pages}")
+            try:
+                process_job(entry.job_id, lease_owner=self.worker_id, lease_lost=lease_lost)
+            except Exception as e:
+                print(f"[Scheduler] ERROR: job={entry.job_id} raised: {e}")
+            finally:
+                try:
+                    job_store.release_lease(entry.job_id, self.worker_id)
+                except Exception as e:
+                    print(f"[Scheduler] ERROR: could not release lease for job={entry.job_id}: {e}")
+                elapsed = time.time() - started
+                job = load_job(entry.job_id) or {}
+                pages = (job.get("progress") or {}).get("pagesTotal") or entry.pages
+                with self._cond:
+                    self._running.pop(entry.job_id, None)
+                    self._lease_lost.pop(entry.job_id, None)
+                    if pages:
+                        self._seconds_per_page = 0.8 * self._seconds_per_page + 0.2 * (elapsed / pages)
+
+    # ------------------------------------------------------------------
+    # Leases
+    # ------------------------------------------------------------------
+    def _heartbeat_loop(self):
+        """Renew leases of running jobs; periodically re-queue jobs with expired leases"""
+        interval = self.lease_seconds / 3
+        last_recovery = time.monotonic()
+        while True:
+            time.sleep(interval)
+            with self._cond:
+                running = [(job_id, self._lease_lost.get(job_id)) for job_id in self._running]
+            for job_id, lease_lost in running:
+                if lease_lost is None or lease_lost.is_set():
+                    continue
+                try:
+                    if not job_store.renew_lease(job_id, self.worker_id, self.lease_seconds):
+                        # Another worker claimed the job: stop this run before it writes again
+                        print(f"[Scheduler] WARNING: lease lost for job={job_id}, cancelling it here")
+                        lease_lost.set()
+                except Exception as e:
+                    print(f"[Scheduler] ERROR: lease renewal failed for job={job_id}: {e}")
+
+            if time.monotonic() - last_recovery >= self.lease_seconds:
+                last_recovery = time.monotonic()
+                try:
+                    self.recover_jobs()
+                except Exception as e:
+                    print(f"[Scheduler] ERROR: job recovery failed: {e}")
+
+    def recover_jobs(self) -> int:
+        """
+        Queue QUEUED/PROCESSING jobs that nobody holds a live lease on
+
+        Used on startup and by the heartbeat to pick up jobs of dead workers.
+
+        Returns:
+            Number of jobs queued in this process
+        """
+        with self._cond:
+            self._ensure_workers()
+        jobs = job_store.list_claimable_jobs(_CLAIMABLE_STATUSES)
+        # Re-queue in original arrival order
+        jobs.sort(key=lambda j: (j.get("queue") or {}).get("enqueuedAt") or j.get("createdAt") or "")
+        queued = 0
+        for job in jobs:
+            with self._cond:
+                known = job["jobId"] in self._queued or job["jobId"] in self._running
+            if not known and self.submit(job["jobId"]):
+                queued += 1
+        if queued:
+            print(f"[Scheduler] Recovered {queued} job(s) without a live lease")
+        return queued
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+    def get_queue_info(self, job_id: str) -> Dict[str, Any] | None:
+        """
+        Queue position and estimated start time for a queued job
+
+        Returns:
+            {"position", "queuedTotal", "estimatedStartAt", "estimatedWaitSeconds"}
+            or None if the job is not queued in this process
+        """
+        with self._cond:
+            if job_id not in self._queued:
+                return None
+
+            now = time.time()
+            spp = self._seconds_per_page
+            free_slots = max(0, self.max_workers - len(self._running))
+            running_remaining = sum(
+                max(0.0, entry.pages * spp - (now - started)) for entry, started in self._running.values()
+            )
+
+            state = self._state.copy()
+            ahead_pages = 0
+            position = 0
+            while True:
+                entry = self._pop_next(state, now)
+                if entry is None or entry.job_id == job_id:
+                    break
+                ahead_pages += entry.pages
+                position += 1
+
+            queued_total = len(self._queued)
+
+        if position < free_slots:
+            wait_seconds = 0.0
+        else:
+            wait_seconds = (running_remaining + ahead_pages * spp) / self.max_workers
+
+        return {
+            "position": position + 1,
+            "queuedTotal": queued_total,
+            "estimatedWaitSeconds": round(wait_seconds, 1),
+            "estimatedStartAt": (datetime.utcnow() + timedelta(seconds=wait_seconds)).isoformat(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of scheduler state"""
+        with self._cond:
+            per_tenant = {t: len(q) for t, q in self._state.queues.items()}
+            return {
+                "workers": self.max_workers,
+                "running": len(self._running),
+                "queued": len(self._queued),
+                "queuedByTenant": per_tenant,
+                "secondsPerPage": round(self._seconds_per_page, 2),
+                "workerId": self.worker_id,
+            }
+
+
+scheduler = JobScheduler()
+
+
+def queue_info(job_id: str) -> Dict[str, Any] | None:
+    """
+    Queue position of a waiting job, as seen from this process
+
+    With JOB_RUNNER=worker the API process runs no scheduler: the position is
+    the job's arrival order among all QUEUED jobs in the store (workers serve
+    tenants fairly, so this is approximate) and no start time is estimated.
+    """
+    if settings.job_runner != "worker":
+        return scheduler.get_queue_info(job_id)
+    ahead = job_store.queued_ahead(job_id, "QUEUED")
+    if ahead is None:
+        return None
+    position, queued_total = ahead
+    return {"position": position + 1, "queuedTotal": queued_total}
+
+
+def queue_stats() -> Dict[str, Any]:
+    """Scheduler snapshot, or store-wide queue counts when jobs run in standalone workers"""
+    if settings.job_runner != "worker":
+        return scheduler.stats()
+    return {"runner": "worker", **job_store.queue_snapshot("QUEUED")}
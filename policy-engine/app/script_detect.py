@@ -0,0 +1,180 @@
+"""
+Per-page script detection for Tesseract language selection
+
+Every Tesseract call used lang="eng+ara": running both language models costs
+roughly twice the recognition time, while most pages are entirely English or
+entirely Arabic. Before OCR each page gets the languages it needs:
+
+1. text_layer: the page's own text layer, when it has at least
+   OCR_SCRIPT_MIN_LETTERS Latin/Arabic letters (partly digital pages)
+2. osd: Tesseract orientation and script detection on a low-resolution
+   render (OCR_SCRIPT_OSD_DPI); below OCR_SCRIPT_OSD_MIN_CONFIDENCE both
+   languages are kept. OSD only reports the dominant script, so if the rest of
+   the document's text layer mixes scripts both languages are kept as well.
+3. document: the script mix of the whole document's text layer
+4. default: eng+ara
+
+A script counts as present from OCR_SCRIPT_MIN_SHARE of the letters. The
+chosen languages (lang, method, signals) are recorded per page in the
+manifest so throughput can be compared against OCR quality.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.config import settings
+
+LANG_ENG = "eng"
+LANG_ARA = "ara"
+LANG_BOTH = "eng+ara"
+
+METHOD_TEXT_LAYER = "text_layer"
+METHOD_OSD = "osd"
+METHOD_OSD_LOW_CONFIDENCE = "osd_low_confidence"
+METHOD_DOCUMENT = "document"
+METHOD_DEFAULT = "default"
+
+# Tesseract OSD script names -> language
+OSD_SCRIPTS = {"Latin": LANG_ENG, "Arabic": LANG_ARA}
+
+
+def _is_arabic(c: str) -> bool:
+    # Arabic, Arabic Supplement, Arabic Extended-A, presentation forms A/B
+    code = ord(c)
+    return (
+        0x0600 <= code <= 0x06FF or 0x0750 <= code <= 0x077F or 0x08A0 <= code <= 0x08FF
+        or 0xFB50 <= code <= 0xFDFF or 0xFE70 <= code <= 0xFEFF
+    )
+
+
+def script_counts(text: str | None) -> Tuple[int, int]:
+    """(Latin letters, Arabic letters) in a text"""
+    latin = arabic = 0
+    for c in text or "":
+        if not c.isalpha():
+            continue
+        if c.isascii() or "À" <= c <= "ɏ":
+            latin += 1
+        elif _is_arabic(c):
+            arabic += 1
+    return latin, arabic
+
+
+def lang_from_counts(latin: int, arabic: int) -> str | None:
+    """Languages for a letter mix (None if there are too few letters to decide)"""
+    total = latin + arabic
+    if total < settings.ocr_script_min_letters:
+        return None
+    if arabic / total < settings.ocr_script_min_share:
+        return LANG_ENG
+    if latin / total < settings.ocr_script_min_share:
+        return LANG_ARA
+    return LANG_BOTH
+
+
+def osd_page_task(pdf_path: str, page_num: int, dpi: int) -> Tuple[str, float]:
+    """Low-resolution render + Tesseract OSD of one page (module-level for the OCR process pool)"""
+    from app import tesseract_engine
+    from app.page_raster import render_page
+    image = render_page(Path(pdf_path), page_num, dpi=dpi, colorspace="gray")
+    return tesseract_engine.detect_script(image)
+
+
+def _run_osd(pdf_path: Path, page_numbers: List[int]) -> Dict[int, Tuple[Tuple[str, float] | None, str | None]]:
+    """OSD for many pages (process pool when enabled); page_num -> ((script, conf), error)"""
+    from app.ocr_pool import ocr_pool_enabled, run_pages_parallel
+    dpi = settings.ocr_script_osd_dpi
+    if ocr_pool_enabled() and len(page_numbers) > 1:
+        return run_pages_parallel(osd_page_task, pdf_path, page_numbers, (dpi,))
+
+    results = {}
+    for page_num in page_numbers:
+        try:
+            results[page_num] = (osd_page_task(str(pdf_path), page_num, dpi), None)
+        except Exception as e:
+            results[page_num] = (None, str(e))
+    return results
+
+
+def detect_page_languages(
+    pdf_path: Path,
+    pages_info: Iterable[Tuple[int, str, bool]],
+    page_numbers: Iterable[int]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Choose Tesseract languages for the pages about to be OCR'd
+
+    Args:
+        pdf_path: Path to PDF file
+        pages_info: (page_number, text, needs_ocr) tuples (text layer of every page)
+        page_numbers: Pages to choose languages for
+
+    Returns:
+        page_number -> {"lang": "eng" | "ara" | "eng+ara", "method": str, "signals": {...}}
+    """
+    page_numbers = list(page_numbers)
+    if not settings.ocr_script_detect_enabled:
+        return {n: {"lang": LANG_BOTH, "method": METHOD_DEFAULT, "signals": {}} for n in page_numbers}
+
+    page_counts = {page_num: script_counts(text) for page_num, text, _ in pages_info}
+    doc_latin = sum(latin for latin, _ in page_counts.values())
+    doc_arabic = sum(arabic for _, arabic in page_counts.values())
+    doc_lang = lang_from_counts(doc_latin, doc_arabic)
+
+    detections: Dict[int, Dict[str, Any]] = {}
+    osd_pages = []
+    for page_num in page_numbers:
+        latin, arabic = page_counts.get(page_num, (0, 0))
+        lang = lang_from_counts(latin, arabic)
+        if lang is not None:
+            detections[page_num] = {
+                "lang": lang, "method": METHOD_TEXT_LAYER, "signals": {"latin": latin, "arabic": arabic}
+            }
+        else:
+            osd_pages.append(page_num)
+
+    osd_results = _run_osd(pdf_path, osd_pages) if osd_pages else {}
+    for page_num in osd_pages:
+        result, error = osd_results.get(page_num, (None, "not processed"))
+        if result is not None:
+            script, confidence = result
+            signals = {"script": script, "scriptConf": round(confidence, 2)}
+            lang = OSD_SCRIPTS.get(script)
+            if lang is None or confidence < settings.ocr_script_osd_min_confidence:
+                detections[page_num] = {"lang": LANG_BOTH, "method": METHOD_OSD_LOW_CONFIDENCE, "signals": signals}
+            elif doc_lang == LANG_BOTH:
+                # Bilingual document: OSD sees only the dominant script of the page
+                signals["document"] = doc_lang
+                detections[page_num] = {"lang": LANG_BOTH, "method": METHOD_OSD, "signals": signals}
+            else:
+                detections[page_num] = {"lang": lang, "method": METHOD_OSD, "signals": signals}
+        elif doc_lang is not None:
+            detections[page_num] = {
+                "lang": doc_lang, "method": METHOD_DOCUMENT,
+                "signals": {"latin": doc_latin, "arabic": doc_arabic, "osdError": error}
+            }
+        else:
+            detections[page_num] = {"lang": LANG_BOTH, "method": METHOD_DEFAULT, "signals": {"osdError": error}}
+
+    summary = summarize_languages(detections)
+    print(f"[Script Detect] {len(detections)} pages: langs={summary['langs']} methods={summary['methods']}")
+    return detections
+
+
+def summarize_languages(detections: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Counts for the manifest
+
+    Returns:
+        {"langs": {lang: pages}, "methods": {method: pages},
+         "singleLanguagePages": pages OCR'd with one language model instead of two}
+    """
+    langs: Dict[str, int] = {}
+    methods: Dict[str, int] = {}
+    for detection in detections.values():
+        langs[detection["lang"]] = langs.get(detection["lang"], 0) + 1
+        methods[detection["method"]] = methods.get(detection["method"], 0) + 1
+    return {
+        "langs": langs,
+        "methods": methods,
+        "singleLanguagePages": sum(n for lang, n in langs.items() if lang != LANG_BOTH),
+    }
@@ -85,11 +85,11 @@ def main():
     
     # Convert pages to images first (to get hashes and save debug images)
     try:
-        from pdf2image import convert_from_path
-        from PIL import Image
+        from app.page_raster import get_rasterizer
     except ImportError:
-        print("ERROR: pdf2image or PIL not available")
+        print("ERROR: PIL not available")
         sys.exit(1)
+    rasterizer = get_rasterizer(pdf_path)
     
     # Determine which pages to process
     if not page_numbers:
@@ -114,13 +114,13 @@ def main():
         try:
             print(f"--- Page {page_num} ---")
             
-            # Convert to image
-            images = convert_from_path(str(pdf_path), dpi=args.dpi, first_page=page_num, last_page=page_num)
-            if not images:
-                print(f"  ERROR: Failed to convert page {page_num} to image")
+            # Convert to image (the OCR call below reuses this render from the page cache)
+            try:
+                image = rasterizer.render(page_num, dpi=args.dpi)
+            except Exception as e:
+                print(f"  ERROR: {e}")
                 continue
             
-            image = images[0]
             img_size = image.size
             img_hash = hash_image_bytes(image)
             
@@ -2,15 +2,39 @@
 import json
 import hashlib
 from pathlib import Path
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional, Tuple
 import shutil
 
+# Default block size for streaming copies/hashing (1 MiB)
+DEFAULT_STREAM_CHUNK_SIZE = 1024 * 1024
+
 
 def get_file_hash(file_content: bytes) -> str:
     """Calculate SHA256 hash of file content"""
     return hashlib.sha256(file_content).hexdigest()
 
 
+def get_file_hash_from_path(file_path: Path, chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> str:
+    """
+    Calculate SHA256 hash of a file on disk without loading it into memory
+    
+    Args:
+        file_path: Path to file
+        chunk_size: Block size used when reading the file
+    
+    Returns:
+        Hex digest of the file content
+    """
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
 def save_uploaded_file(
     tenant_id: str,
     policy_id: str,
@@ -42,12 +66,83 @@ def save_uploaded_file(
     file_path.write_bytes(file_content)
     
     # Update manifest
-    update_manifest(tenant_id, policy_id, filename, data_dir)
+    update_manifest(tenant_id, policy_id, filename, data_dir, get_file_hash(file_content))
     
     return file_path
 
 
-def update_manifest(tenant_id: str, policy_id: str, filename: str, data_dir: Path):
+def save_uploaded_file_stream(
+    tenant_id: str,
+    policy_id: str,
+    filename: str,
+    source: BinaryIO,
+    data_dir: Path,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE
+) -> Tuple[Path, str, int]:
+    """
+    Stream an uploaded file to storage in fixed-size blocks, hashing as it goes
+    
+    The upload is never held in memory as a whole: each block is written to a
+    temporary ".part" file and fed to SHA256, then the file is renamed into
+    place. Empty uploads are discarded and not recorded in the manifest.
+    
+    Args:
+        tenant_id: Tenant identifier
+        policy_id: Policy identifier
+        filename: Original filename
+        source: Binary file-like object to read from
+        data_dir: Base data directory
+        chunk_size: Block size for copying
+    
+    Returns:
+        (file_path, file_hash, size_bytes) tuple
+    """
+    policy_dir = data_dir / tenant_id / policy_id
+    policy_dir.mkdir(parents=True, exist_ok=True)
+    
+    file_path = policy_dir / filename
+    tmp_path = policy_dir / f"{filename}.part"
+    
+    hasher = hashlib.sha256()
+    size_bytes = 0
+    
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                block = source.read(chunk_size)
+                if not block:
+                    break
+                hasher.update(block)
+                out.write(block)
+                size_bytes += len(block)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    
+    if size_bytes == 0:
+        tmp_path.unlink(missing_ok=True)
+        try:
+            policy_dir.rmdir()
+        except OSError:
+            pass
+        return file_path, "", 0
+    
+    tmp_path.replace(file_path)
+    file_hash = hasher.hexdigest()
+    
+    # Update manifest
+    update_manifest(tenant_id, policy_id, filename, data_dir, file_hash)
+    
+    return file_path, file_hash, size_bytes
+
+
+def update_manifest(
+    tenant_id: str,
+    policy_id: str,
+    filename: str,
+    data_dir: Path,
+    file_hash: str | None = None
+):
     """Update manifest.json with policy information"""
     tenant_dir = data_dir / tenant_id
     manifest_path = tenant_dir / "manifest.json"
@@ -61,6 +156,8 @@ def update_manifest(tenant_id: str, policy_id: str, filename: str, data_dir: Pat
         "filename": filename,
         "indexedAt": None,  # Will be updated when indexing completes
     }
+    if file_hash:
+        manifest[policy_id]["fileHash"] = file_hash
     
     manifest_path.write_text(json.dumps(manifest, indent=2))
 
@@ -105,6 +202,13 @@ def delete_policy_files(tenant_id: str, policy_id: str, data_dir: Path):
     
     # Delete policy directory (contains original file, text, etc.)
     if policy_dir.exists() and policy_dir.is_dir():
+        try:
+            from app.page_raster import delete_cached_pages, release_rasterizer
+            for pdf_path in policy_dir.glob("*.pdf"):
+                release_rasterizer(pdf_path)
+                delete_cached_pages(pdf_path)
+        except ImportError:
+            pass
         try:
             shutil.rmtree(policy_dir)
             print(f"Deleted policy directory: {policy_dir}")
@@ -0,0 +1,241 @@
+"""
+Tesseract engine backends
+
+pytesseract starts a tesseract process per page: every call reloads the
+eng+ara traineddata and passes the image through a temp file, which is a
+large share of the time spent on short pages. With OCR_PROVIDER=tesserocr
+pages are recognized by long-lived engines through the tesserocr library
+binding instead: one engine per (language, OEM, PSM, variables) and thread,
+so each OCR pool worker process keeps its engines loaded across pages and
+jobs. At most MAX_ENGINES_PER_THREAD engines stay loaded per thread; the least
+recently used one is ended when another configuration is needed.
+
+image_to_string() is a drop-in for pytesseract.image_to_string (same lang and
+config strings) and falls back to pytesseract when tesserocr is unavailable.
+"""
+import shlex
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+from app.config import settings
+
+BACKEND_PYTESSERACT = "pytesseract"
+BACKEND_TESSEROCR = "tesserocr"
+
+# Loaded engines per thread (per-page languages, presets and OSD each need their own)
+MAX_ENGINES_PER_THREAD = 6
+
+_local = threading.local()
+_warned_fallback = False
+
+
+def active_backend() -> str:
+    """Backend used for Tesseract OCR in this process"""
+    global _warned_fallback
+    if settings.ocr_provider == "tesserocr":
+        if tesserocr is not None:
+            return BACKEND_TESSEROCR
+        if not _warned_fallback:
+            _warned_fallback = True
+            print("[Tesseract] WARNING: OCR_PROVIDER=tesserocr but tesserocr is not installed, using pytesseract")
+    elif pytesseract is None and tesserocr is not None:
+        # Only the library binding is installed
+        return BACKEND_TESSEROCR
+    return BACKEND_PYTESSERACT
+
+
+def engine_available() -> bool:
+    """Whether the backend active_backend() selects is installed"""
+    if active_backend() == BACKEND_TESSEROCR:
+        return tesserocr is not None
+    return pytesseract is not None
+
+
+def engine_version() -> str:
+    """Version of the Tesseract library/binary doing the OCR"""
+    if active_backend() == BACKEND_TESSEROCR:
+        # e.g. "tesseract 5.3.0\n leptonica-1.82.0 ..."
+        parts = tesserocr.tesseract_version().split()
+        return f"{parts[1]}-tesserocr" if len(parts) > 1 else "tesserocr"
+    return str(pytesseract.get_tesseract_version())
+
+
+def _parse_config(config: str) -> Tuple[int | None, int | None, Tuple[Tuple[str, str], ...]]:
+    """Parse a pytesseract config string into (oem, psm, variables)"""
+    oem = psm = None
+    variables = []
+    args = shlex.split(config or "")
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--oem" and i + 1 < len(args):
+            oem = int(args[i + 1])
+            i += 2
+        elif arg == "--psm" and i + 1 < len(args):
+            psm = int(args[i + 1])
+            i += 2
+        elif arg == "-c" and i + 1 < len(args) and "=" in args[i + 1]:
+            key, value = args[i + 1].split("=", 1)
+            variables.append((key, value))
+            i += 2
+        else:
+            raise ValueError(f"Unsupported tesseract option for tesserocr: {arg}")
+    return oem, psm, tuple(sorted(variables))
+
+
+def _get_engine(lang: str, config: str):
+    """Long-lived tesserocr engine for this thread (created on first use)"""
+    engines: "OrderedDict[tuple, object]" = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = OrderedDict()
+
+    oem, psm, variables = _parse_config(config)
+    key = (lang, oem, psm, variables)
+    api = engines.get(key)
+    if api is not None:
+        engines.move_to_end(key)
+    else:
+        while len(engines) >= MAX_ENGINES_PER_THREAD:
+            old_key, old_api = engines.popitem(last=False)
+            old_api.End()
+            print(f"[Tesseract] Ended tesserocr engine lang={old_key[0]} oem={old_key[1]} psm={old_key[2]}")
+        # tesserocr.OEM / tesserocr.PSM values are the tesseract CLI numbers
+        kwargs = {"lang": lang}
+        if oem is not None:
+            kwargs["oem"] = oem
+        if psm is not None:
+            kwargs["psm"] = psm
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in variables:
+            api.SetVariable(name, value)
+        engines[key] = api
+        print(f"[Tesseract] Loaded tesserocr engine lang={lang} oem={oem} psm={psm} (thread {threading.current_thread().name})")
+    return api
+
+
+def image_to_string(image, lang: str = "eng+ara", config: str = "") -> str:
+    """
+    OCR a PIL image with the active backend
+
+    Args:
+        image: PIL Image
+        lang: Tesseract language code(s)
+        config: pytesseract-style options ("--oem N", "--psm N", "-c name=value")
+
+    Returns:
+        Extracted text
+    """
+    if active_backend() == BACKEND_TESSEROCR:
+        api = _get_engine(lang, config)
+        api.SetImage(image)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    if pytesseract is None:
+        raise ImportError("pytesseract not installed - OCR functionality unavailable")
+    return pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+def _parse_tsv_words(tsv: str) -> List[Tuple[float, int]]:
+    """(confidence, box area) of every recognized word in Tesseract TSV output"""
+    words = []
+    lines = tsv.splitlines()
+    if not lines:
+        return words
+    header = lines[0].split("\t")
+    col = {name: i for i, name in enumerate(header)}
+    for line in lines[1:]:
+        fields = line.split("\t")
+        if len(fields) < len(header) or fields[col["level"]] != "5" or not fields[col["text"]].strip():
+            continue
+        conf = float(fields[col["conf"]])
+        if conf < 0:
+            continue
+        words.append((conf, int(fields[col["width"]]) * int(fields[col["height"]])))
+    return words
+
+
+def image_to_data(image, lang: str = "eng+ara", config: str = "") -> Tuple[str, List[Tuple[float, int]]]:
+    """
+    OCR a PIL image and return the text together with word confidences (one recognition pass)
+
+    Args:
+        image: PIL Image
+        lang: Tesseract language code(s)
+        config: pytesseract-style options ("--oem N", "--psm N", "-c name=value")
+
+    Returns:
+        (text, [(confidence 0-100, word box area in px), ...])
+    """
+    if active_backend() == BACKEND_TESSEROCR:
+        api = _get_engine(lang, config)
+        api.SetImage(image)
+        try:
+            text = api.GetUTF8Text()
+            words = []
+            level = tesserocr.RIL.WORD
+            for r in tesserocr.iterate_level(api.GetIterator(), level):
+                word = r.GetUTF8Text(level)
+                box = r.BoundingBox(level)
+                if not word or not word.strip() or box is None:
+                    continue
+                words.append((r.Confidence(level), (box[2] - box[0]) * (box[3] - box[1])))
+            return text, words
+        finally:
+            api.Clear()
+
+    if pytesseract is None:
+        raise ImportError("pytesseract not installed - OCR functionality unavailable")
+    if hasattr(pytesseract, "run_and_get_multiple_output"):
+        # pytesseract >= 0.3.9: txt and tsv from the same tesseract run
+        text, tsv = pytesseract.run_and_get_multiple_output(
+            image, extensions=["txt", "tsv"], lang=lang, config=config
+        )
+    else:
+        text = pytesseract.image_to_string(image, lang=lang, config=config)
+        tsv = pytesseract.image_to_data(image, lang=lang, config=config)
+    return text, _parse_tsv_words(tsv)
+
+
+def detect_script(image) -> Tuple[str, float]:
+    """
+    Dominant script of a page image from Tesseract's orientation and script detection (OSD)
+
+    Args:
+        image: PIL Image (a low-resolution render is enough)
+
+    Returns:
+        (script name, e.g. "Latin" / "Arabic", script confidence)
+
+    Raises:
+        Exception if OSD is unavailable (no osd.traineddata) or finds too few characters
+    """
+    if active_backend() == BACKEND_TESSEROCR:
+        api = _get_engine("osd", "--psm 0")
+        api.SetImage(image)
+        try:
+            result = api.DetectOrientationScript()
+        finally:
+            api.Clear()
+        if not result:
+            raise ValueError("OSD found too few characters")
+        return result["script_name"], float(result["script_conf"])
+
+    if pytesseract is None:
+        raise ImportError("pytesseract not installed - OCR functionality unavailable")
+    osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+    return osd["script"], float(osd["script_conf"])
+
@@ -1,7 +1,14 @@
-"""Text extraction from PDF files"""
+"""Text extraction from PDF files
+
+Two engines (TEXT_EXTRACT_ENGINE):
+- "pypdf2": PyPDF2 page.extract_text() (original behaviour)
+- "pymupdf": PyMuPDF (fitz), faster and recovers more text from many PDFs, so
+  fewer pages are sent to OCR. Large documents are split into page ranges that
+  are extracted in parallel on the OCR process pool (when OCR_WORKERS > 1).
+"""
 import io
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 from PyPDF2 import PdfReader
 
 try:
@@ -9,8 +16,18 @@ try:
 except ImportError:
     convert_from_path = None
 
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+from app.config import settings
+
 # Export for use in jobs.py
-__all__ = ['extract_text_from_pdf', 'pdf_to_images', 'convert_from_path']
+__all__ = ['extract_text_from_pdf', 'extract_pdf_layout', 'pdf_to_images', 'convert_from_path']
+
+# Pages with less text than this are marked as needing OCR
+MIN_PAGE_TEXT_CHARS = 25
 
 try:
     from PIL import Image
@@ -18,14 +35,34 @@ except ImportError:
     Image = None
 
 
-def extract_text_from_pdf(file_path: Path) -> List[Tuple[int, str, bool]]:
+def get_text_extract_engine(engine: str | None = None) -> str:
+    """Resolve the extraction engine ("pypdf2" | "pymupdf"); falls back to PyPDF2 without fitz"""
+    engine = engine or settings.text_extract_engine
+    if engine == "pymupdf" and fitz is None:
+        print("[Text Extract] PyMuPDF not installed, using PyPDF2")
+        return "pypdf2"
+    return engine
+
+
+def extract_text_from_pdf(file_path: Path, engine: str | None = None) -> List[Tuple[int, str, bool]]:
     """
     Extract text from PDF file page by page
     
+    Args:
+        file_path: Path to PDF file
+        engine: "pypdf2" | "pymupdf" (default: TEXT_EXTRACT_ENGINE)
+    
     Returns:
         List of (page_number, text, needs_ocr) tuples
         page_number is 1-indexed
     """
+    if get_text_extract_engine(engine) == "pymupdf":
+        return _extract_text_pymupdf(file_path)
+    return _extract_text_pypdf2(file_path)
+
+
+def _extract_text_pypdf2(file_path: Path) -> List[Tuple[int, str, bool]]:
+    """PyPDF2 engine"""
     results = []
     
     try:
@@ -40,7 +77,7 @@ def extract_text_from_pdf(file_path: Path) -> List[Tuple[int, str, bool]]:
                 
                 # Check if page has meaningful text (use 25 chars as threshold per requirements)
                 text_stripped = text.strip()
-                if len(text_stripped) >= 25:  # Has enough text
+                if len(text_stripped) >= MIN_PAGE_TEXT_CHARS:  # Has enough text
                     results.append((page_num + 1, text, False))
                 else:
                     # Mark as needing OCR (empty or very small text)
@@ -67,6 +104,103 @@ def extract_text_from_pdf(file_path: Path) -> List[Tuple[int, str, bool]]:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
 
+def _page_result(page_num: int, text: str) -> Tuple[int, str, bool]:
+    if len(text.strip()) >= MIN_PAGE_TEXT_CHARS:
+        return (page_num, text, False)
+    return (page_num, "", True)
+
+
+def pymupdf_extract_range(pdf_path: str, first_page: int, last_page: int) -> List[Tuple[int, str, bool]]:
+    """
+    Extract the text of pages first_page..last_page (1-indexed, inclusive) with PyMuPDF
+    
+    Module-level so it can run on the process pool.
+    """
+    results = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_index in range(first_page - 1, min(last_page, doc.page_count)):
+            try:
+                text = doc[page_index].get_text("text", sort=True) or ""
+            except Exception as e:
+                print(f"[Text Extract] page={page_index + 1} PyMuPDF failed: {e}")
+                text = ""
+            results.append(_page_result(page_index + 1, text))
+    finally:
+        doc.close()
+    return results
+
+
+def _extract_text_pymupdf(file_path: Path) -> List[Tuple[int, str, bool]]:
+    """PyMuPDF engine (parallel page ranges for large documents)"""
+    from app.ocr_pool import get_ocr_pool, ocr_pool_enabled
+    
+    try:
+        with fitz.open(str(file_path)) as doc:
+            num_pages = doc.page_count
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    
+    if not ocr_pool_enabled() or num_pages < settings.text_extract_parallel_min_pages:
+        return pymupdf_extract_range(str(file_path), 1, num_pages)
+    
+    # One range per worker slot (a few more than workers to even out slow ranges)
+    n_ranges = min(num_pages, max(1, settings.ocr_workers) * 2)
+    range_size = -(-num_pages // n_ranges)
+    pool = get_ocr_pool()
+    futures = [
+        pool.submit(pymupdf_extract_range, str(file_path), first, min(first + range_size - 1, num_pages))
+        for first in range(1, num_pages + 1, range_size)
+    ]
+    results: List[Tuple[int, str, bool]] = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def extract_pdf_layout(
+    file_path: Path,
+    page_numbers: List[int] | None = None,
+    level: str = "blocks"
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Text positions per page (PyMuPDF)
+    
+    Args:
+        file_path: Path to PDF file
+        page_numbers: Pages to read (1-indexed, default: all)
+        level: "blocks" (text blocks) or "words"
+    
+    Returns:
+        {page_number: [{"bbox": [x0, y0, x1, y1], "text": str, "block": int, ...}]}
+        (coordinates in PDF points)
+    """
+    if fitz is None:
+        raise ImportError("PyMuPDF (fitz) not installed - required for layout extraction")
+    if level not in ("blocks", "words"):
+        raise ValueError(f"level must be 'blocks' or 'words', got: {level}")
+    
+    layout: Dict[int, List[Dict[str, Any]]] = {}
+    with fitz.open(str(file_path)) as doc:
+        pages = page_numbers or list(range(1, doc.page_count + 1))
+        for page_num in pages:
+            page = doc[page_num - 1]
+            items = []
+            if level == "words":
+                for x0, y0, x1, y1, word, block_no, line_no, word_no in page.get_text("words", sort=True):
+                    items.append({
+                        "bbox": [x0, y0, x1, y1], "text": word,
+                        "block": block_no, "line": line_no, "word": word_no,
+                    })
+            else:
+                for x0, y0, x1, y1, text, block_no, block_type in page.get_text("blocks", sort=True):
+                    if block_type != 0:  # image block
+                        continue
+                    items.append({"bbox": [x0, y0, x1, y1], "text": text, "block": block_no})
+            layout[page_num] = items
+    return layout
+
+
 def pdf_to_images(file_path: Path, page_num: int) -> Image.Image | None:
     """
     Convert a single PDF page to image
@@ -74,14 +208,10 @@ def pdf_to_images(file_path: Path, page_num: int) -> Image.Image | None:
     Returns:
         PIL Image or None if conversion fails
     """
-    if convert_from_path is None:
-        return None
+    from app.page_raster import render_page
     
     try:
-        images = convert_from_path(file_path, first_page=page_num, last_page=page_num)
-        if images:
-            return images[0]
+        return render_page(Path(file_path), page_num, dpi=200)
     except Exception as e:
-        # poppler not available or conversion failed
+        # No renderer available or conversion failed
         return None
-    return None
@@ -110,6 +110,30 @@ def delete_policy_chunks(tenant_id: str, policy_id: str):
         print(f"Warning: Failed to delete chunks for policy {policy_id}: {e}")
 
 
+def delete_page_chunks(tenant_id: str, policy_id: str, page_numbers: List[int]):
+    """
+    Delete the chunks of specific pages of a policy from vector store
+    
+    Args:
+        tenant_id: Tenant identifier
+        policy_id: Policy identifier
+        page_numbers: Pages whose chunks should be removed
+    """
+    if not page_numbers:
+        return
+    collection = get_collection(tenant_id)
+    
+    try:
+        results = collection.get(
+            where={"$and": [{"policyId": policy_id}, {"pageNumber": {"$in": list(page_numbers)}}]}
+        )
+        
+        if results["ids"] and len(results["ids"]) > 0:
+            collection.delete(ids=results["ids"])
+    except Exception as e:
+        print(f"Warning: Failed to delete page chunks for policy {policy_id}: {e}")
+
+
 def search(
     tenant_id: str,
     query: str,
@@ -0,0 +1,55 @@
+"""
+Standalone job worker
+
+Runs ingestion jobs (PDF rendering, OCR, chunking, embedding) outside the API
+process so that CPU-heavy work does not compete with request handling:
+
+    JOB_RUNNER=worker uvicorn app.main:app ...   # API: accepts uploads, serves reads
+    python -m app.worker                         # one or more workers
+
+The API leaves new jobs QUEUED in the job store (data/jobs.db). Each worker
+polls the store for jobs without a live lease, claims them through the
+scheduler and renews the lease while they run. Workers coordinate only through
+the shared data directory, so any number can run next to any number of API
+replicas. A worker that dies leaves its lease to expire; another worker then
+resumes the job from its page checkpoints.
+"""
+import signal
+import threading
+
+from app.config import settings
+from app.ocr_pool import shutdown_ocr_pool
+
+
+def main():
+    from app.scheduler import scheduler
+
+    stop = threading.Event()
+
+    def _handle_signal(signum, frame):
+        print(f"[Worker] Received signal {signum}, shutting down")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    print(f"[Worker] Starting worker={scheduler.worker_id} data_dir={settings.data_dir}")
+    print(f"[Worker] job_workers={settings.job_workers} ocr_workers={settings.ocr_workers} "
+          f"lease={settings.job_lease_seconds}s poll={settings.worker_poll_seconds}s")
+
+    while not stop.is_set():
+        try:
+            scheduler.recover_jobs()
+        except Exception as e:
+            print(f"[Worker] ERROR polling job store: {e}")
+        stop.wait(settings.worker_poll_seconds)
+
+    # Running jobs are abandoned; their leases expire and another worker resumes them
+    stats = scheduler.stats()
+    if stats["running"]:
+        print(f"[Worker] {stats['running']} running job(s) will resume elsewhere after lease expiry")
+    shutdown_ocr_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of Tesseract preprocessing (hybrid OCR Stage 1), ms/page per step
+
+Compares the previous preprocessing (PIL grayscale conversion, adaptive
+threshold, Canny + HoughLines skew search and INTER_CUBIC rotation on the
+full-resolution page) with the current path (grayscale render used as-is,
+adaptive threshold, projection-profile skew estimate on a downsampled copy,
+rotation only from OCR_DESKEW_MIN_ANGLE).
+
+Usage:
+    python scripts/benchmark_preprocess.py --pages 5 corpus/*.pdf
+    python scripts/benchmark_preprocess.py --skew 2.5 --json report.json data/
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image
+
+from app.config import settings
+from app.ocr_hybrid import OPENCV_AVAILABLE, estimate_skew_angle, preprocess_image_for_ocr
+from app.page_raster import render_page
+
+if OPENCV_AVAILABLE:
+    import cv2
+    import numpy as np
+
+
+def find_pdfs(paths):
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.pdf"))
+        elif path.suffix.lower() == ".pdf" and path.exists():
+            yield path
+
+
+class StepTimer:
+    def __init__(self):
+        self.totals = {}
+
+    def run(self, step, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.totals[step] = self.totals.get(step, 0.0) + time.perf_counter() - t0
+        return result
+
+
+def previous_path(timer: StepTimer, image: Image.Image):
+    """Preprocessing as it was before the fast path"""
+    gray = timer.run("legacy.pil_grayscale", image.convert, "L")
+    array = timer.run("legacy.to_numpy", np.array, gray)
+    thresh = timer.run("legacy.adaptive_threshold", cv2.adaptiveThreshold,
+                       array, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+
+    def _hough_angle(a):
+        edges = cv2.Canny(a, 50, 150, apertureSize=3)
+        lines = cv2.HoughLines(edges, 1, np.pi / 180, 100)
+        if lines is None:
+            return 0.0
+        angles = [theta * 180 / np.pi - 90 for rho, theta in lines[:20, 0]]
+        angles = [angle for angle in angles if -45 < angle < 45]
+        return float(np.median(angles)) if angles else 0.0
+
+    angle = timer.run("legacy.hough_skew", _hough_angle, thresh)
+    h, w = thresh.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    rotated = timer.run("legacy.rotate_cubic", cv2.warpAffine, thresh, M, (w, h),
+                        flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    timer.run("legacy.from_numpy", Image.fromarray, rotated)
+    return angle
+
+
+def fast_path(timer: StepTimer, image: Image.Image):
+    """Current preprocessing, step by step (mirrors preprocess_image_for_ocr)"""
+    array = timer.run("fast.to_numpy", np.asarray, image)
+    thresh = timer.run("fast.adaptive_threshold", cv2.adaptiveThreshold,
+                       array, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    angle = timer.run("fast.skew_estimate", estimate_skew_angle, thresh)
+    rotated = thresh
+    if abs(angle) >= settings.ocr_deskew_min_angle:
+        h, w = thresh.shape
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        rotated = timer.run("fast.rotate_linear", cv2.warpAffine, thresh, M, (w, h),
+                            flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+    timer.run("fast.from_numpy", Image.fromarray, rotated)
+    return angle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories to scan")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per file (default: 5)")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--skew", type=float, default=0.0, help="Rotate pages by this many degrees first")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    if not OPENCV_AVAILABLE:
+        print("OpenCV is not installed; preprocessing uses the PIL-only fallback")
+        return 1
+
+    timer = StepTimer()
+    pages = []
+    for pdf_path in find_pdfs(args.paths):
+        for page_num in range(1, args.pages + 1):
+            try:
+                rgb = render_page(pdf_path, page_num, dpi=args.dpi, colorspace="rgb")
+                gray = render_page(pdf_path, page_num, dpi=args.dpi, colorspace="gray")
+            except Exception:
+                break
+            if args.skew:
+                rgb = rgb.rotate(args.skew, fillcolor="white")
+                gray = gray.rotate(args.skew, fillcolor=255)
+
+            legacy_angle = previous_path(timer, rgb)
+            fast_angle = fast_path(timer, gray)
+            t0 = time.perf_counter()
+            preprocess_image_for_ocr(gray)
+            timer.totals["fast.preprocess_image_for_ocr"] = (
+                timer.totals.get("fast.preprocess_image_for_ocr", 0.0) + time.perf_counter() - t0
+            )
+            pages.append({"file": str(pdf_path), "page": page_num,
+                          "legacyAngle": round(legacy_angle, 2), "fastAngle": fast_angle})
+            print(f"{pdf_path.name} p{page_num}: {gray.size[0]}x{gray.size[1]} "
+                  f"skew legacy={legacy_angle:.2f} fast={fast_angle:.2f}")
+
+    if not pages:
+        print("No pages rendered")
+        return 1
+
+    n = len(pages)
+    per_page = {step: round(seconds / n * 1000, 2) for step, seconds in timer.totals.items()}
+    legacy_total = sum(ms for step, ms in per_page.items() if step.startswith("legacy."))
+    fast_total = sum(ms for step, ms in per_page.items()
+                     if step.startswith("fast.") and step != "fast.preprocess_image_for_ocr")
+
+    print()
+    print(f"{'step':<32} {'ms/page':>9}")
+    for step, ms in per_page.items():
+        print(f"{step:<32} {ms:>9.2f}")
+    print(f"{'legacy total':<32} {legacy_total:>9.2f}")
+    print(f"{'fast total':<32} {fast_total:>9.2f}")
+    if fast_total:
+        print(f"speedup: {legacy_total / fast_total:.1f}x over {n} pages")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"pages": pages, "msPerPage": per_page,
+                       "legacyTotalMs": legacy_total, "fastTotalMs": fast_total}, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
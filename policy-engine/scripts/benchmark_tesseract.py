@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark Tesseract backends: pytesseract (process per page) vs tesserocr (persistent engines)
+
+Renders sample pages once, then OCRs the same images with each backend using
+the configs of the OCR paths (normal_ocr preset and the hybrid "--oem 3 --psm 6"):
+- pages/sec (engine load time for tesserocr is reported separately)
+- characters extracted and similarity of the tesserocr text to pytesseract's
+
+The OCR cache is not involved (engines are called directly).
+
+Usage:
+    python scripts/benchmark_tesseract.py --pages 5 corpus/*.pdf
+    python scripts/benchmark_tesseract.py --threads 4 --json report.json data/
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import tesseract_engine
+from app.config import settings
+from app.page_raster import render_page
+
+BACKENDS = {
+    tesseract_engine.BACKEND_PYTESSERACT: "tesseract",
+    tesseract_engine.BACKEND_TESSEROCR: "tesserocr",
+}
+
+CONFIGS = {
+    "normal_ocr": "",
+    "hybrid": "--oem 3 --psm 6",
+}
+
+
+def find_pdfs(paths):
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.pdf"))
+        elif path.suffix.lower() == ".pdf" and path.exists():
+            yield path
+
+
+def similarity(a: str, b: str) -> float:
+    a = re.sub(r"\s+", " ", a).strip().lower()
+    b = re.sub(r"\s+", " ", b).strip().lower()
+    if not a and not b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def run_backend(backend: str, images, lang: str, config: str, threads: int):
+    """OCR all images with one backend; returns (texts, seconds, warmup_seconds)"""
+    settings.ocr_provider = BACKENDS[backend]
+    if tesseract_engine.active_backend() != backend:
+        raise RuntimeError(f"backend {backend} not available")
+
+    warmup = 0.0
+    if backend == tesseract_engine.BACKEND_TESSEROCR:
+        # Load one engine per worker thread up front so the timing shows steady-state throughput
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda image: tesseract_engine.image_to_string(image, lang, config), images[:threads]))
+        warmup = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        texts = list(pool.map(lambda image: tesseract_engine.image_to_string(image, lang, config), images))
+    return texts, time.perf_counter() - t0, warmup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories to scan")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per file (default: 5)")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (default: 200)")
+    parser.add_argument("--lang", default="eng+ara", help="Tesseract languages (default: eng+ara)")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help="Comma-separated configs to compare")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent pages per backend (default: 1)")
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    images, labels = [], []
+    for pdf_path in find_pdfs(args.paths):
+        for page_num in range(1, args.pages + 1):
+            try:
+                images.append(render_page(pdf_path, page_num, dpi=args.dpi))
+            except Exception:
+                break
+            labels.append(f"{pdf_path.name} p{page_num}")
+    if not images:
+        print("No pages rendered")
+        return 1
+    print(f"Rendered {len(images)} pages at {args.dpi} DPI")
+
+    report = {"pages": len(images), "threads": args.threads, "results": {}}
+    for config_name in [c for c in args.configs.split(",") if c in CONFIGS]:
+        config = CONFIGS[config_name]
+        results = {}
+        for backend in BACKENDS:
+            try:
+                texts, seconds, warmup = run_backend(backend, images, args.lang, config, args.threads)
+            except Exception as e:
+                print(f"[{config_name}] {backend}: skipped ({e})")
+                continue
+            results[backend] = {
+                "seconds": round(seconds, 3),
+                "warmupSeconds": round(warmup, 3),
+                "pagesPerSec": round(len(images) / seconds, 3) if seconds else None,
+                "chars": sum(len(t) for t in texts),
+                "texts": texts,
+            }
+
+        baseline = results.get(tesseract_engine.BACKEND_PYTESSERACT)
+        print()
+        print(f"[{config_name}] config={config!r}")
+        print(f"{'backend':<12} {'pages/s':>8} {'total s':>8} {'warmup s':>9} {'chars':>8} {'sim':>6} {'speedup':>8}")
+        for backend, r in results.items():
+            sim = "-"
+            speedup = "-"
+            if baseline is not None and backend != tesseract_engine.BACKEND_PYTESSERACT:
+                r["similarity"] = round(sum(
+                    similarity(a, b) for a, b in zip(r["texts"], baseline["texts"])
+                ) / len(images), 3)
+                sim = f"{r['similarity']:.3f}"
+                speedup = f"{baseline['seconds'] / r['seconds']:.2f}x" if r["seconds"] else "-"
+            print(f"{backend:<12} {r['pagesPerSec']:>8.2f} {r['seconds']:>8.2f} {r['warmupSeconds']:>9.2f} "
+                  f"{r['chars']:>8} {sim:>6} {speedup:>8}")
+        for r in results.values():
+            r["pages"] = dict(zip(labels, (len(t) for t in r.pop("texts"))))
+        report["results"][config_name] = results
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
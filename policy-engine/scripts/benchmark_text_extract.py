@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF text extraction engines (PyPDF2 vs PyMuPDF)
+
+For every PDF under the given paths this reports, per engine:
+- pages/sec
+- characters recovered
+- pages marked as needing OCR (< 25 chars)
+- pages that would still be forced to OCR by MIN_TEXT_BEFORE_FORCE_OCR
+
+Usage:
+    python scripts/benchmark_text_extract.py data/ corpus/*.pdf
+    python scripts/benchmark_text_extract.py --json report.json data/
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.text_extract import extract_text_from_pdf, fitz
+
+ENGINES = ["pypdf2", "pymupdf"]
+
+
+def find_pdfs(paths):
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.pdf"))
+        elif path.suffix.lower() == ".pdf" and path.exists():
+            yield path
+
+
+def run_engine(pdf_path: Path, engine: str, force_ocr_chars: int):
+    t0 = time.perf_counter()
+    pages = extract_text_from_pdf(pdf_path, engine=engine)
+    seconds = time.perf_counter() - t0
+    return {
+        "pages": len(pages),
+        "seconds": seconds,
+        "chars": sum(len(text.strip()) for _, text, _ in pages),
+        "needsOcr": sum(1 for _, _, needs_ocr in pages if needs_ocr),
+        "forcedOcr": sum(1 for _, text, _ in pages if len(text.strip()) < force_ocr_chars),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories to scan")
+    parser.add_argument("--json", help="Write the full per-file report to this file")
+    args = parser.parse_args()
+
+    engines = [e for e in ENGINES if e != "pymupdf" or fitz is not None]
+    if len(engines) < len(ENGINES):
+        print("WARNING: PyMuPDF not installed, benchmarking PyPDF2 only")
+
+    force_ocr_chars = int(os.getenv("MIN_TEXT_BEFORE_FORCE_OCR", "800"))
+    totals = {e: {"files": 0, "pages": 0, "seconds": 0.0, "chars": 0, "needsOcr": 0, "forcedOcr": 0} for e in engines}
+    report = []
+
+    for pdf_path in find_pdfs(args.paths):
+        row = {"file": str(pdf_path)}
+        for engine in engines:
+            try:
+                result = run_engine(pdf_path, engine, force_ocr_chars)
+            except Exception as e:
+                row[engine] = {"error": str(e)}
+                continue
+            row[engine] = result
+            for key in ("pages", "seconds", "chars", "needsOcr", "forcedOcr"):
+                totals[engine][key] += result[key]
+            totals[engine]["files"] += 1
+        report.append(row)
+
+        summary = "  ".join(
+            f"{e}: {row[e]['pages'] / max(row[e]['seconds'], 1e-9):.1f} p/s {row[e]['chars']} chars"
+            if "error" not in row[e] else f"{e}: ERROR"
+            for e in engines
+        )
+        print(f"{pdf_path.name}: {summary}")
+
+    print()
+    print(f"{'engine':<10} {'files':>6} {'pages':>7} {'pages/s':>9} {'chars':>12} {'needsOcr':>9} {'forcedOcr':>10}")
+    for engine, t in totals.items():
+        rate = t["pages"] / t["seconds"] if t["seconds"] > 0 else 0.0
+        print(f"{engine:<10} {t['files']:>6} {t['pages']:>7} {rate:>9.1f} {t['chars']:>12} {t['needsOcr']:>9} {t['forcedOcr']:>10}")
+    print(f"(forcedOcr: pages with < {force_ocr_chars} chars, MIN_TEXT_BEFORE_FORCE_OCR)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"totals": totals, "files": report}, f, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark page image encodings for Vision OCR requests
+
+Renders sample pages and compares each encoding against the previous path
+(full-resolution color PNG):
+- bytes sent per page and encode time
+- Vision request latency (skipped with --no-ocr)
+- text fidelity: similarity of the extracted text to the PNG result, and to the
+  PDF text layer for pages that have one (>= 200 chars)
+
+The OCR cache is disabled while benchmarking.
+
+Usage:
+    python scripts/benchmark_vision_encoding.py --pages 3 corpus/*.pdf
+    python scripts/benchmark_vision_encoding.py --no-ocr --json report.json data/
+"""
+
+import argparse
+import difflib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.ocr_vision import encode_image_for_vision, render_pdf_page_to_image, vision_ocr_page
+from app.text_extract import extract_text_from_pdf
+
+BASELINE = "png-color-full"
+
+VARIANTS = {
+    BASELINE: {"format": "png", "color": "color", "max_side": -1, "crop": False},
+    "jpeg-gray": {"format": "jpeg", "color": "gray", "max_side": 0, "crop": False},
+    "webp-gray": {"format": "webp", "color": "gray", "max_side": 0, "crop": False},
+    "jpeg-bilevel": {"format": "jpeg", "color": "bilevel", "max_side": 0, "crop": False},
+    "png-bilevel": {"format": "png", "color": "bilevel", "max_side": 0, "crop": False},
+    "jpeg-gray-crop": {"format": "jpeg", "color": "gray", "max_side": 0, "crop": True},
+}
+
+# Minimum text-layer length to use it as a fidelity reference
+MIN_REFERENCE_CHARS = 200
+
+
+def find_pdfs(paths):
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.pdf"))
+        elif path.suffix.lower() == ".pdf" and path.exists():
+            yield path
+
+
+def similarity(a: str, b: str) -> float:
+    a = re.sub(r"\s+", " ", a).strip().lower()
+    b = re.sub(r"\s+", " ", b).strip().lower()
+    if not a and not b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories to scan")
+    parser.add_argument("--pages", type=int, default=3, help="Pages per file (default: 3)")
+    parser.add_argument("--dpi", type=int, default=225, help="Render DPI (default: 225)")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated variants to compare")
+    parser.add_argument("--no-ocr", action="store_true", help="Only measure encoding (no API calls)")
+    parser.add_argument("--json", help="Write the full per-page report to this file")
+    args = parser.parse_args()
+
+    variants = [v for v in args.variants.split(",") if v in VARIANTS]
+    if BASELINE not in variants:
+        variants.insert(0, BASELINE)
+    settings.ocr_cache_enabled = False
+
+    totals = {v: {"pages": 0, "bytes": 0, "encodeSeconds": 0.0, "requestSeconds": 0.0,
+                  "similarityToPng": 0.0, "referencePages": 0, "similarityToTextLayer": 0.0} for v in variants}
+    report = []
+
+    for pdf_path in find_pdfs(args.paths):
+        try:
+            text_layer = {n: text for n, text, _ in extract_text_from_pdf(pdf_path)}
+        except Exception:
+            text_layer = {}
+        for page_num in range(1, args.pages + 1):
+            try:
+                image = render_pdf_page_to_image(pdf_path, page_num, args.dpi, colorspace="rgb")
+            except Exception:
+                break
+            reference = text_layer.get(page_num, "")
+            row = {"file": str(pdf_path), "page": page_num}
+            baseline_text = None
+            for variant in variants:
+                encoding = VARIANTS[variant]
+                t0 = time.perf_counter()
+                data, _ = encode_image_for_vision(image, **encoding)
+                result = {"bytes": len(data), "encodeSeconds": time.perf_counter() - t0}
+                if not args.no_ocr:
+                    t0 = time.perf_counter()
+                    try:
+                        text = vision_ocr_page(image=image, page_num=page_num, encoding=encoding)
+                    except Exception as e:
+                        result["error"] = str(e)
+                        row[variant] = result
+                        continue
+                    result["requestSeconds"] = time.perf_counter() - t0
+                    if variant == BASELINE:
+                        baseline_text = text
+                    result["similarityToPng"] = similarity(text, baseline_text) if baseline_text is not None else None
+                    if len(reference.strip()) >= MIN_REFERENCE_CHARS:
+                        result["similarityToTextLayer"] = similarity(text, reference)
+                row[variant] = result
+
+                t = totals[variant]
+                t["pages"] += 1
+                t["bytes"] += result["bytes"]
+                t["encodeSeconds"] += result["encodeSeconds"]
+                t["requestSeconds"] += result.get("requestSeconds", 0.0)
+                t["similarityToPng"] += result.get("similarityToPng") or 0.0
+                if result.get("similarityToTextLayer") is not None:
+                    t["referencePages"] += 1
+                    t["similarityToTextLayer"] += result["similarityToTextLayer"]
+            report.append(row)
+            print(f"{pdf_path.name} p{page_num}: " + "  ".join(
+                f"{v}={row[v]['bytes'] // 1024}KB" for v in variants if "bytes" in row.get(v, {})
+            ))
+
+    print()
+    print(f"{'variant':<16} {'pages':>6} {'KB/page':>9} {'encode ms':>10} {'request s':>10} {'sim PNG':>8} {'sim text':>9}")
+    for variant, t in totals.items():
+        n = max(t["pages"], 1)
+        sim_text = f"{t['similarityToTextLayer'] / t['referencePages']:.3f}" if t["referencePages"] else "-"
+        request = "-" if args.no_ocr else f"{t['requestSeconds'] / n:.2f}"
+        sim_png = "-" if args.no_ocr else f"{t['similarityToPng'] / n:.3f}"
+        print(f"{variant:<16} {t['pages']:>6} {t['bytes'] / n / 1024:>9.0f} {t['encodeSeconds'] / n * 1000:>10.1f} "
+              f"{request:>10} {sim_png:>8} {sim_text:>9}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"totals": totals, "pages": report}, f, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,12 +17,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import settings
 from app.vector_store import delete_policy_chunks
+from app.job_store import list_jobs, delete_job, get_db_path
 
 def delete_all_policies(tenant_id: str = "default"):
     """Delete all policies for a tenant and return paths report"""
     
     data_dir = Path(settings.data_dir)
-    jobs_dir = data_dir / "jobs"
     manifests_dir = data_dir / "manifests" / tenant_id
     tenant_dir = data_dir / tenant_id
     chroma_dir = data_dir / "chroma"
@@ -49,64 +49,41 @@ def delete_all_policies(tenant_id: str = "default"):
     # ============================================================
     # 1. GET ALL POLICIES (from jobs directory - source of truth)
     # ============================================================
-    print("📋 Step 1: Listing all policies from job files...")
+    print("📋 Step 1: Listing all policies from job store...")
     
-    all_jobs = []
-    policy_ids = set()
-    
-    if jobs_dir.exists():
-        for job_file in jobs_dir.glob("*.json"):
-            try:
-                with open(job_file, "r") as f:
-                    job = json.load(f)
-                    if tenant_id is None or job.get("tenantId") == tenant_id:
-                        all_jobs.append(job)
-                        policy_id = job.get('policyId')
-                        if policy_id:
-                            policy_ids.add(policy_id)
-            except Exception as e:
-                print(f"   ⚠ Failed to read {job_file.name}: {e}")
-                continue
+    all_jobs = list_jobs(tenant_id=tenant_id)
+    policy_ids = set(job.get('policyId') for job in all_jobs if job.get('policyId'))
     
     print(f"   Found {len(policy_ids)} unique policy ID(s)")
-    print(f"   Found {len(all_jobs)} job file(s)\n")
+    print(f"   Found {len(all_jobs)} job(s)\n")
     
     if len(policy_ids) == 0:
         print("   ✅ No policies to delete\n")
         return report
     
     # ============================================================
-    # 2. DELETE JOB FILES
+    # 2. DELETE JOBS
     # ============================================================
-    print("📋 Step 2: Deleting job files...")
+    print("📋 Step 2: Deleting jobs...")
     deleted_job_files = []
     
-    if jobs_dir.exists():
-        for job_file in jobs_dir.glob("*.json"):
-            try:
-                with open(job_file, "r") as f:
-                    job = json.load(f)
-                    job_tenant = job.get("tenantId")
-                    if tenant_id is None or job_tenant == tenant_id:
-                        job_id = job.get('jobId')
-                        policy_id = job.get('policyId')
-                        filename = job.get('filename', 'unknown')
-                        
-                        job_file_path = str(job_file.absolute())
-                        job_file.unlink()
-                        deleted_job_files.append({
-                            "path": job_file_path,
-                            "jobId": job_id,
-                            "policyId": policy_id,
-                            "filename": filename,
-                        })
-                        print(f"   ✓ Deleted: {job_file.name}")
-            except Exception as e:
-                print(f"   ⚠ Failed to process {job_file.name}: {e}")
-                continue
+    for job in all_jobs:
+        job_id = job.get('jobId')
+        try:
+            if job_id and delete_job(job_id):
+                deleted_job_files.append({
+                    "path": f"{get_db_path().absolute()}#{job_id}",
+                    "jobId": job_id,
+                    "policyId": job.get('policyId'),
+                    "filename": job.get('filename', 'unknown'),
+                })
+                print(f"   ✓ Deleted: {job_id}")
+        except Exception as e:
+            print(f"   ⚠ Failed to delete job {job_id}: {e}")
+            continue
     
     report["deleted_files"]["job_files"] = deleted_job_files
-    print(f"   ✅ Deleted {len(deleted_job_files)} job file(s)\n")
+    print(f"   ✅ Deleted {len(deleted_job_files)} job(s)\n")
     
     # ============================================================
     # 3. DELETE VECTOR STORE CHUNKS (ChromaDB)
@@ -238,7 +215,7 @@ def delete_all_policies(tenant_id: str = "default"):
     print(f"{'='*70}")
     print(f"\n📊 Summary:")
     print(f"   Policies deleted: {len(report['deleted_policies'])}")
-    print(f"   Job files deleted: {len(deleted_job_files)}")
+    print(f"   Jobs deleted: {len(deleted_job_files)}")
     print(f"   Policy directories deleted: {len(deleted_policy_dirs)}")
     print(f"   Manifest files deleted: {len(deleted_manifest_files)}")
     print(f"   Errors: {len(report['errors'])}")
@@ -1,7 +1,7 @@
 """
 Script to delete all policies from policy-engine service
 This deletes:
-1. All job files in data/jobs/
+1. All jobs in data/jobs.db (and legacy job files in data/jobs/)
 2. All policy directories in data/{tenantId}/{policyId}/
 3. All manifest files in data/manifests/{tenantId}/
 4. All chunks from ChromaDB vector store
@@ -13,6 +13,7 @@ Run with: python3 scripts/delete_all_policies_from_engine.py
 import os
 import json
 import shutil
+import sqlite3
 from pathlib import Path
 
 # Try to load environment variables
@@ -71,6 +72,20 @@ def delete_all_policies():
     else:
         print("   ℹ️  Jobs directory does not exist")
     
+    jobs_db = data_path / "jobs.db"
+    if jobs_db.exists():
+        try:
+            conn = sqlite3.connect(str(jobs_db), timeout=30)
+            with conn:
+                cur = conn.execute("DELETE FROM jobs")
+            conn.close()
+            deleted_items.append(f"job_store:{cur.rowcount} job(s)")
+            print(f"   ✓ Deleted {cur.rowcount} job(s) from {jobs_db.name}")
+        except Exception as e:
+            error_msg = f"Failed to delete jobs from {jobs_db.name}: {e}"
+            print(f"   ❌ {error_msg}")
+            errors.append(error_msg)
+    
     # 2. Delete all policy directories for the tenant
     print(f"\n📁 Step 2: Deleting policy directories for tenant '{TENANT_ID}'...")
     tenant_dir = data_path / TENANT_ID